@@ -1,7 +1,20 @@
 """Application root package."""
 
 
+import os
+import time
+import asyncio
 from queue import Queue
+from datetime import datetime, timedelta, timezone
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    TYPE_CHECKING
+)
 from logging.handlers import QueueHandler, QueueListener
 from logging import (
     StreamHandler,
@@ -11,7 +24,11 @@ from logging import (
 )
 
 
-__all__ = ('start',)
+if TYPE_CHECKING:
+    from autoria_scraper.core.parsers import CarParser
+
+
+__all__ = ('start', 'start_sharded', 'export')
 
 
 logger = getLogger(__name__)
@@ -37,44 +54,326 @@ logger.setLevel(DEBUG)
 listener = QueueListener(log_queue, stderr_handler)
 
 
-async def start() -> None:
+async def start(
+    mode: str = 'standalone',
+    worker_id: Optional[str] = None,
+    resume: bool = False,
+    shard: Optional[Tuple[int, int]] = None,
+    report: Optional[Callable[..., Any]] = None,
+    report_interval: float = 30
+) -> None:
     """Entrypoint function.
 
     1. Enables queue listener for logging
     2. Checks database connection and creates necessary tables
-    3. Starts crawling
+    3. Loads listings and phone numbers known from previous runs
+    4. Starts crawling pipeline (`standalone`), enqueues catalog pages and
+        reports the progress (`coordinator`), processes queued tasks
+        (`worker`), see `autoria_scraper.core.distributed`, or runs
+        crawls periodically until stopped (`daemon`), see
+        `autoria_scraper.core.daemon`
+    5. Closes shared http session, parsing workers, http cache and archive
+
+    Standalone crawl (daemon sweep) progress is checkpointed periodically,
+     the checkpoint is removed once the crawl is finished.
 
+    :param mode: str - `standalone`, `coordinator`, `worker` or `daemon`
+    :param worker_id: Optional[str] - unique id of the worker (`worker`
+     mode only), `host-pid` if not specified
+    :param resume: bool - if True, the interrupted standalone crawl (the
+     first daemon sweep) is continued from the checkpoint (if any)
+    :param shard: Optional[Tuple[int, int]] - index of this shard and
+     total amount of shards (standalone mode only), catalog pages are
+     split between shards, see `autoria_scraper.core.sharding`
+    :param report: Optional[Callable[..., Any]] - receives counters
+     (`metrics.counters()`) every `report_interval` seconds and, once
+     the crawl is finished, counters and discovered links
+    :param report_interval: float - `report` period (in seconds)
     :return: None
     """
     listener.start()
 
-    from autoria_scraper.db.models import Car
-    from autoria_scraper.db import init_db, save_multiple
+    from autoria_scraper.startup import startup_profile
+    # `Settings` are validated on import
     from autoria_scraper.config import app_config
-    from autoria_scraper.core.scrapers import CatalogScraper, DirectScraper
+
+    startup_profile.mark('config')
+
+    from autoria_scraper.db import (
+        init_db,
+        save_multiple,
+        save_checked,
+        iter_listings,
+        save_phones,
+        iter_phones
+    )
+    from autoria_scraper.core.index import ListingIndex
+    from autoria_scraper.core.phones import PhoneCache
+    from autoria_scraper.core.checkpoint import Checkpoint
+    from autoria_scraper.core.misc import (
+        session_manager,
+        parse_executor,
+        http_cache,
+        response_archive,
+        metrics
+    )
+    from autoria_scraper.core.pipeline import Pipeline
+
+    startup_profile.mark('imports (db, http, pipeline)')
+
+    async def save_(chunk: List["CarParser"]) -> bool:
+        """Converts `CarParser` records to `Car` columns and saves them,
+         along with phone numbers resolved and unchanged listings checked
+         in the meantime.
+
+        :param chunk: List["CarParser"] - parsed records
+        :return: bool - False if records aren't saved
+        """
+        saved = any(
+            await save_multiple([record.as_dict() for record in chunk])
+        )
+
+        if saved:
+            for record in chunk:
+                index.add(record.url, record.content_hash, time.time())
+        else:
+            # retried on resume
+            for record in chunk:
+                checkpoint.fail(record.url)
+
+        await save_phones(phones.drain())
+        await save_checked(index.drain_checked())
+
+        return saved
 
     # checks database connection and creates necessary tables if those missing
     await init_db()
-    # processes pages with listings to obtain `direct` links
-    catalog_scraper = CatalogScraper(
-        root_url=app_config.scraper.root_url.__str__(),
-        batch_size=app_config.scraper.batch_size,
-        pages_limit=app_config.scraper.pages_limit
+    startup_profile.mark('database (connection, schema check)')
+    index = ListingIndex()
+    config = app_config.scraper
+    phones = PhoneCache(
+        max_size=config.phone_cache_size,
+        ttl=config.phone_cache_ttl
     )
-    async for urls in catalog_scraper.start():
-        # using obtained collection of urls to set up `direct` scraper
-        direct_scraper = DirectScraper(
-            phone_url=app_config.scraper.phone_url.__str__(),
-            links=urls,
-            batch_size=app_config.scraper.batch_size
+    checkpoint_path = app_config.checkpoint.path
+
+    if shard is not None:
+        # e.g: checkpoint.shard-0-of-8.json
+        root, extension = os.path.splitext(checkpoint_path)
+        checkpoint_path = f'{root}.shard-{shard[0]}-of-{shard[1]}{extension}'
+
+    checkpoint = Checkpoint(
+        path=checkpoint_path,
+        interval=app_config.checkpoint.interval
+    )
+
+    if resume and mode in ('standalone', 'daemon') and not checkpoint.load():
+        logger.info('nothing to resume, starting from scratch')
+    # the coordinator doesn't crawl listings itself
+    if mode != 'coordinator':
+        # warms up the index with listings stored by previous runs
+        async for url, content_hash, checked in iter_listings():
+            # naive UTC datetimes are stored
+            index.add(
+                url,
+                content_hash,
+                checked.replace(tzinfo=timezone.utc).timestamp()
+            )
+
+        logger.info('known listings: %d', len(index))
+        # warms up phone numbers memoized by previous runs (the most recent
+        #  ones, not expired)
+        async for user_id, phone_id, phone_number, resolved in iter_phones(
+            since=(
+                datetime.utcnow() - timedelta(seconds=config.phone_cache_ttl)
+            ),
+            limit=config.phone_cache_size
+        ):
+            phones.add(user_id, phone_id, phone_number, resolved)
+
+        logger.info('known phone numbers: %d', len(phones))
+        startup_profile.mark('warm-up (known listings, phone numbers)')
+    # serves runtime metrics (if enabled) while the pipeline is running
+    await metrics.start(port_offset=shard[0] if shard is not None else 0)
+
+    async def report_() -> None:
+        """Passes counters to `report` periodically (until cancelled).
+
+        :return: None
+        """
+        while True:
+            await asyncio.sleep(report_interval)
+            report(metrics.counters())
+
+    crawls = 0
+
+    async def crawl() -> Dict[str, Any]:
+        """A single crawl of the catalog (the `standalone` mode, a sweep
+         of the `daemon` mode), the progress is checkpointed.
+
+        :return: Dict[str, Any] - summary of the crawl
+        """
+        nonlocal checkpoint, crawls
+
+        if crawls:
+            # daemon sweeps after the first one start from scratch
+            checkpoint = Checkpoint(
+                path=checkpoint_path,
+                interval=app_config.checkpoint.interval
+            )
+
+        crawls += 1
+        saved = metrics.counters().get('autoria_pipeline_entities_total', 0)
+        autosave = asyncio.create_task(checkpoint.autosave())
+        reporting = (
+            asyncio.create_task(report_()) if report is not None else None
+        )
+        pipeline = Pipeline.from_config(
+            save=save_,
+            index=index,
+            phones=phones,
+            checkpoint=checkpoint,
+            shard=shard or (0, 1)
         )
-        async for chunk in direct_scraper.start():
-            # each `chunk` is a collection of `CarParser` instances
-            #  which can be easily converted to `Car` instances
-            await save_multiple([
-                Car(**instance.model_dump())
-                for instance in chunk
-                if instance is not None
-            ])
+
+        try:
+            # catalog pages -> `direct` links -> parsed entities ->
+            #  database, all stages are executed concurrently
+            await pipeline.run()
+        except BaseException:
+            # the latest progress, continue with `resume=True`
+            await checkpoint.save()
+            logger.warning(
+                'crawl is interrupted, checkpoint is saved: %s',
+                checkpoint_path
+            )
+
+            raise
+        finally:
+            autosave.cancel()
+
+            if reporting is not None:
+                reporting.cancel()
+        # failed links (pages) and links left by the crawl budget are kept
+        #  for the next `resume=True` run
+        if checkpoint.has_failures() or checkpoint.has_pending():
+            await checkpoint.save()
+            logger.warning(
+                'some links (pages) failed or are left, checkpoint is '
+                'saved: %s',
+                checkpoint_path
+            )
+        else:
+            checkpoint.clear()
+
+        if report is not None:
+            report(metrics.counters(), pipeline.discovered)
+
+        await save_checked(index.drain_checked())
+
+        return {
+            'discovered': len(pipeline.discovered),
+            'saved': metrics.counters().get(
+                'autoria_pipeline_entities_total', 0
+            ) - saved,
+            'known_listings': len(index)
+        }
+
+    try:
+        if mode == 'coordinator':
+            from autoria_scraper.core.distributed import Coordinator
+
+            await Coordinator.from_config().run()
+        elif mode == 'worker':
+            from autoria_scraper.core.distributed import (
+                Worker,
+                default_worker_id
+            )
+
+            await Worker.from_config(
+                worker_id=worker_id or default_worker_id(),
+                save=save_,
+                index=index,
+                phones=phones
+            ).run()
+        elif mode == 'daemon':
+            from autoria_scraper.core.daemon import Daemon
+
+            await Daemon.from_config(sweep=crawl).run()
+        else:
+            await crawl()
+        # unchanged listings found after the last saved batch
+        await save_checked(index.drain_checked())
+    finally:
+        # releases pooled connections shared by all scrapers
+        await session_manager.close()
+        # stops parsing worker processes
+        parse_executor.close()
+
+        if http_cache.enabled:
+            logger.info('http cache: %s', http_cache.summary())
+            http_cache.close()
+
+        if response_archive.mode != 'off':
+            logger.info('archive: %s', response_archive.summary())
+            response_archive.close()
+
+        await metrics.close()
+        logger.info('metrics summary:\n%s', '\n'.join(metrics.summary()))
 
     listener.stop()
+
+
+def start_sharded(
+    shards: Optional[int] = None,
+    resume: bool = False
+) -> bool:
+    """Entrypoint of the sharded runner: the standalone crawl is split
+     between `shards` processes (see `autoria_scraper.core.sharding`).
+
+    :param shards: Optional[int] - amount of shard processes,
+     `SHARDING__SHARDS` (or CPU count) if not specified
+    :param resume: bool - if True, interrupted crawls of shards are
+     continued from their checkpoints (the same amount of shards is
+     expected)
+    :return: bool - True if every shard finished successfully
+    """
+    listener.start()
+
+    from autoria_scraper.db import init_db, engine
+    from autoria_scraper.core.sharding import ShardRunner
+
+    async def init_db_() -> None:
+        # tables are created (migrated) once, before shards start
+        await init_db()
+        await engine.dispose()
+
+    try:
+        asyncio.run(init_db_())
+
+        return ShardRunner.from_config(shards=shards, resume=resume).run()
+    finally:
+        listener.stop()
+
+
+async def export(
+    path: Optional[str] = None,
+    format_: Optional[str] = None
+) -> None:
+    """Exports `cars` rows found since the previous export (incremental,
+     see `autoria_scraper.export.Exporter`).
+
+    :param path: Optional[str] - output directory, `EXPORT__PATH` if not
+     specified
+    :param format_: Optional[str] - `csv` or `parquet`, `EXPORT__FORMAT`
+     if not specified
+    :return: None
+    """
+    listener.start()
+
+    from autoria_scraper.export import Exporter
+
+    try:
+        await Exporter.from_config(path=path, format_=format_).run()
+    finally:
+        listener.stop()
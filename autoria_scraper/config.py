@@ -2,7 +2,7 @@
 
 
 import sys
-from typing import Optional
+from typing import Optional, Literal
 from logging import getLogger
 
 from pydantic import (
@@ -20,6 +20,12 @@ __all__ = ('app_config',)
 class Database(BaseModel):
     """Contains database settings."""
     url: PostgresDsn
+    # `car_changes` is converted to monthly range partitions (by
+    #  `datetime_changed`), see `autoria_scraper.db.migrations`
+    partition_changes: bool = False
+    # partitions older than that (in months) are dropped, None - kept
+    #  forever
+    retention_months: Optional[int] = None
 
 
 class AioHttp(BaseModel):
@@ -27,6 +33,24 @@ class AioHttp(BaseModel):
     attempts_limit: int
     attempt_delay: float
     timeout: int
+    # reattempt delay grows exponentially up to this value (in seconds)
+    attempt_delay_max: float = 60
+    # requests per second per host, 0 - unlimited
+    rate_limit: float = 0
+    rate_burst: int = 50
+    # adaptive concurrency limit per host is kept within
+    #  [min_concurrency, connections_limit_per_host]
+    min_concurrency: int = 4
+    # connection pool settings (shared `aiohttp.ClientSession`)
+    connections_limit: int = 400
+    connections_limit_per_host: int = 200
+    dns_cache_ttl: int = 300
+    keepalive_timeout: float = 30
+    # pool of user-agents cached on disk (regenerated by `fake-useragent`
+    #  after `user_agents_ttl` seconds)
+    user_agents_path: str = '.cache/user_agents.json'
+    user_agents_size: int = 50
+    user_agents_ttl: float = 7 * 24 * 3600
 
 
 class Scraper(BaseModel):
@@ -35,12 +59,154 @@ class Scraper(BaseModel):
     phone_url: HttpUrl
     batch_size: int
     pages_limit: Optional[int] = None
+    # stops the crawl once that amount of consecutive catalog pages yields
+    #  only already known listings (disabled if not specified)
+    incremental_pages: Optional[int] = None
+    # known listings are crawled again to catch price/odometer changes,
+    #  unchanged ones (same content hash) aren't written
+    recheck_known: bool = False
+    # pipeline stages settings, `batch_size` is used if not specified
+    catalog_concurrency: Optional[int] = None
+    direct_concurrency: Optional[int] = None
+    save_batch_size: Optional[int] = None
+    save_concurrency: int = 2
+    # amount of worker processes for html parsing, 0 - parse in the event
+    #  loop thread
+    parse_workers: int = 0
+    # `lxml` - single-pass engine, `bs4` - reference `BeautifulSoup` engine
+    extraction_engine: Literal['lxml', 'bs4'] = 'lxml'
+    # share of pages (0 - 1) extracted by both engines to compare results
+    extraction_parity_rate: float = 0.0
+    # pages are parsed while downloaded (`lxml` engine, in the event loop
+    #  thread), downloads are aborted once required fields are found
+    streaming_parse: bool = False
+    # phone numbers stage, `direct_concurrency` is used if not specified
+    phone_concurrency: Optional[int] = None
+    # phone numbers are memoized per seller (in memory and in the database)
+    phone_cache_size: int = 100_000
+    phone_cache_ttl: float = 30 * 24 * 3600
+    # capacity of queues between stages
+    links_queue_size: int = 1000
+    phones_queue_size: int = 1000
+    entities_queue_size: int = 1000
+
+
+class Cache(BaseModel):
+    """Contains on-disk http cache settings."""
+    enabled: bool = False
+    path: str = '.cache/http'
+    # least recently used pages are evicted above this size
+    max_size_mb: int = 1024
+    # pages younger than TTL are served without any request, older ones
+    #  are revalidated (in seconds)
+    catalog_ttl: float = 600
+    direct_ttl: float = 86400
+
+
+class Archive(BaseModel):
+    """Contains record/replay archive settings."""
+    # `record` - raw responses are appended to the archive,
+    #  `replay` - responses are served from the archive (no network)
+    mode: Literal['off', 'record', 'replay'] = 'off'
+    path: str = 'archive'
+    segment_size_mb: int = 1024
+
+
+class Metrics(BaseModel):
+    """Contains runtime metrics settings."""
+    # serves metrics in Prometheus text format at `/metrics`
+    enabled: bool = False
+    host: str = '127.0.0.1'
+    port: int = 9108
+
+
+class Checkpoint(BaseModel):
+    """Contains checkpoint settings (standalone mode, see `--resume`)."""
+    path: str = 'checkpoint.json'
+    # progress is persisted that often (in seconds)
+    interval: float = 30
+
+
+class Export(BaseModel):
+    """Contains `cars` export settings (see `export.py`)."""
+    path: str = 'dumps'
+    # `parquet` requires `pyarrow` package
+    format: Literal['csv', 'parquet'] = 'csv'
+    batch_size: int = 10_000
+    # rows found during this period (in seconds) are exported next time,
+    #  so rows of transactions in flight aren't skipped
+    lag_seconds: float = 300
+
+
+class Distributed(BaseModel):
+    """Contains coordinator/worker mode settings (database work queue)."""
+    # claimed tasks are returned to the queue if the worker doesn't extend
+    #  the lease in time (in seconds)
+    lease_seconds: float = 300
+    # a task is marked as failed after that amount of claims
+    max_attempts: int = 3
+    # amount of tasks claimed at once, `scraper.batch_size` is used if not
+    #  specified
+    claim_size: Optional[int] = None
+    # idle workers check the queue that often (in seconds)
+    poll_interval: float = 5
+    # heartbeat/lease extension and throughput reporting period
+    #  (in seconds)
+    report_interval: float = 30
+    # workers exit if the coordinator doesn't start a crawl within that
+    #  period (in seconds)
+    wait_timeout: float = 600
+
+
+class Sharding(BaseModel):
+    """Contains sharded runner settings (`python main.py sharded`)."""
+    # amount of shard processes, CPU count if not specified
+    shards: Optional[int] = None
+    # shards run on `uvloop` (requires `uvloop` package)
+    uvloop: bool = False
+    # combined progress is logged that often (in seconds)
+    report_interval: float = 30
+
+
+class Frontier(BaseModel):
+    """Contains crawl frontier settings (priorities of direct links)."""
+    # a direct page which isn't fetched (network errors, 429/5xx
+    #  responses) is queued again (after new and re-checked listings) up
+    #  to that amount of times per crawl
+    retries: int = 1
+    # known listings (`scraper.recheck_known`) checked during this period
+    #  (in seconds) are skipped, 0 - all of them are re-checked
+    recheck_after: float = 0
+    # max amount of direct pages per crawl, None - unlimited
+    request_budget: Optional[int] = None
+    # direct pages are fetched during this period (in seconds) of each
+    #  crawl only, None - unlimited
+    time_budget: Optional[float] = None
+
+
+class Daemon(BaseModel):
+    """Contains daemon mode settings (`python main.py daemon`)."""
+    # catalog sweeps are started that often (in seconds)
+    interval: float = 3600
+    # random delay up to that amount of seconds is added to each interval
+    jitter: float = 60
+    # state of the daemon and the last sweep (json), None - not written
+    status_path: Optional[str] = 'daemon_status.json'
 
 
 class Settings(BaseSettings):
     database: Database
     scraper: Scraper
     aiohttp: AioHttp
+    cache: Cache = Cache()
+    archive: Archive = Archive()
+    metrics: Metrics = Metrics()
+    checkpoint: Checkpoint = Checkpoint()
+    export: Export = Export()
+    distributed: Distributed = Distributed()
+    sharding: Sharding = Sharding()
+    frontier: Frontier = Frontier()
+    daemon: Daemon = Daemon()
 
     model_config = SettingsConfigDict(
         env_file=('.env.local', '.env'),
@@ -0,0 +1,226 @@
+"""This module contains `Checkpoint` class."""
+
+
+import os
+import json
+import asyncio
+from logging import getLogger
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Set
+
+from autoria_scraper.core.misc import replace_file
+
+
+__all__ = ('Checkpoint',)
+
+
+logger = getLogger(__name__)
+
+_VERSION: int = 1
+
+
+def _to_ranges(pages: Iterable[int]) -> List[List[int]]:
+    """Compacts page numbers, e.g: 1, 2, 3, 7 -> [[1, 3], [7, 7]].
+
+    :param pages: Iterable[int] - page numbers
+    :return: List[List[int]] - inclusive ranges
+    """
+    ranges = []
+
+    for page in sorted(pages):
+        if ranges and ranges[-1][1] == page - 1:
+            ranges[-1][1] = page
+        else:
+            ranges.append([page, page])
+
+    return ranges
+
+
+class Checkpoint:
+    """Progress of the standalone crawl, persisted periodically, so
+     an interrupted crawl can be resumed (`start(resume=True)`).
+
+    Keeps completed catalog pages, pending direct links (discovered, but
+     not finished yet) and failed ones. Catalog pages which aren't
+     fetched are kept as failed (not completed pages are crawled again
+     on resume). The file is replaced atomically,
+     a crash never leaves a partially written checkpoint.
+    """
+
+    def __init__(self, path: str, interval: float) -> None:
+        """
+        :param path: str - checkpoint file path (json)
+        :param interval: float - `.autosave()` period (in seconds)
+        :return: None
+        """
+        self._path = path
+        self._interval = interval
+        self._pages: Set[int] = set()
+        self._failed_pages: Set[int] = set()
+        self._pending: Set[str] = set()
+        self._failed: Set[str] = set()
+        # pending and failed links of the interrupted crawl
+        self._restored: List[str] = []
+        # failed links of the interrupted crawl (retried last)
+        self._restored_failed: Set[str] = set()
+        self._started = datetime.utcnow()
+
+    def load(self) -> bool:
+        """Restores the progress of the interrupted crawl (if any).
+
+        :return: bool - True if restored
+        """
+        try:
+            with open(self._path) as file:
+                state: Dict[str, Any] = json.load(file)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning(
+                'checkpoint is ignored: %s, reason: %s',
+                self._path,
+                e
+            )
+
+            return False
+
+        if state.get('version') != _VERSION:
+            logger.warning(
+                'checkpoint is ignored: %s, unknown version',
+                self._path
+            )
+
+            return False
+
+        self._pages = {
+            page
+            for first, last in state['completed_pages']
+            for page in range(first, last + 1)
+        }
+        # failed links are retried once more
+        self._restored = list(dict.fromkeys(
+            [*state['pending'], *state['failed']]
+        ))
+        self._pending = set(self._restored)
+        self._restored_failed = set(state['failed'])
+        self._started = datetime.fromisoformat(state['started_at'])
+
+        logger.info(
+            'checkpoint restored: %s, started at: %s, completed pages: %d, '
+            'pending links: %d',
+            self._path,
+            self._started,
+            len(self._pages),
+            len(self._restored)
+        )
+
+        return True
+
+    def restored(self) -> List[str]:
+        """Returns pending links of the interrupted crawl (see `.load()`).
+
+        :return: List[str] - direct links to the cars
+        """
+        restored, self._restored = self._restored, []
+
+        return restored
+
+    def was_failed(self, url: str) -> bool:
+        """Checks whether the restored link failed during the interrupted
+         crawl.
+
+        :param url: str - direct link to the car
+        :return: bool
+        """
+        return url in self._restored_failed
+
+    def is_completed(self, page: int) -> bool:
+        return page in self._pages
+
+    def complete_page(self, page: int) -> None:
+        """Marks the catalog page as completed (all its links are
+         pending or finished).
+
+        :param page: int - page number
+        :return: None
+        """
+        self._pages.add(page)
+        self._failed_pages.discard(page)
+
+    def fail_page(self, page: int) -> None:
+        """Marks the catalog page as failed (it isn't fetched, so it's
+         crawled again on resume).
+
+        :param page: int - page number
+        :return: None
+        """
+        self._failed_pages.add(page)
+
+    def add_pending(self, url: str) -> None:
+        self._pending.add(url)
+
+    def finish(self, url: str) -> None:
+        """Marks the link as finished (saved, unchanged or unavailable).
+
+        :param url: str - direct link to the car
+        :return: None
+        """
+        self._pending.discard(url)
+
+    def fail(self, url: str) -> None:
+        """Marks the link as failed (retried on resume).
+
+        :param url: str - direct link to the car
+        :return: None
+        """
+        self._pending.discard(url)
+        self._failed.add(url)
+
+    def has_failures(self) -> bool:
+        return bool(self._failed or self._failed_pages)
+
+    def has_pending(self) -> bool:
+        return bool(self._pending)
+
+    def __dumps(self) -> str:
+        return json.dumps({
+            'version': _VERSION,
+            'started_at': self._started.isoformat(),
+            'updated_at': datetime.utcnow().isoformat(),
+            'completed_pages': _to_ranges(self._pages),
+            'failed_pages': _to_ranges(self._failed_pages),
+            'pending': sorted(self._pending),
+            'failed': sorted(self._failed)
+        })
+
+    async def save(self) -> None:
+        """Persists the current progress (serialized in the event loop,
+         written by a thread).
+
+        :return: None
+        """
+        await asyncio.to_thread(replace_file, self._path, self.__dumps())
+
+    async def autosave(self) -> None:
+        """Persists the progress every `interval` seconds (until
+         cancelled).
+
+        :return: None
+        """
+        while True:
+            await asyncio.sleep(self._interval)
+
+            try:
+                await self.save()
+            except OSError as e:
+                logger.error('checkpoint failed, reason: %s', e)
+
+    def clear(self) -> None:
+        """Removes the checkpoint (the crawl is finished).
+
+        :return: None
+        """
+        try:
+            os.remove(self._path)
+        except FileNotFoundError:
+            pass
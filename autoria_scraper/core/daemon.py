@@ -0,0 +1,261 @@
+"""This module contains `Daemon` class - the resident scheduler of
+ catalog sweeps (`python main.py daemon`).
+
+Unlike cron restarts, the process stays alive between sweeps, so the http
+ connection pool, database connections, the listing index and memoized
+ phone numbers are warmed up once. Sweeps are started every `interval`
+ seconds (plus random jitter) and never overlap: an overrunning sweep
+ delays the next one.
+"""
+
+
+import os
+import json
+import time
+import signal
+import random
+import asyncio
+from logging import getLogger
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from autoria_scraper.config import app_config
+from autoria_scraper.core.misc import metrics, replace_file
+
+
+__all__ = ('Daemon',)
+
+
+logger = getLogger(__name__)
+
+_sweeps = metrics.counter(
+    'autoria_daemon_sweeps_total',
+    'Finished catalog sweeps (`ok`, `failed` or `cancelled` on stop).',
+    ('result',)
+)
+_sweep_timestamp = metrics.gauge(
+    'autoria_daemon_sweep_timestamp_seconds',
+    'Start of the last sweep and of the next scheduled one (unix time).',
+    ('sweep',)
+)
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    """Formats unix time (UTC) for the status file.
+
+    :param timestamp: Optional[float] - unix time
+    :return: Optional[str] - ISO 8601 or None
+    """
+    if timestamp is None:
+        return
+
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(
+        timespec='seconds'
+    )
+
+
+class Daemon:
+    """Runs `sweep` periodically until stopped (SIGTERM or cancellation)
+     and keeps its status.
+    """
+
+    def __init__(
+        self,
+        sweep: Callable[[], Awaitable[Dict[str, Any]]],
+        interval: float,
+        jitter: float,
+        status_path: Optional[str] = None
+    ) -> None:
+        """
+        :param sweep: Callable[[], Awaitable[Dict[str, Any]]] - a single
+         crawl of the catalog, returns its summary (json-serializable)
+        :param interval: float - sweeps are started that often (in
+         seconds)
+        :param jitter: float - random delay (up to that amount of seconds)
+         added to each interval, so several daemons don't hit the site
+         at the same moment
+        :param status_path: Optional[str] - status file (json), replaced
+         on each state change, None - not written
+        :return: None
+        """
+        self._sweep = sweep
+        self._interval = interval
+        self._jitter = jitter
+        self._status_path = status_path
+        self._state = 'starting'
+        self._started = time.time()
+        self._sweeps = 0
+        self._failed = 0
+        self._last: Optional[Dict[str, Any]] = None
+        self._next: Optional[float] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(
+        cls,
+        sweep: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> "Daemon":
+        """Creates the daemon configured by `app_config.daemon`.
+
+        :param sweep: Callable[[], Awaitable[Dict[str, Any]]] - a single
+         crawl of the catalog
+        :return: Daemon
+        """
+        config = app_config.daemon
+
+        return cls(
+            sweep=sweep,
+            interval=config.interval,
+            jitter=config.jitter,
+            status_path=config.status_path
+        )
+
+    def status(self) -> Dict[str, Any]:
+        """Current state of the daemon: `sweeping`, `idle` (waiting for
+         the next sweep) or `stopped`, counters and the last sweep.
+
+        :return: Dict[str, Any]
+        """
+        return {
+            'state': self._state,
+            'pid': os.getpid(),
+            'started_at': _isoformat(self._started),
+            'sweeps': self._sweeps,
+            'failed_sweeps': self._failed,
+            'last_sweep': self._last,
+            'next_sweep_at': _isoformat(self._next)
+        }
+
+    def __set_state(self, state: str) -> None:
+        """Changes the state and writes the status file (if enabled).
+
+        :param state: str - new state
+        :return: None
+        """
+        self._state = state
+
+        if self._status_path is None:
+            return
+
+        try:
+            replace_file(
+                self._status_path,
+                json.dumps(self.status(), indent=2)
+            )
+        except OSError as e:
+            logger.warning('daemon status is not written, reason: %s', e)
+
+    def stop(self) -> None:
+        """Stops the daemon: the running sweep is cancelled (its
+         checkpoint is saved), no new sweeps are started.
+
+        :return: None
+        """
+        logger.info('stopping the daemon (state: %s)', self._state)
+
+        if self._stopping is not None:
+            self._stopping.set()
+
+        if self._task is not None:
+            self._task.cancel()
+
+    async def __run_sweep(self) -> None:
+        """Runs a single sweep and records its result, failures are
+         logged (the next sweep is started as usual).
+
+        :return: None
+        """
+        started = time.time()
+        _sweep_timestamp.track(lambda: started, 'last')
+        self.__set_state('sweeping')
+        logger.info('sweep #%d started', self._sweeps + 1)
+
+        self._task = asyncio.create_task(self._sweep())
+
+        try:
+            result, error, outcome = await self._task, None, 'ok'
+        except asyncio.CancelledError:
+            if not self._stopping.is_set():
+                raise
+
+            result, error, outcome = None, 'cancelled', 'cancelled'
+        except Exception as e:
+            logger.exception('sweep #%d failed', self._sweeps + 1)
+            result, error, outcome = None, repr(e), 'failed'
+        finally:
+            self._task = None
+
+        self._sweeps += 1
+        self._failed += outcome == 'failed'
+        _sweeps.inc(outcome)
+        self._last = {
+            'started_at': _isoformat(started),
+            'finished_at': _isoformat(time.time()),
+            'seconds': round(time.time() - started, 3),
+            'result': result,
+            'error': error
+        }
+
+        logger.info(
+            'sweep #%d finished in %.1f sec, %s',
+            self._sweeps,
+            self._last['seconds'],
+            result if error is None else f'error: {error}'
+        )
+
+    async def run(self) -> None:
+        """Runs sweeps until stopped.
+
+        :return: None
+        """
+        self._stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        try:
+            # `docker stop` sends SIGTERM
+            loop.add_signal_handler(signal.SIGTERM, self.stop)
+        except (NotImplementedError, RuntimeError):
+            # not supported by the loop (Windows) or not the main thread
+            pass
+
+        logger.info(
+            'daemon started, sweep interval: %g sec (jitter: up to %g sec)',
+            self._interval,
+            self._jitter
+        )
+
+        try:
+            while not self._stopping.is_set():
+                started = time.time()
+                await self.__run_sweep()
+
+                if self._stopping.is_set():
+                    break
+                # scheduled from the start of the previous sweep, an
+                #  overrunning sweep is followed by the next one at once
+                self._next = max(
+                    started + self._interval
+                    + random.uniform(0, self._jitter),
+                    time.time()
+                )
+                _sweep_timestamp.track(lambda: self._next, 'next')
+                self.__set_state('idle')
+                logger.info('next sweep at %s', _isoformat(self._next))
+
+                try:
+                    await asyncio.wait_for(
+                        self._stopping.wait(),
+                        timeout=self._next - time.time()
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._next = None
+            _sweep_timestamp.track(None, 'next')
+            self.__set_state('stopped')
+
+            try:
+                loop.remove_signal_handler(signal.SIGTERM)
+            except (NotImplementedError, RuntimeError):
+                pass
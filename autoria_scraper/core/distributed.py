@@ -0,0 +1,490 @@
+"""This module contains `Coordinator` and `Worker` classes - coordinator/
+ worker mode, the crawl is shared by any amount of worker processes
+ (hosts) via the database work queue (`autoria_scraper.db.queue`).
+
+coordinator: catalog pages -> queue
+worker: catalog pages (queue) -> direct links -> queue
+worker: direct links (queue) -> parsed entities -> save (db)
+"""
+
+
+import os
+import time
+import socket
+import asyncio
+from logging import getLogger
+from datetime import datetime
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    List,
+    Optional,
+    Tuple
+)
+
+from autoria_scraper.config import app_config
+from autoria_scraper.db.queue import (
+    ClaimedTask,
+    start_crawl,
+    update_crawl,
+    current_crawl,
+    enqueue_tasks,
+    claim_tasks,
+    complete_tasks,
+    fail_tasks,
+    expire_leases,
+    extend_leases,
+    queue_stats,
+    save_heartbeat,
+    list_workers
+)
+from autoria_scraper.core.index import ListingIndex
+from autoria_scraper.core.phones import PhoneCache
+from autoria_scraper.core.misc import metrics, bounded_as_completed
+from autoria_scraper.core.scrapers import CatalogScraper, DirectScraper
+
+
+__all__ = ('Coordinator', 'Worker', 'default_worker_id')
+
+
+logger = getLogger(__name__)
+
+_tasks = metrics.counter(
+    'autoria_worker_tasks_total',
+    'Queue tasks processed by this worker (done or failed).',
+    ('kind', 'result')
+)
+
+
+def default_worker_id() -> str:
+    """Returns the id of the current process, e.g: `host-1234`.
+
+    :return: str
+    """
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+class Coordinator:
+    """Enqueues catalog pages and reports the progress of the crawl
+     until the queue is drained (workers do the rest).
+    """
+
+    def __init__(
+        self,
+        catalog_scraper: "CatalogScraper",
+        max_attempts: int,
+        report_interval: float
+    ) -> None:
+        """
+        :param catalog_scraper: CatalogScraper - used to count and address
+         catalog pages
+        :param max_attempts: int - max amount of claims per task
+        :param report_interval: float - progress report period (in seconds)
+        :return: None
+        """
+        self._catalog_scraper = catalog_scraper
+        self._max_attempts = max_attempts
+        self._report_interval = report_interval
+
+    @classmethod
+    def from_config(cls) -> "Coordinator":
+        """Creates the coordinator configured by `app_config`.
+
+        :return: Coordinator
+        """
+        config = app_config.scraper
+
+        return cls(
+            catalog_scraper=CatalogScraper(
+                root_url=config.root_url.__str__(),
+                batch_size=config.catalog_concurrency or config.batch_size,
+                pages_limit=config.pages_limit
+            ),
+            max_attempts=app_config.distributed.max_attempts,
+            report_interval=app_config.distributed.report_interval
+        )
+
+    async def run(self) -> None:
+        """Enqueues catalog pages (finished pages of previous crawls are
+         queued again) and waits until all tasks are finished.
+
+        The crawl is recorded first: workers don't exit on an empty (or
+         drained by the previous crawl) queue until its pages are queued.
+
+        :return: None
+        """
+        started = datetime.utcnow()
+        crawl_id = await start_crawl()
+
+        try:
+            await self.__run(started, crawl_id)
+        except Exception:
+            await update_crawl(crawl_id, 'failed')
+
+            raise
+
+        await update_crawl(crawl_id, 'finished')
+
+        logger.info('queue is drained, crawl finished')
+
+    async def __run(self, started: datetime, crawl_id: int) -> None:
+        """Enqueues catalog pages and reports the progress until the queue
+         is drained.
+
+        :param started: datetime - start of the crawl (UTC)
+        :param crawl_id: int - id of the crawl
+        :return: None
+        """
+        pages_count = await self._catalog_scraper.count_pages()
+        queued = await enqueue_tasks(
+            'catalog',
+            [
+                self._catalog_scraper.page_url(page)
+                for page in range(1, pages_count + 1)
+            ],
+            requeue_before=started
+        )
+        await update_crawl(crawl_id, 'running')
+
+        logger.info(
+            'pages discovered: %d, queued: %d',
+            pages_count,
+            queued
+        )
+
+        while True:
+            await asyncio.sleep(self._report_interval)
+            # crashed workers don't release their tasks
+            await expire_leases(self._max_attempts)
+
+            stats = await queue_stats()
+
+            logger.info(
+                'queue: %s',
+                ', '.join(
+                    f'{kind}/{status}: {count}'
+                    for (kind, status), count in sorted(stats.items())
+                )
+            )
+
+            for worker_id, processed, failed, since, seen in (
+                await list_workers(since=started)
+            ):
+                logger.info(
+                    'worker %s: processed: %d, failed: %d, %.2f tasks/sec',
+                    worker_id,
+                    processed,
+                    failed,
+                    processed / max((seen - since).total_seconds(), 1)
+                )
+
+            if not any(
+                count
+                for (_, status), count in stats.items()
+                if status in ('pending', 'leased')
+            ):
+                break
+
+
+class Worker:
+    """Claims tasks from the queue and processes them: catalog pages
+     are turned into direct links (queued as well), direct links into
+     saved entities.
+    Waits for the crawl of the coordinator and exits once its pages are
+     queued and the queue has no pending or leased tasks.
+    """
+
+    def __init__(
+        self,
+        worker_id: str,
+        catalog_scraper: "CatalogScraper",
+        direct_scraper: "DirectScraper",
+        save: Callable[[List[Any]], Awaitable[bool]],
+        claim_size: int,
+        lease_seconds: float,
+        max_attempts: int,
+        poll_interval: float,
+        report_interval: float,
+        wait_timeout: float
+    ) -> None:
+        """
+        :param worker_id: str - unique id of the worker (lease owner)
+        :param catalog_scraper: CatalogScraper - used to process catalog
+         pages
+        :param direct_scraper: DirectScraper - used to process direct links
+        :param save: Callable[[List[Any]], Awaitable[bool]] - persists
+         a batch of parsed entities, returns False if it isn't saved
+        :param claim_size: int - amount of tasks claimed (and processed
+         concurrently) at once
+        :param lease_seconds: float - lease duration, extended on each
+         heartbeat
+        :param max_attempts: int - max amount of claims per task
+        :param poll_interval: float - idle period (in seconds)
+        :param report_interval: float - heartbeat period (in seconds)
+        :param wait_timeout: float - the worker exits if no crawl is
+         started by the coordinator within that period (in seconds)
+        :return: None
+        """
+        self._worker_id = worker_id
+        self._catalog_scraper = catalog_scraper
+        self._direct_scraper = direct_scraper
+        self._save = save
+        self._claim_size = claim_size
+        self._lease_seconds = lease_seconds
+        self._max_attempts = max_attempts
+        self._poll_interval = poll_interval
+        self._report_interval = report_interval
+        self._wait_timeout = wait_timeout
+        self._processed = self._failed = 0
+        # the crawl seen in progress by this worker
+        self._crawl_id: Optional[int] = None
+
+    @classmethod
+    def from_config(
+        cls,
+        worker_id: str,
+        save: Callable[[List[Any]], Awaitable[bool]],
+        index: Optional["ListingIndex"] = None,
+        phones: Optional["PhoneCache"] = None
+    ) -> "Worker":
+        """Creates the worker configured by `app_config`.
+
+        :param worker_id: str - unique id of the worker (lease owner)
+        :param save: Callable[[List[Any]], Awaitable[bool]] - persists
+         a batch of parsed entities, returns False if it isn't saved
+        :param index: Optional[ListingIndex] - listings known from
+         previous runs
+        :param phones: Optional[PhoneCache] - memoized phone numbers
+        :return: Worker
+        """
+        config = app_config.scraper
+        distributed = app_config.distributed
+
+        return cls(
+            worker_id=worker_id,
+            catalog_scraper=CatalogScraper(
+                root_url=config.root_url.__str__(),
+                batch_size=config.catalog_concurrency or config.batch_size,
+                index=index,
+                recheck=config.recheck_known
+            ),
+            direct_scraper=DirectScraper(
+                phone_url=config.phone_url.__str__(),
+                batch_size=config.direct_concurrency or config.batch_size,
+                phones=phones,
+                index=index
+            ),
+            save=save,
+            claim_size=distributed.claim_size or config.batch_size,
+            lease_seconds=distributed.lease_seconds,
+            max_attempts=distributed.max_attempts,
+            poll_interval=distributed.poll_interval,
+            report_interval=distributed.report_interval,
+            wait_timeout=distributed.wait_timeout
+        )
+
+    async def __catalog_task(
+        self,
+        task: "ClaimedTask"
+    ) -> Tuple[int, bool, None]:
+        """Queues direct links of the catalog page.
+
+        :param task: ClaimedTask - catalog page
+        :return: Tuple[int, bool, None] - task id, success flag
+        """
+        try:
+            links, _ = await self._catalog_scraper.extract_links(task.url)
+            # links processed by a previous crawl are queued again (stored
+            #  listings are already filtered out unless `recheck` is set)
+            await enqueue_tasks(
+                'direct',
+                links,
+                requeue_before=task.datetime_queued
+            )
+        except Exception as e:
+            logger.error('catalog task failed: %s, reason: %s', task.url, e)
+
+            return task.id, False, None
+
+        return task.id, True, None
+
+    async def __direct_task(
+        self,
+        task: "ClaimedTask"
+    ) -> Tuple[int, bool, Optional[Any]]:
+        """Extracts the entity from the direct link.
+
+        :param task: ClaimedTask - direct link
+        :return: Tuple[int, bool, Optional[Any]] - task id, success flag
+         and parsed entity (None if unavailable or unchanged), pages which
+         aren't fetched are failed
+        """
+        try:
+            return task.id, True, await self._direct_scraper.extract(task.url)
+        except Exception as e:
+            logger.error('direct task failed: %s, reason: %s', task.url, e)
+
+            return task.id, False, None
+
+    async def __process(
+        self,
+        kind: str,
+        tasks: List["ClaimedTask"]
+    ) -> None:
+        """Processes claimed tasks concurrently, saves parsed entities and
+         releases the tasks (entities are saved before tasks are marked
+         as done, so a crash or a failed save leads to a retry, not to
+         a loss).
+
+        :param kind: str - `catalog` or `direct`
+        :param tasks: List[ClaimedTask] - claimed tasks of the kind
+        :return: None
+        """
+        handler = (
+            self.__catalog_task if kind == 'catalog' else self.__direct_task
+        )
+        done, failed, entities = [], [], {}
+
+        async for task_id, ok, entity in bounded_as_completed(
+            aws=(handler(task) for task in tasks),
+            limit=self._claim_size
+        ):
+            (done if ok else failed).append(task_id)
+
+            if entity is not None:
+                entities[task_id] = entity
+
+        if entities and not await self._save(list(entities.values())):
+            # tasks of the batch which isn't saved are retried
+            logger.error('batch is not saved, tasks: %d', len(entities))
+            done = [task_id for task_id in done if task_id not in entities]
+            failed.extend(entities)
+
+        await complete_tasks(self._worker_id, done)
+        await fail_tasks(self._worker_id, failed, self._max_attempts)
+
+        self._processed += len(done)
+        self._failed += len(failed)
+        _tasks.inc(kind, 'done', amount=len(done))
+        _tasks.inc(kind, 'failed', amount=len(failed))
+
+    async def __heartbeat(self, started: datetime) -> None:
+        """Extends leases and stores worker counters, logs throughput.
+
+        :param started: datetime - worker start datetime (UTC)
+        :return: None
+        """
+        await extend_leases(self._worker_id, self._lease_seconds)
+        await save_heartbeat(
+            self._worker_id,
+            started,
+            self._processed,
+            self._failed
+        )
+
+    async def __heartbeats(self, started: datetime) -> None:
+        """Runs `.__heartbeat()` periodically (until cancelled).
+
+        :param started: datetime - worker start datetime (UTC)
+        :return: None
+        """
+        clock = time.monotonic()
+
+        while True:
+            await asyncio.sleep(self._report_interval)
+
+            try:
+                await self.__heartbeat(started)
+            except Exception as e:
+                logger.error('heartbeat failed, reason: %s', e)
+
+            logger.info(
+                'worker %s: processed: %d, failed: %d, %.2f tasks/sec',
+                self._worker_id,
+                self._processed,
+                self._failed,
+                self._processed / (time.monotonic() - clock)
+            )
+
+    async def __is_over(self, clock: float) -> bool:
+        """Checks whether the worker has nothing to wait for: pages of
+         the crawl are queued and the queue has no pending or leased
+         tasks. A crawl which is over before the worker has seen it in
+         progress (a previous one) doesn't count.
+
+        :param clock: float - start of the worker (`time.monotonic()`)
+        :return: bool
+        """
+        crawl = await current_crawl()
+
+        if crawl is not None and crawl.status in ('starting', 'running'):
+            self._crawl_id = crawl.id
+
+        if crawl is None or crawl.id != self._crawl_id:
+            if time.monotonic() - clock < self._wait_timeout:
+                return False
+
+            logger.warning(
+                'no crawl is started within %g sec, exiting',
+                self._wait_timeout
+            )
+
+            return True
+
+        if crawl.status == 'starting':
+            # catalog pages aren't queued yet
+            return False
+
+        return not any(
+            count
+            for (_, status), count in (await queue_stats()).items()
+            if status in ('pending', 'leased')
+        )
+
+    async def run(self) -> None:
+        """Processes tasks until the queue is drained. Catalog pages go
+         first, so the queue of direct links grows as soon as possible.
+
+        :return: None
+        """
+        started = datetime.utcnow()
+        clock = time.monotonic()
+        heartbeats = asyncio.create_task(self.__heartbeats(started))
+
+        logger.info('worker %s started', self._worker_id)
+
+        try:
+            while True:
+                for kind in ('catalog', 'direct'):
+                    tasks = await claim_tasks(
+                        kind,
+                        self._worker_id,
+                        self._claim_size,
+                        self._lease_seconds
+                    )
+
+                    if tasks:
+                        await self.__process(kind, tasks)
+
+                        break
+                else:
+                    # tasks of crashed workers are returned to the queue
+                    await expire_leases(self._max_attempts)
+
+                    if await self.__is_over(clock):
+                        break
+                    # the crawl isn't started yet, or other workers still
+                    #  process their tasks (those may produce new ones)
+                    await asyncio.sleep(self._poll_interval)
+        finally:
+            heartbeats.cancel()
+
+        await self.__heartbeat(started)
+
+        logger.info(
+            'worker %s finished, processed: %d, failed: %d',
+            self._worker_id,
+            self._processed,
+            self._failed
+        )
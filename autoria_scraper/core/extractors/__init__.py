@@ -0,0 +1,45 @@
+"""This package contains extraction engines.
+
+Each engine module provides the same set of functions:
+    - `extract_pages_count(markup: bytes) -> int`
+    - `extract_links(markup: bytes) -> List[str]`
+    - `extract_car(markup: bytes, url: str) -> Optional[Tuple[dict, dict]]`
+
+Functions receive raw response bytes and return only the small extracted
+ result (plain python objects), so they can be executed in worker processes
+ (see `autoria_scraper.core.misc.executor`).
+
+Engines:
+    - `tree` - single-pass `lxml` engine (selectors are compiled once),
+        also provides `StreamExtractor` - the same functions applied to
+        response chunks while the page is downloaded
+    - `soup` - `BeautifulSoup` engine (reference implementation)
+
+! keep this package free of `autoria_scraper.core.misc` imports, worker
+ processes import it on their own
+"""
+
+
+from types import ModuleType
+from importlib import import_module
+
+
+__all__ = ('ENGINES', 'engine')
+
+
+# engine name -> module name, modules are imported on first use (e.g.
+#  `bs4` isn't imported at all unless the reference engine is needed)
+ENGINES = {
+    'lxml': 'tree',
+    'bs4': 'soup'
+}
+
+
+def engine(name: str) -> ModuleType:
+    """Returns the module of the extraction engine (imported on first
+     call).
+
+    :param name: str - engine name, one of `ENGINES` keys
+    :return: ModuleType
+    """
+    return import_module(f'{__name__}.{ENGINES[name]}')
@@ -0,0 +1,98 @@
+"""This module contains helpers shared by extraction engines."""
+
+
+import re
+from typing import Any, Dict, Optional, Tuple
+
+from autoria_scraper.core.parsers import CarParser, PhoneNumberParser
+
+
+__all__ = ('build_car', 'search_owner_id', 'OwnerIdScanner')
+
+
+# seller id is stored in `data-owner-id` attribute of some tag
+_OWNER_ID_PATTERN = r'data-owner-id="(\d*)"'
+_OWNER_ID_BYTES = re.compile(_OWNER_ID_PATTERN.encode())
+# a match split between chunks is found in the tail of the previous chunk
+#  joined with the next one
+_OWNER_ID_OVERLAP: int = 64
+
+
+def build_car(
+    url: str,
+    raw: Dict[str, Optional[str]]
+) -> Tuple["CarParser", "PhoneNumberParser"]:
+    """Converts raw strings extracted by an engine to the final result.
+
+    :param url: str - direct link to the car
+    :param raw: Dict[str, Optional[str]] - raw strings, keys are names of
+     `CarParser.parse` params and `PhoneNumberParser` fields
+    :return: Tuple[CarParser, PhoneNumberParser] - car record (phone
+     number is obtained later, see `DirectScraper`) and pieces of phone
+     number
+    """
+    return (
+        CarParser.parse(
+            url=url,
+            title=raw['title'],
+            price_usd=raw['price_usd'],
+            odometer=raw['odometer'],
+            username=raw['username'],
+            image_url=raw['image_url'],
+            images_count=raw['images_count'],
+            car_number=raw['car_number'],
+            car_vin=raw['car_vin']
+        ),
+        PhoneNumberParser(
+            auto_id=raw['auto_id'],
+            phone_id=raw['phone_id'],
+            user_id=raw['user_id']
+        )
+    )
+
+
+def search_owner_id(markup: Any) -> str:
+    """Searches seller id in the given markup.
+
+    :param markup: Any - `str` or `bytes`
+    :return: str - seller id
+    """
+    if isinstance(markup, bytes):
+        return (
+            re
+            .search(_OWNER_ID_PATTERN.encode(), markup)
+            .group(1)
+            .decode()
+        )
+
+    return re.search(_OWNER_ID_PATTERN, markup).group(1)
+
+
+class OwnerIdScanner:
+    """Same as `search_owner_id`, but the markup is received chunk by
+     chunk (see `tree.StreamExtractor`).
+    """
+
+    __slots__ = ('_tail', 'owner_id')
+
+    def __init__(self) -> None:
+        self._tail = b''
+        # seller id, None until found
+        self.owner_id: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> None:
+        """Searches seller id in the chunk (until found).
+
+        :param chunk: bytes - the next chunk of raw html
+        :return: None
+        """
+        if self.owner_id is not None:
+            return
+
+        window = self._tail + chunk
+        match = _OWNER_ID_BYTES.search(window)
+
+        if match is not None:
+            self.owner_id = match.group(1).decode()
+        else:
+            self._tail = window[-_OWNER_ID_OVERLAP:]
@@ -0,0 +1,143 @@
+"""This module contains `BeautifulSoup` extraction engine.
+
+Reference implementation, used as a fallback for `tree` engine.
+"""
+
+
+from typing import List, Optional, Tuple
+
+from bs4 import BeautifulSoup, Tag
+
+from autoria_scraper.core.parsers import CarParser, PhoneNumberParser
+from autoria_scraper.core.extractors._common import build_car, search_owner_id
+from autoria_scraper.core.selectors import (
+    CarSelectors,
+    ListedSelectors,
+    PaginationSelectors
+)
+
+
+__all__ = ('extract_pages_count', 'extract_links', 'extract_car')
+
+
+def _soup(markup: bytes) -> "BeautifulSoup":
+    """Builds a `BeautifulSoup` tree from raw response bytes.
+
+    :param markup: bytes - raw html
+    :return: BeautifulSoup
+    """
+    return BeautifulSoup(markup=markup, features='lxml')
+
+
+def _text(tag: Optional["Tag"]) -> Optional[str]:
+    """Returns stripped text content of the tag.
+
+    :param tag: Optional[Tag] - tag
+    :return: Optional[str] - text or None if tag is None
+    """
+    if tag is not None:
+        return tag.get_text(strip=True)
+
+
+def extract_pages_count(markup: bytes) -> int:
+    """Extracts the total amount of catalog pages.
+
+    :param markup: bytes - raw html of the catalog page
+    :return: int - number of pages
+    """
+    # AutoRia pagination has a hidden link widget
+    # text of that link follows format: '{current_page} / {total_pages}'
+    # example: "1 / 18 100", so we have to parse it
+    # split string by '/' and take the last element, in result: " 18 100"
+    # then replace spaces with "" and convert that value to int
+    return int(
+        _soup(markup)
+        .find(**PaginationSelectors.container)
+        .find(**PaginationSelectors.link)
+        .get_text(strip=True)
+        .split('/')[-1]
+        .replace(' ', '')
+    )
+
+
+def extract_links(markup: bytes) -> List[str]:
+    """Extracts all listing links from the catalog page.
+
+    :param markup: bytes - raw html of the catalog page
+    :return: List[str] - the list of links
+    """
+    return [
+        tag.get('href')
+        for tag in _soup(markup).find_all(**ListedSelectors.link)
+    ]
+
+
+def extract_car(
+    markup: bytes,
+    url: str
+) -> Optional[Tuple["CarParser", "PhoneNumberParser"]]:
+    """Extracts all necessary data from the direct page, except the phone
+     number, which requires an additional request.
+
+    :param markup: bytes - raw html of the direct page
+    :param url: str - direct link to the car
+    :return: Optional[Tuple[CarParser, PhoneNumberParser]] - car record
+     and pieces of phone number, None if the listing is unavailable
+    """
+    response = _soup(markup)
+    # first of all, we've to check the availability of the car
+    # in some cases, car's page is accessible, but still not listed
+    #  (doesn't have any data) and the following message appears:
+    #  "Оголошення ... ще не опубліковане і не бере участі в пошуку"
+    # so, we've to check the presence of specific tag `car_unavailable`
+    # and if it's present -> skip
+    if response.find(**CarSelectors.unavailable) is not None:
+        return
+
+    _checked_vin = response.find(**CarSelectors.vin_checked)
+    _unchecked_vin = response.find(**CarSelectors.vin_unchecked)
+    # sometimes `car_vin` may be absent in the regular place
+    # we choose between `_checked_vin` and `_unchecked_vin`
+    # None value is still possible, but it's OK
+    car_vin = _checked_vin or _unchecked_vin
+    car_number = response.find(**CarSelectors.state_number)
+    price_usd = (
+        response
+        .find(**CarSelectors.price_container)
+        .find(**CarSelectors.price)
+    )
+    images_count = (
+        response
+        .find_all(**CarSelectors.images_count_container)
+        [0]
+        .find(**CarSelectors.images_count)
+    )
+
+    return build_car(url, {
+        'car_vin': _text(car_vin),
+        'title': _text(response.find_all(**CarSelectors.title)[-1]),
+        'username': _text(response.find(**CarSelectors.username)),
+        'price_usd': _text(price_usd),
+        'odometer': _text(response.find(**CarSelectors.odometer)),
+        # only direct children strings, nested tags contain region info
+        'car_number': ''.join(
+            car_number.find_all(string=True, recursive=False)
+        ) if car_number is not None else None,
+        'image_url': (
+            response
+            .find_all(**CarSelectors.image_url)[1]
+            .get('srcset')
+        ),
+        'images_count': _text(images_count),
+        'auto_id': (
+            response
+            .find(**CarSelectors.phone_number_auto_id)
+            .get('data-auto-id')
+        ),
+        'phone_id': (
+            response
+            .find(**CarSelectors.phone_number_phone_id)
+            .get('data-value-id')
+        ),
+        'user_id': search_owner_id(response.__str__())
+    })
@@ -0,0 +1,744 @@
+"""This module contains single-pass `lxml` extraction engine.
+
+Selectors from `autoria_scraper.core.selectors` are compiled once (on
+ import) into plans. Each plan collects all of its fields during a single
+ walk over the document, instead of a separate `find`/`find_all` traversal
+ per field.
+
+Matching rules follow `BeautifulSoup` ones: `name` - tag name,
+ `class_` - one of the classes, `id` and `attrs` - exact values.
+"""
+
+
+import re
+import time
+from operator import methodcaller
+from collections import defaultdict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple
+)
+
+from lxml import etree
+
+from autoria_scraper.core.parsers import CarParser, PhoneNumberParser
+from autoria_scraper.core.extractors._common import (
+    build_car,
+    search_owner_id,
+    OwnerIdScanner
+)
+from autoria_scraper.core.selectors import (
+    CarSelectors,
+    ListedSelectors,
+    PaginationSelectors
+)
+
+
+__all__ = (
+    'extract_pages_count',
+    'extract_links',
+    'extract_car',
+    'StreamExtractor'
+)
+
+
+# `BeautifulSoup` doesn't treat contents of these tags as text
+_NON_TEXT_TAGS = frozenset(('script', 'style', 'template'))
+# declared encoding is usually placed at the very beginning of the document
+_CHARSET_PATTERN = re.compile(
+    rb'<meta[^>]+charset=["\']?([\w-]+)',
+    flags=re.IGNORECASE
+)
+_HEAD_SIZE: int = 4096
+# parsers are reusable, one per encoding
+_parsers: Dict[str, "etree.HTMLParser"] = {}
+
+
+class _Matcher:
+    """Compiled `_Selector`."""
+
+    __slots__ = ('name', 'id', 'class_', 'attrs')
+
+    def __init__(self, selector: Dict[str, Any]) -> None:
+        self.name: Optional[str] = selector.get('name')
+        self.id: Optional[str] = selector.get('id')
+        self.class_: Optional[str] = selector.get('class_')
+        self.attrs: Tuple[Tuple[str, str], ...] = tuple(
+            selector.get('attrs', {}).items()
+        )
+
+    def __call__(self, element: "etree._Element") -> bool:
+        if self.id is not None and element.get('id') != self.id:
+            return False
+
+        if self.class_ is not None:
+            classes = element.get('class')
+
+            if classes is None or (
+                self.class_ not in classes.split()
+                and self.class_ != classes
+            ):
+                return False
+
+        for key, value in self.attrs:
+            if element.get(key) != value:
+                return False
+
+        return True
+
+
+class _Field(NamedTuple):
+    """Field of `_Plan`, the matched element is converted to `value`."""
+    selector: Dict[str, Any]
+    # n-th matched element (`find_all(...)[index]`), -1 - the last one,
+    #  None - all matched elements
+    index: Optional[int]
+    value: Callable[["etree._Element"], Any]
+    # False if `value` needs attributes only, so it's taken as soon as
+    #  the element starts (see `StreamExtractor`)
+    content: bool = True
+
+
+class _Plan:
+    """Collects elements for multiple selectors during a single walk.
+
+    Each field is defined as `_Field(selector, index, value)`:
+        - index >= 0 - n-th matched element (`find_all(...)[index]`)
+        - index == -1 - the last matched element
+        - index is None - all matched elements
+    """
+
+    def __init__(
+        self,
+        fields: Dict[str, "_Field"],
+        abort: Optional[str] = None
+    ) -> None:
+        """
+        :param fields: Dict[str, _Field] - fields
+        :param abort: Optional[str] - field name, the walk is stopped as soon
+         as this field is found
+        :return: None
+        """
+        self.fields = fields
+        self.abort = abort
+        # matchers are grouped by tag name, so each element is checked
+        #  against relevant matchers only
+        self._by_name = defaultdict(list)
+        self._any = []
+        # fields which can be completed before the end of the document
+        self._finite = frozenset(
+            key
+            for key, field in fields.items()
+            if field.index is not None and field.index >= 0
+        )
+        self._complete_on_finite = len(self._finite) == len(fields)
+
+        for key, field in fields.items():
+            matcher = _Matcher(field.selector)
+            entry = (key, matcher, field.index)
+
+            if matcher.name is None:
+                self._any.append(entry)
+            else:
+                self._by_name[matcher.name].append(entry)
+
+    def match(
+        self,
+        element: "etree._Element",
+        counts: Dict[str, int],
+        done: Set[str]
+    ) -> List[str]:
+        """Returns names of fields the element belongs to, `index >= 0`
+         fields are marked as done once their element is found.
+
+        :param element: etree._Element - the next element in document
+         order
+        :param counts: Dict[str, int] - elements matched so far (state of
+         the walk)
+        :param done: Set[str] - completed fields (state of the walk)
+        :return: List[str]
+        """
+        matched = []
+
+        for key, matcher, index in (
+            *self._by_name.get(element.tag, ()),
+            *self._any
+        ):
+            if key in done or not matcher(element):
+                continue
+
+            if index is not None and index >= 0:
+                if counts[key] < index:
+                    counts[key] += 1
+
+                    continue
+
+                done.add(key)
+
+            matched.append(key)
+
+        return matched
+
+    def is_complete(self, done: Set[str]) -> bool:
+        """Checks whether the rest of the document can't change the result.
+
+        :param done: Set[str] - completed fields (state of the walk)
+        :return: bool
+        """
+        return self._complete_on_finite and len(done) == len(self._finite)
+
+    def run(self, elements: Iterable["etree._Element"]) -> Dict[str, Any]:
+        """Walks given elements once and collects matched ones.
+
+        :param elements: Iterable[etree._Element] - elements in document
+         order
+        :return: Dict[str, Any] - field name -> element (list of elements
+         for `index=None` fields), missing fields are absent
+        """
+        found: Dict[str, Any] = {}
+        counts: Dict[str, int] = defaultdict(int)
+        done = set()
+
+        for element in elements:
+            # most elements aren't relevant at all
+            if not self._any and element.tag not in self._by_name:
+                continue
+
+            for key in self.match(element, counts, done):
+                if self.fields[key].index is None:
+                    found.setdefault(key, []).append(element)
+                else:
+                    found[key] = element
+
+                if key == self.abort:
+                    return found
+
+            if self.is_complete(done):
+                break
+
+        return found
+
+    def extract(
+        self,
+        elements: Iterable["etree._Element"]
+    ) -> Dict[str, Any]:
+        """Same as `.run()`, but matched elements are converted to values
+         of their fields.
+
+        :param elements: Iterable[etree._Element] - elements in document
+         order
+        :return: Dict[str, Any] - field name -> value (list of values for
+         `index=None` fields), missing fields are absent
+        """
+        return {
+            key: (
+                [self.fields[key].value(element) for element in found]
+                if self.fields[key].index is None
+                else self.fields[key].value(found)
+            )
+            for key, found in self.run(elements).items()
+        }
+
+
+def _encoding(markup: bytes) -> str:
+    """Detects the encoding declared at the beginning of the document.
+
+    :param markup: bytes - raw html (at least `_HEAD_SIZE` bytes of it)
+    :return: str - encoding, `utf-8` if not declared
+    """
+    match = _CHARSET_PATTERN.search(markup, 0, _HEAD_SIZE)
+
+    return match.group(1).decode().lower() if match else 'utf-8'
+
+
+def _tree(markup: bytes) -> "etree._Element":
+    """Parses raw response bytes.
+
+    :param markup: bytes - raw html
+    :return: etree._Element - root element
+    """
+    encoding = _encoding(markup)
+
+    if encoding not in _parsers:
+        _parsers[encoding] = etree.HTMLParser(encoding=encoding)
+
+    return etree.fromstring(markup, parser=_parsers[encoding])
+
+
+def _elements(root: "etree._Element") -> Iterator["etree._Element"]:
+    """Iterates over elements only (no comments and processing
+     instructions).
+
+    :param root: etree._Element - root element
+    :return: Iterator[etree._Element]
+    """
+    return root.iter(etree.Element)
+
+
+def _descendants(element: "etree._Element") -> Iterator["etree._Element"]:
+    """Same as `_elements`, but the element itself is skipped.
+
+    :param element: etree._Element - container element
+    :return: Iterator[etree._Element]
+    """
+    return element.iterdescendants(etree.Element)
+
+
+def _strings(element: "etree._Element") -> Iterator[str]:
+    """Yields text nodes of the element (same as `Tag.strings`).
+
+    :param element: etree._Element - element
+    :return: Iterator[str]
+    """
+    if element.tag in _NON_TEXT_TAGS:
+        return
+
+    if element.text:
+        yield element.text
+
+    for child in element:
+        # comments and processing instructions have non-str tags
+        if isinstance(child.tag, str):
+            yield from _strings(child)
+
+        if child.tail:
+            yield child.tail
+
+
+def _text(element: Optional["etree._Element"]) -> Optional[str]:
+    """Same as `Tag.get_text(strip=True)`.
+
+    :param element: Optional[etree._Element] - element
+    :return: Optional[str] - text or None if element is None
+    """
+    if element is not None:
+        return ''.join(string.strip() for string in _strings(element))
+
+
+def _own_text(element: Optional["etree._Element"]) -> Optional[str]:
+    """Same as `''.join(tag.find_all(string=True, recursive=False))`.
+
+    :param element: Optional[etree._Element] - element
+    :return: Optional[str] - text or None if element is None
+    """
+    if element is not None:
+        return (element.text or '') + ''.join(
+            child.tail for child in element if child.tail
+        )
+
+
+def _pagination_text(container: "etree._Element") -> str:
+    """Text of the pagination link, e.g: "1 / 18 100".
+
+    :param container: etree._Element - pagination container
+    :return: str
+    """
+    return _text(_PAGINATION_LINK.run(_descendants(container))['link'])
+
+
+def _nested_text(plan: "_Plan") -> Callable[["etree._Element"], Any]:
+    """Returns `value` of a container field: text of the element found
+     by `plan` among descendants of the container.
+
+    :param plan: _Plan - plan of the nested field (`value`)
+    :return: Callable[[etree._Element], Any]
+    """
+    def value(container: "etree._Element") -> Optional[str]:
+        return _text(plan.run(_descendants(container)).get('value'))
+
+    return value
+
+
+def _found(_: "etree._Element") -> bool:
+    return True
+
+
+_PAGINATION_LINK = _Plan({
+    'link': _Field(PaginationSelectors.link, 0, _text)
+})
+_PAGINATION_CONTAINER = _Plan({
+    'container': _Field(PaginationSelectors.container, 0, _pagination_text)
+})
+_LINK = _Field(ListedSelectors.link, None, methodcaller('get', 'href'), False)
+_LISTED = _Plan({'link': _LINK})
+# listings are followed by the pagination, the rest of the catalog page
+#  isn't downloaded by `StreamExtractor`
+_LISTED_STREAM = _Plan(
+    {
+        'link': _LINK,
+        'end': _Field(PaginationSelectors.container, 0, _found, False)
+    },
+    abort='end'
+)
+# nested selectors, applied to descendants of the found container
+_CAR_PRICE = _Plan({'value': _Field(CarSelectors.price, 0, _text)})
+_CAR_IMAGES_COUNT = _Plan({
+    'value': _Field(CarSelectors.images_count, 0, _text)
+})
+_CAR = _Plan(
+    {
+        'unavailable': _Field(CarSelectors.unavailable, 0, _found, False),
+        'vin_checked': _Field(CarSelectors.vin_checked, 0, _text),
+        'vin_unchecked': _Field(CarSelectors.vin_unchecked, 0, _text),
+        'price_container': _Field(
+            CarSelectors.price_container,
+            0,
+            _nested_text(_CAR_PRICE)
+        ),
+        'title': _Field(CarSelectors.title, -1, _text),
+        'odometer': _Field(CarSelectors.odometer, 0, _text),
+        'username': _Field(CarSelectors.username, 0, _text),
+        'state_number': _Field(CarSelectors.state_number, 0, _own_text),
+        'images_count_container': _Field(
+            CarSelectors.images_count_container,
+            0,
+            _nested_text(_CAR_IMAGES_COUNT)
+        ),
+        'image_url': _Field(
+            CarSelectors.image_url,
+            1,
+            methodcaller('get', 'srcset'),
+            False
+        ),
+        'phone_id': _Field(
+            CarSelectors.phone_number_phone_id,
+            0,
+            methodcaller('get', 'data-value-id'),
+            False
+        ),
+        'auto_id': _Field(
+            CarSelectors.phone_number_auto_id,
+            0,
+            methodcaller('get', 'data-auto-id'),
+            False
+        ),
+    },
+    # nothing to extract if the listing is unavailable
+    abort='unavailable'
+)
+
+
+def _pages_count(found: Dict[str, Any]) -> int:
+    """Converts extracted values of `_PAGINATION_CONTAINER`.
+
+    :param found: Dict[str, Any] - extracted values
+    :return: int - number of pages
+    """
+    # example: "1 / 18 100" -> 18100
+    return int(found['container'].split('/')[-1].replace(' ', ''))
+
+
+def _links(found: Dict[str, Any]) -> List[str]:
+    """Converts extracted values of `_LISTED`.
+
+    :param found: Dict[str, Any] - extracted values
+    :return: List[str] - the list of links
+    """
+    return found.get('link', [])
+
+
+def _car(
+    found: Dict[str, Any],
+    url: str,
+    user_id: Optional[str]
+) -> Optional[Tuple["CarParser", "PhoneNumberParser"]]:
+    """Converts extracted values of `_CAR`.
+
+    :param found: Dict[str, Any] - extracted values
+    :param url: str - direct link to the car
+    :param user_id: Optional[str] - seller id
+    :return: Optional[Tuple[CarParser, PhoneNumberParser]]
+    """
+    if 'unavailable' in found:
+        return
+
+    if user_id is None:
+        raise ValueError('seller id is not found')
+
+    return build_car(url, {
+        # sometimes `car_vin` may be absent in the regular place
+        'car_vin': (
+            found['vin_checked']
+            if 'vin_checked' in found
+            else found.get('vin_unchecked')
+        ),
+        'title': found['title'],
+        'username': found.get('username'),
+        'price_usd': found['price_container'],
+        'odometer': found.get('odometer'),
+        'car_number': found.get('state_number'),
+        'image_url': found['image_url'],
+        'images_count': found['images_count_container'],
+        'auto_id': found['auto_id'],
+        'phone_id': found['phone_id'],
+        'user_id': user_id
+    })
+
+
+def extract_pages_count(markup: bytes) -> int:
+    """Extracts the total amount of catalog pages.
+
+    :param markup: bytes - raw html of the catalog page
+    :return: int - number of pages
+    """
+    return _pages_count(
+        _PAGINATION_CONTAINER.extract(_elements(_tree(markup)))
+    )
+
+
+def extract_links(markup: bytes) -> List[str]:
+    """Extracts all listing links from the catalog page.
+
+    :param markup: bytes - raw html of the catalog page
+    :return: List[str] - the list of links
+    """
+    return _links(_LISTED.extract(_elements(_tree(markup))))
+
+
+def extract_car(
+    markup: bytes,
+    url: str
+) -> Optional[Tuple["CarParser", "PhoneNumberParser"]]:
+    """Extracts all necessary data from the direct page, except the phone
+     number, which requires an additional request.
+
+    :param markup: bytes - raw html of the direct page
+    :param url: str - direct link to the car
+    :return: Optional[Tuple[CarParser, PhoneNumberParser]] - car record
+     and pieces of phone number, None if the listing is unavailable
+    """
+    found = _CAR.extract(_elements(_tree(markup)))
+
+    if 'unavailable' in found:
+        return
+    # reading seller id right from raw bytes, no need to serialize
+    #  the whole tree back
+    return _car(found, url, search_owner_id(markup))
+
+
+class StreamExtractor:
+    """Incremental counterpart of extraction functions: raw html is fed
+     chunk by chunk as it's downloaded, fields are extracted on the fly.
+
+    Attribute values are taken as soon as the element starts, texts once
+     the element is parsed. Elements which aren't needed anymore are
+     removed from the tree, so the memory footprint stays small whatever
+     the size of the page is. Once the rest of the document can't change
+     the result (e.g. the pagination is found, the listing is unavailable),
+     `.feed()` returns True and the download can be aborted.
+
+    **Usage example**
+
+    ```python
+    stream = StreamExtractor('extract_car', url)
+
+    for chunk in chunks:
+        if stream.feed(chunk):
+            break
+
+    car, pnp = stream.close()
+    ```
+    """
+
+    _PLANS: Dict[str, Tuple["_Plan", Callable[..., Any]]] = {
+        'extract_pages_count': (_PAGINATION_CONTAINER, _pages_count),
+        'extract_links': (_LISTED_STREAM, _links),
+        'extract_car': (_CAR, _car)
+    }
+
+    def __init__(self, func: str, *args: Any) -> None:
+        """
+        :param func: str - name of the extraction function, e.g:
+         `extract_car`
+        :param args: Any - function args, except the markup
+        :return: None
+        """
+        self._plan, self._result = self._PLANS[func]
+        self._args = args
+        self._parser: Optional["etree.HTMLPullParser"] = None
+        # buffered until the declared encoding is found (or `_HEAD_SIZE`
+        #  bytes are received)
+        self._head = b''
+        # the rest of the received html after the last complete tag
+        self._tail = b''
+        self._found: Dict[str, Any] = {}
+        self._counts: Dict[str, int] = defaultdict(int)
+        self._done: Set[str] = set()
+        # matched elements waiting for their content -> field names
+        self._open: Dict["etree._Element", List[str]] = {}
+        self._owner_id = OwnerIdScanner() if func == 'extract_car' else None
+        self._error: Optional[Exception] = None
+        # True if the rest of the document isn't needed
+        self.complete = False
+        # time spent on parsing (in seconds)
+        self.seconds = 0.0
+
+    def __start(self, element: "etree._Element") -> None:
+        """Matches the started element (its attributes are parsed).
+
+        :param element: etree._Element - started element
+        :return: None
+        """
+        for key in self._plan.match(element, self._counts, self._done):
+            field = self._plan.fields[key]
+
+            if field.content:
+                self._open.setdefault(element, []).append(key)
+            else:
+                self.__store(key, field.value(element))
+
+            if key == self._plan.abort:
+                self.complete = True
+
+                return
+
+    def __end(self, element: "etree._Element") -> None:
+        """Extracts fields of the parsed element, frees parsed content
+         which isn't needed anymore.
+
+        :param element: etree._Element - parsed element
+        :return: None
+        """
+        for key in self._open.pop(element, ()):
+            self.__store(key, self._plan.fields[key].value(element))
+        # contents of open elements are still needed
+        if self._open:
+            return
+
+        element.clear(keep_tail=True)
+        parent = element.getparent()
+
+        if parent is not None:
+            while element.getprevious() is not None:
+                del parent[0]
+
+    def __store(self, key: str, value: Any) -> None:
+        if self._plan.fields[key].index is None:
+            self._found.setdefault(key, []).append(value)
+        else:
+            self._found[key] = value
+
+    def __read_events(self) -> None:
+        """Processes parsed elements until the document is complete.
+
+        :return: None
+        """
+        for event, element in self._parser.read_events():
+            if event == 'start':
+                self.__start(element)
+            else:
+                self.__end(element)
+
+            if self.complete:
+                return
+
+            if self._plan.is_complete(self._done) and not self._open and (
+                self._owner_id is None
+                or self._owner_id.owner_id is not None
+            ):
+                self.complete = True
+
+                return
+
+    def __parse(self, chunk: bytes) -> None:
+        """Parses the chunk, the parser is created once the encoding is
+         known.
+
+        :param chunk: bytes - the next chunk of raw html
+        :return: None
+        """
+        if self._owner_id is not None:
+            self._owner_id.feed(chunk)
+
+        if self._parser is None:
+            self._head += chunk
+            match = _CHARSET_PATTERN.search(self._head, 0, _HEAD_SIZE)
+            # the declared encoding may be cut by the end of the chunk
+            if len(self._head) < _HEAD_SIZE and (
+                match is None or match.end() == len(self._head)
+            ):
+                return
+
+            self._parser = etree.HTMLPullParser(
+                events=('start', 'end'),
+                encoding=_encoding(self._head)
+            )
+            chunk, self._head = self._head, b''
+        # libxml2 loses the content of a script (style) if its closing tag
+        #  is cut by the end of the chunk (`</scr` + `ipt>`), so the parser
+        #  is fed up to the last complete tag, the rest is kept
+        chunk = self._tail + chunk
+        end = chunk.rfind(b'>') + 1
+        self._tail = chunk[end:]
+
+        if end:
+            self._parser.feed(chunk[:end])
+            self.__read_events()
+
+    def feed(self, chunk: bytes) -> bool:
+        """Parses the next chunk of the document.
+
+        Extraction errors are raised by `.close()`.
+
+        :param chunk: bytes - the next chunk of raw html
+        :return: bool - True if the rest of the document isn't needed
+        """
+        if self.complete:
+            return True
+
+        started = time.perf_counter()
+
+        try:
+            self.__parse(chunk)
+        except Exception as e:
+            # the rest of the document is useless
+            self._error = e
+            self.complete = True
+
+        self.seconds += time.perf_counter() - started
+
+        return self.complete
+
+    def close(self) -> Any:
+        """Finishes parsing (if the document isn't complete yet) and
+         returns the result of the extraction function.
+
+        :return: Any - the same result as the extraction function returns
+        """
+        if self._error is not None:
+            raise self._error
+
+        started = time.perf_counter()
+
+        try:
+            if not self.complete:
+                if self._parser is None:
+                    self._parser = etree.HTMLPullParser(
+                        events=('start', 'end'),
+                        encoding=_encoding(self._head)
+                    )
+                    self._parser.feed(self._head)
+
+                self._parser.feed(self._tail)
+
+                self._parser.close()
+                self.__read_events()
+
+            if self._owner_id is not None:
+                return self._result(
+                    self._found,
+                    *self._args,
+                    self._owner_id.owner_id
+                )
+
+            return self._result(self._found, *self._args)
+        finally:
+            self.seconds += time.perf_counter() - started
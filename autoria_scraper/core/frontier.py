@@ -0,0 +1,267 @@
+"""This module contains `Frontier` class - the priority queue of direct
+ links between the catalog and direct stages of `Pipeline`.
+
+Links are handed out by priority classes:
+    1. new listings (in the order of discovery)
+    2. known listings due for a re-check (`SCRAPER__RECHECK_KNOWN`), the
+        stalest ones first
+    3. retries of pages which aren't fetched (the least attempted ones
+        first)
+
+So under a request or time budget the most valuable pages are fetched
+ first, links which are left unserved stay pending in the checkpoint.
+"""
+
+
+import time
+import heapq
+import asyncio
+from logging import getLogger
+from typing import Dict, List, Optional, Tuple
+
+from autoria_scraper.config import app_config
+from autoria_scraper.core.index import ListingIndex
+from autoria_scraper.core.misc import metrics
+
+
+__all__ = ('Frontier', 'NEW', 'RECHECK', 'RETRY')
+
+
+logger = getLogger(__name__)
+
+# priority classes (lower goes first)
+NEW: int = 0
+RECHECK: int = 1
+RETRY: int = 2
+_PRIORITY_NAMES: Tuple[str, ...] = ('new', 'recheck', 'retry')
+
+_links = metrics.counter(
+    'autoria_frontier_links_total',
+    'Direct links handed out by the frontier (by priority class).',
+    ('priority',)
+)
+_not_due = metrics.counter(
+    'autoria_frontier_not_due_total',
+    'Known listings skipped since they were checked recently.'
+)
+
+
+class Frontier:
+    """Bounded heap of direct links ordered by priority class and then
+     by staleness (re-checks) or attempts (retries).
+
+    The producer (catalog stage) waits while the frontier is full,
+     consumers (direct workers) mark each link as done, so a failed link
+     can be pushed back as a retry before the frontier is drained.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        index: Optional["ListingIndex"] = None,
+        retries: int = 1,
+        recheck_after: float = 0,
+        request_budget: Optional[int] = None,
+        time_budget: Optional[float] = None
+    ) -> None:
+        """
+        :param capacity: int - max amount of queued links (backpressure),
+         retries which don't fit are deferred until there is room
+        :param index: Optional[ListingIndex] - listings known from
+         previous runs, all links are treated as new if not specified
+        :param retries: int - a failed link is queued again up to that
+         amount of times
+        :param recheck_after: float - known listings checked during this
+         period (in seconds) are skipped, 0 - all of them are due
+        :param request_budget: Optional[int] - max amount of links handed
+         out, None - unlimited
+        :param time_budget: Optional[float] - links are handed out during
+         this period (in seconds) only, None - unlimited
+        :return: None
+        """
+        self._capacity = capacity
+        self._index = index if index is not None else ListingIndex()
+        self._retries = retries
+        self._recheck_after = recheck_after
+        self._request_budget = request_budget
+        self._deadline = (
+            time.monotonic() + time_budget if time_budget is not None
+            else None
+        )
+        # (priority class, staleness or attempts, sequence number, url)
+        self._heap: List[Tuple[int, int, int, str]] = []
+        self._sequence = 0
+        # attempts of failed links
+        self._attempts: Dict[str, int] = {}
+        # retries of a full frontier (consumers can't wait for room)
+        self._deferred: List[str] = []
+        # links handed out, but not marked as done yet
+        self._in_flight = 0
+        self._handed_out = 0
+        self._closed = False
+        self._exhausted = False
+        self._changed = asyncio.Condition()
+
+    @classmethod
+    def from_config(
+        cls,
+        index: Optional["ListingIndex"] = None
+    ) -> "Frontier":
+        """Creates the frontier configured by `app_config.frontier`.
+
+        :param index: Optional[ListingIndex] - listings known from
+         previous runs
+        :return: Frontier
+        """
+        config = app_config.frontier
+
+        return cls(
+            capacity=app_config.scraper.links_queue_size,
+            index=index,
+            retries=config.retries,
+            recheck_after=config.recheck_after,
+            request_budget=config.request_budget,
+            time_budget=config.time_budget
+        )
+
+    def qsize(self) -> int:
+        return len(self._heap) + len(self._deferred)
+
+    @property
+    def exhausted(self) -> bool:
+        """Whether the request or time budget is spent (no more links
+         are handed out).
+
+        :return: bool
+        """
+        if not self._exhausted and (
+            self._request_budget is not None
+            and self._handed_out >= self._request_budget
+            or self._deadline is not None
+            and time.monotonic() >= self._deadline
+        ):
+            self._exhausted = True
+            logger.info(
+                'crawl budget is exhausted, links handed out: %d, '
+                'left: %d',
+                self._handed_out,
+                self.qsize()
+            )
+
+        return self._exhausted
+
+    def __push(self, url: str, priority: int, key: int) -> None:
+        heapq.heappush(self._heap, (priority, key, self._sequence, url))
+        self._sequence += 1
+
+    def __admit(self) -> None:
+        """Queues deferred retries while there is room.
+
+        :return: None
+        """
+        while self._deferred and len(self._heap) < self._capacity:
+            url = self._deferred.pop(0)
+            self.__push(url, RETRY, self._attempts[url])
+
+    async def put(self, url: str, failed: bool = False) -> bool:
+        """Queues the discovered link (waits while the frontier is full).
+
+        :param url: str - direct link to the car
+        :param failed: bool - if True, the link failed previously (e.g.
+         during the interrupted crawl) and is queued as a retry
+        :return: bool - False if the link is skipped (re-checked recently
+         or the budget is exhausted)
+        """
+        if failed:
+            self._attempts[url] = self._attempts.get(url, 0) + 1
+            priority, key = RETRY, self._attempts[url]
+        elif url not in self._index:
+            priority, key = NEW, 0
+        else:
+            priority, key = RECHECK, self._index.checked_at(url) or 0
+
+            if (
+                self._recheck_after
+                and key > time.time() - self._recheck_after
+            ):
+                _not_due.inc()
+
+                return False
+
+        async with self._changed:
+            await self._changed.wait_for(
+                lambda: len(self._heap) < self._capacity or self.exhausted
+            )
+
+            if self.exhausted:
+                return False
+
+            self.__push(url, priority, key)
+            self._changed.notify_all()
+
+        return True
+
+    def retry(self, url: str) -> bool:
+        """Queues the link which isn't fetched again (unless it's out of
+         attempts), has to be called before the link is marked as done.
+         The retry is deferred while the frontier is full.
+
+        :param url: str - direct link to the car
+        :return: bool - True if queued
+        """
+        attempts = self._attempts.get(url, 0) + 1
+
+        if attempts > self._retries or self._exhausted:
+            return False
+
+        self._attempts[url] = attempts
+        self._deferred.append(url)
+        self.__admit()
+
+        return True
+
+    async def get(self) -> Optional[str]:
+        """Hands out the link of the highest priority (waits for one).
+
+        :return: Optional[str] - direct link to the car, None if the
+         frontier is closed and drained or the budget is exhausted
+        """
+        async with self._changed:
+            await self._changed.wait_for(
+                lambda: self._heap or self.exhausted
+                or self._closed and not self._in_flight
+            )
+
+            if self.exhausted or not self._heap:
+                # wakes up the rest of consumers and the producer
+                self._changed.notify_all()
+
+                return
+
+            priority, _, _, url = heapq.heappop(self._heap)
+            self.__admit()
+            self._in_flight += 1
+            self._handed_out += 1
+            _links.inc(_PRIORITY_NAMES[priority])
+            self._changed.notify_all()
+
+            return url
+
+    async def done(self) -> None:
+        """Marks the handed out link as processed.
+
+        :return: None
+        """
+        async with self._changed:
+            self._in_flight -= 1
+            self._changed.notify_all()
+
+    async def close(self) -> None:
+        """No more links are discovered, consumers stop once the frontier
+         is drained.
+
+        :return: None
+        """
+        async with self._changed:
+            self._closed = True
+            self._changed.notify_all()
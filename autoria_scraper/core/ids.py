@@ -0,0 +1,411 @@
+"""This module contains compact collections of listing ids - `IdSet` and
+ `IdMap`, used instead of sets/dicts of full urls.
+
+Listing id is the number at the end of the direct link, e.g:
+ https://auto.ria.com/uk/auto_mercedes_benz_sprinter_38472224.html ->
+ 38472224
+
+Ids are split into the high and the low 16 bits (same as roaring bitmaps):
+ each container keeps sorted low halves of a single high half in
+ `array('H')` (or a bitmap, if dense), so a tracked listing costs at most
+ ~2 bytes (+8 bytes for `IdMap` values) instead of ~100 bytes for a url
+ string in a set.
+"""
+
+
+import re
+from array import array
+from bisect import bisect_left
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+
+
+__all__ = ('listing_id', 'IdSet', 'IdMap', 'ListingSet')
+
+
+_LISTING_ID = re.compile(r'_(\d+)\.html$')
+
+
+def listing_id(url: str) -> Optional[int]:
+    """Parses the listing id from the direct link.
+
+    :param url: str - direct link to the car
+    :return: Optional[int] - listing id or None
+    """
+    match = _LISTING_ID.search(url)
+
+    if match is not None:
+        return int(match.group(1))
+
+
+class IdSet:
+    """Compact set of non-negative integers.
+
+    Sparse containers are sorted `array('H')` (binary search), dense ones
+     (more than `_BITMAP_THRESHOLD` items) are converted to 8 KB bitmaps
+     (a single bit test), bulk `.update()` merges whole containers.
+    """
+
+    __slots__ = ('_chunks', '_size')
+
+    # an array of that size takes as much memory as a bitmap
+    _BITMAP_THRESHOLD: Optional[int] = 4096
+
+    def __init__(self, ids: Iterable[int] = ()) -> None:
+        """
+        :param ids: Iterable[int] - initial ids
+        :return: None
+        """
+        # high bits -> sorted low 16 bits (`array`) or bitmap (`bytearray`)
+        self._chunks: Dict[int, Union[array, bytearray]] = {}
+        self._size = 0
+
+        self.update(ids)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, value: int) -> bool:
+        chunk = self._chunks.get(value >> 16)
+
+        if chunk is None:
+            return False
+
+        low = value & 0xFFFF
+
+        if type(chunk) is bytearray:
+            return bool(chunk[low >> 3] & (1 << (low & 7)))
+
+        position = bisect_left(chunk, low)
+
+        return position < len(chunk) and chunk[position] == low
+
+    def __iter__(self) -> Iterator[int]:
+        for high in sorted(self._chunks):
+            base = high << 16
+
+            for low in self._lows(self._chunks[high]):
+                yield base | low
+
+    @staticmethod
+    def _lows(chunk: Union[array, bytearray]) -> Iterable[int]:
+        """Returns sorted low halves of the container.
+
+        :param chunk: Union[array, bytearray] - container
+        :return: Iterable[int]
+        """
+        if type(chunk) is not bytearray:
+            return chunk
+
+        return (
+            (index << 3) | bit
+            for index, byte in enumerate(chunk)
+            if byte
+            for bit in range(8)
+            if byte & (1 << bit)
+        )
+
+    def __store(self, high: int, lows: Iterable[int], size: int) -> None:
+        """Stores the container, dense ones as bitmaps.
+
+        :param high: int - high bits
+        :param lows: Iterable[int] - sorted low halves
+        :param size: int - amount of low halves
+        :return: None
+        """
+        if (
+            self._BITMAP_THRESHOLD is not None
+            and size > self._BITMAP_THRESHOLD
+        ):
+            bitmap = bytearray(8192)
+
+            for low in lows:
+                bitmap[low >> 3] |= 1 << (low & 7)
+
+            self._chunks[high] = bitmap
+        else:
+            self._chunks[high] = array('H', lows)
+
+    def add(self, value: int) -> bool:
+        """Adds a single id.
+
+        :param value: int - id
+        :return: bool - True if the id is new
+        """
+        high, low = value >> 16, value & 0xFFFF
+        chunk = self._chunks.get(high)
+
+        if chunk is None:
+            chunk = self._chunks[high] = array('H')
+
+        if type(chunk) is bytearray:
+            if chunk[low >> 3] & (1 << (low & 7)):
+                return False
+
+            chunk[low >> 3] |= 1 << (low & 7)
+        else:
+            position = bisect_left(chunk, low)
+
+            if position < len(chunk) and chunk[position] == low:
+                return False
+
+            chunk.insert(position, low)
+
+            if len(chunk) > (self._BITMAP_THRESHOLD or len(chunk)):
+                self.__store(high, chunk, len(chunk))
+
+        self._size += 1
+
+        return True
+
+    def update(self, ids: Iterable[int]) -> None:
+        """Adds a collection of ids (sorted and merged per container,
+         much faster than `.add()` for large collections).
+
+        Small batches (e.g. links of a catalog page) are merged by binary
+         search, so they don't pay for re-sorting whole containers.
+
+        :param ids: Iterable[int] - ids
+        :return: None
+        """
+        for high, values in groupby(sorted(ids), key=lambda _: _ >> 16):
+            # sorted low halves (with duplicates)
+            lows = [value & 0xFFFF for value in values]
+            chunk = self._chunks.get(high)
+
+            if type(chunk) is bytearray:
+                for low in lows:
+                    if not chunk[low >> 3] & (1 << (low & 7)):
+                        chunk[low >> 3] |= 1 << (low & 7)
+                        self._size += 1
+
+                continue
+
+            chunk = chunk or array('H')
+
+            if len(lows) > len(chunk) >> 3:
+                # comparable sizes, a single sort of both is faster
+                merged = array('H', sorted(set(chunk).union(lows)))
+            else:
+                merged = self.__merge(chunk, lows)
+
+            self._size += len(merged) - len(chunk)
+
+            if len(merged) > (self._BITMAP_THRESHOLD or len(merged)):
+                self.__store(high, merged, len(merged))
+            else:
+                self._chunks[high] = merged
+
+    @staticmethod
+    def __merge(chunk: array, lows: Iterable[int]) -> array:
+        """Merges sorted low halves into the sorted container, runs of
+         the container between them are copied as slices.
+
+        :param chunk: array - sorted low halves
+        :param lows: Iterable[int] - sorted low halves
+        :return: array - new container
+        """
+        merged = array('H')
+        start = 0
+        previous = None
+
+        for low in lows:
+            if low == previous:
+                continue
+
+            previous = low
+            position = bisect_left(chunk, low, start)
+            merged.extend(chunk[start:position])
+            merged.append(low)
+            start = position
+
+            if position < len(chunk) and chunk[position] == low:
+                start += 1
+
+        merged.extend(chunk[start:])
+
+        return merged
+
+    def difference(self, ids: Iterable[int]) -> Iterator[int]:
+        """Yields the given ids which aren't in the set.
+
+        :param ids: Iterable[int] - ids
+        :return: Iterator[int]
+        """
+        return (value for value in ids if value not in self)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate size of containers' buffers (in bytes).
+
+        :return: int
+        """
+        return sum(
+            len(chunk)
+            if type(chunk) is bytearray
+            else chunk.buffer_info()[1] * chunk.itemsize
+            for chunk in self._chunks.values()
+        )
+
+
+class IdMap(IdSet):
+    """Compact mapping of ids to signed 64-bit integers (e.g. content
+     hashes), values are kept in `array('q')` aligned with `IdSet`
+     containers.
+    """
+
+    __slots__ = ('_values',)
+
+    # values are aligned with array positions, so bitmaps aren't used
+    _BITMAP_THRESHOLD = None
+    # stored value of ids added without value
+    _MISSING: int = -2 ** 63
+
+    def __init__(self) -> None:
+        # high bits -> values in the order of `_chunks` items
+        self._values: Dict[int, array] = {}
+
+        super().__init__()
+
+    def add(self, value: int) -> bool:
+        """Adds a single id without value (an existing value is kept).
+
+        :param value: int - id
+        :return: bool - True if the id is new
+        """
+        if value in self:
+            return False
+
+        self.set(value, None)
+
+        return True
+
+    def update(self, ids: Iterable[int]) -> None:
+        """Adds a collection of ids without values (existing values
+         are kept).
+
+        :param ids: Iterable[int] - ids
+        :return: None
+        """
+        for value in ids:
+            self.add(value)
+
+    def _find(self, key: int) -> Tuple[Optional[array], int]:
+        """Locates the id.
+
+        :param key: int - id
+        :return: Tuple[Optional[array], int] - container (None if missing)
+         and the position within it, or -(insertion point) - 1 if the id
+         is missing
+        """
+        chunk = self._chunks.get(key >> 16)
+
+        if chunk is None:
+            return None, -1
+
+        low = key & 0xFFFF
+        position = bisect_left(chunk, low)
+
+        if position < len(chunk) and chunk[position] == low:
+            return chunk, position
+
+        return chunk, -position - 1
+
+    def get(self, key: int) -> Optional[int]:
+        """Returns the value of the id.
+
+        :param key: int - id
+        :return: Optional[int] - value, None if missing or not set
+        """
+        _, position = self._find(key)
+
+        if position < 0:
+            return
+
+        value = self._values[key >> 16][position]
+
+        return None if value == self._MISSING else value
+
+    def set(self, key: int, value: Optional[int]) -> None:
+        """Adds the id (if missing) and sets its value.
+
+        :param key: int - id
+        :param value: Optional[int] - signed 64-bit integer
+        :return: None
+        """
+        value = self._MISSING if value is None else value
+        chunk, position = self._find(key)
+
+        if position >= 0:
+            self._values[key >> 16][position] = value
+
+            return
+
+        if chunk is None:
+            chunk = self._chunks[key >> 16] = array('H')
+            self._values[key >> 16] = array('q')
+
+        position = -position - 1
+        chunk.insert(position, key & 0xFFFF)
+        self._values[key >> 16].insert(position, value)
+        self._size += 1
+
+    @property
+    def nbytes(self) -> int:
+        return super().nbytes + sum(
+            values.buffer_info()[1] * values.itemsize
+            for values in self._values.values()
+        )
+
+
+class ListingSet:
+    """Set of direct links, keyed by listing ids (`IdSet`), urls without
+     id are kept as is.
+    """
+
+    __slots__ = ('_ids', '_urls')
+
+    def __init__(self) -> None:
+        self._ids = IdSet()
+        self._urls = set()
+
+    def __contains__(self, url: str) -> bool:
+        if (id_ := listing_id(url)) is not None:
+            return id_ in self._ids
+
+        return url in self._urls
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._urls)
+
+    def add(self, url: str) -> None:
+        if (id_ := listing_id(url)) is not None:
+            self._ids.add(id_)
+        else:
+            self._urls.add(url)
+
+    def update(self, urls: Iterable[str]) -> None:
+        """Adds a collection of links (ids are merged in bulk).
+
+        :param urls: Iterable[str] - direct links to the cars
+        :return: None
+        """
+        ids = []
+
+        for url in urls:
+            if (id_ := listing_id(url)) is not None:
+                ids.append(id_)
+            else:
+                self._urls.add(url)
+
+        self._ids.update(ids)
+
+    def merge(self, other: "ListingSet") -> None:
+        """Adds all links of another set (e.g. a dedupe pool of another
+         process).
+
+        :param other: ListingSet
+        :return: None
+        """
+        self._ids.update(other._ids)
+        self._urls.update(other._urls)
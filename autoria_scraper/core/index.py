@@ -0,0 +1,129 @@
+"""This module contains `ListingIndex` class."""
+
+
+import time
+from typing import Dict, Iterable, List, Optional
+
+from autoria_scraper.core.ids import IdMap, listing_id
+
+
+__all__ = ('ListingIndex',)
+
+
+class ListingIndex:
+    """In-memory cache of listings already known from previous runs.
+
+    The index itself is persisted by the database (`cars.url` and
+     `cars.content_hash` columns), so it has to be warmed up with known
+     urls on startup.
+    Used by `CatalogScraper` to skip listings which are already stored
+     and by `DirectScraper` to skip re-crawled listings which haven't
+     changed (see `CarParser.fingerprint()`).
+
+    Listings are keyed by listing ids (`IdMap`, ~10 bytes per listing),
+     urls without id are kept as is. The last check time of each listing
+     is kept as well (another ~10 bytes), so `Frontier` re-checks the
+     stalest listings first.
+    """
+
+    def __init__(self) -> None:
+        # listing id -> content hash (None if unknown)
+        self._ids = IdMap()
+        self._urls: Dict[str, Optional[int]] = {}
+        # listing id -> last check (unix time, in seconds)
+        self._checked_ids = IdMap()
+        self._checked_urls: Dict[str, int] = {}
+        # unchanged listings found by this process, not persisted yet
+        self._checked: List[str] = []
+
+    def __contains__(self, url: str) -> bool:
+        if (id_ := listing_id(url)) is not None:
+            return id_ in self._ids
+
+        return url in self._urls
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._urls)
+
+    def add(
+        self,
+        url: str,
+        content_hash: Optional[int] = None,
+        checked_at: Optional[float] = None
+    ) -> None:
+        """Marks a single listing as known.
+
+        :param url: str - direct link to the car
+        :param content_hash: Optional[int] - hash of the stored content
+        :param checked_at: Optional[float] - last check of the listing
+         (unix time), the previous one is kept if not specified
+        :return: None
+        """
+        if (id_ := listing_id(url)) is not None:
+            self._ids.set(id_, content_hash)
+        else:
+            self._urls[url] = content_hash
+
+        if checked_at is not None:
+            self.__set_checked(url, checked_at)
+
+    def __set_checked(self, url: str, checked_at: float) -> None:
+        if (id_ := listing_id(url)) is not None:
+            self._checked_ids.set(id_, int(checked_at))
+        else:
+            self._checked_urls[url] = int(checked_at)
+
+    def checked_at(self, url: str) -> Optional[int]:
+        """Returns the last check of the listing.
+
+        :param url: str - direct link to the car
+        :return: Optional[int] - unix time, None if unknown
+        """
+        if (id_ := listing_id(url)) is not None:
+            return self._checked_ids.get(id_)
+
+        return self._checked_urls.get(url)
+
+    def update(self, urls: Iterable[str]) -> None:
+        """Marks a collection of listings as known.
+
+        :param urls: Iterable[str] - direct links to the cars
+        :return: None
+        """
+        for url in urls:
+            if url not in self:
+                self.add(url)
+
+    def is_unchanged(self, url: str, content_hash: Optional[int]) -> bool:
+        """Checks whether the stored content of the listing is the same.
+
+        :param url: str - direct link to the car
+        :param content_hash: Optional[int] - hash of the crawled content
+        :return: bool
+        """
+        if content_hash is None:
+            return False
+
+        if (id_ := listing_id(url)) is not None:
+            return self._ids.get(id_) == content_hash
+
+        return self._urls.get(url) == content_hash
+
+    def mark_checked(self, url: str) -> None:
+        """Remembers the unchanged listing, so its check datetime can
+         be updated (see `.drain_checked()`).
+
+        :param url: str - direct link to the car
+        :return: None
+        """
+        self._checked.append(url)
+        self.__set_checked(url, time.time())
+
+    def drain_checked(self) -> List[str]:
+        """Returns unchanged listings found since the previous call.
+
+        :return: List[str] - direct links to the cars
+        """
+        checked, self._checked = self._checked, []
+
+        return checked
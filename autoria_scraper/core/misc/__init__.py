@@ -2,4 +2,11 @@
 
 
 from .http import *
+from .agents import *
+from .throttle import *
+from .cache import *
+from .archive import *
+from .metrics import *
 from .tools import *
+from .executor import *
+from .extraction import *
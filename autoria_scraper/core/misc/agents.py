@@ -0,0 +1,106 @@
+"""This module contains `UserAgentPool` - a small pool of user-agents
+ cached on disk.
+
+`fake_useragent.UserAgent()` loads its whole browser dataset, which
+ noticeably slows down each cold start (cron runs), so a pool of
+ user-agents is generated once and reused until it expires.
+"""
+
+
+import os
+import json
+import time
+import random
+from logging import getLogger
+from typing import List, Optional
+
+from autoria_scraper.config import app_config
+from autoria_scraper.core.misc.tools import replace_file
+
+
+__all__ = ('UserAgentPool', 'user_agents')
+
+
+logger = getLogger(__name__)
+
+# used if the pool can't be generated (e.g. `fake-useragent` failure)
+_DEFAULT_USER_AGENT: str = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36'
+)
+
+
+class UserAgentPool:
+    """Chrome user-agents generated by `fake-useragent` and cached on
+     disk, loaded on first use.
+    """
+
+    def __init__(self, path: str, size: int, ttl: float) -> None:
+        """
+        :param path: str - cache file path (json)
+        :param size: int - amount of user-agents in the pool
+        :param ttl: float - the pool is regenerated after this period
+         (in seconds)
+        :return: None
+        """
+        self._path = path
+        self._size = size
+        self._ttl = ttl
+        self._agents: Optional[List[str]] = None
+
+    def __load(self) -> Optional[List[str]]:
+        """Reads the cached pool (if fresh).
+
+        :return: Optional[List[str]] - user-agents or None
+        """
+        try:
+            if time.time() - os.path.getmtime(self._path) > self._ttl:
+                return
+
+            with open(self._path) as file:
+                return json.load(file)['agents'] or None
+        except (OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning('user-agents cache is ignored: %s', e)
+
+    def __generate(self) -> List[str]:
+        """Generates a new pool and caches it.
+
+        :return: List[str] - user-agents
+        """
+        try:
+            from fake_useragent import UserAgent
+
+            ua = UserAgent()
+            # `.chrome` is random, duplicates are removed
+            agents = list(dict.fromkeys(
+                ua.chrome for _ in range(self._size * 2)
+            ))[:self._size]
+        except Exception as e:
+            logger.warning('user-agents are not generated, reason: %s', e)
+
+            return [_DEFAULT_USER_AGENT]
+
+        try:
+            replace_file(self._path, json.dumps({'agents': agents}))
+        except OSError as e:
+            logger.warning('user-agents are not cached, reason: %s', e)
+
+        return agents
+
+    def random(self) -> str:
+        """Returns a random user-agent of the pool.
+
+        :return: str
+        """
+        if self._agents is None:
+            self._agents = self.__load() or self.__generate()
+
+        return random.choice(self._agents)
+
+
+user_agents = UserAgentPool(
+    path=app_config.aiohttp.user_agents_path,
+    size=app_config.aiohttp.user_agents_size,
+    ttl=app_config.aiohttp.user_agents_ttl
+)
@@ -0,0 +1,270 @@
+"""This module contains `ResponseArchive` - record/replay of raw responses.
+
+Record mode: each response body (catalog/direct pages, phone endpoint json)
+ is appended to the current segment as a separate gzip member:
+
+    ARCHIVE/1.0 <kind> <timestamp> <key>\\n
+    <body>
+
+Segments are rotated once they exceed the size limit. The index
+ (`index.cdx`) is appended at the same time, one line per record:
+
+    <kind> <segment> <offset> <length> <key>
+
+Replay mode: requests are served from the archive only (no network at all),
+ so the same extraction path is bounded by parsing throughput.
+"""
+
+
+import gzip
+import json
+import zlib
+import time
+import asyncio
+import threading
+from pathlib import Path
+from logging import getLogger
+from collections import Counter
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from autoria_scraper.config import app_config
+
+
+__all__ = ('response_archive', 'post_key')
+
+
+_SEGMENT_NAME = 'segment-{:05d}.arc.gz'
+_INDEX_NAME = 'index.cdx'
+_VERSION = b'ARCHIVE/1.0'
+# segment number, offset, compressed length
+_Location = Tuple[int, int, int]
+
+logger = getLogger(__name__)
+
+
+def post_key(url: str, payload: Any) -> str:
+    """Builds the archive key of a POST request.
+
+    :param url: str - request url
+    :param payload: Any - json payload
+    :return: str - key
+    """
+    payload = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+
+    return f'{url}#{payload}'
+
+
+class ResponseArchive:
+    """Append-only archive of raw responses.
+
+    Methods are executed in a thread (`asyncio.to_thread`), so disk I/O
+     doesn't block the event loop.
+    Don't forget to call `.close()` on exit.
+    """
+
+    def __init__(self, mode: str, path: str, segment_size: int) -> None:
+        """
+        :param mode: str - `off`, `record` or `replay`
+        :param path: str - archive directory
+        :param segment_size: int - segment is rotated above this size
+         (in bytes)
+        :return: None
+        """
+        self.mode = mode
+        self._path = Path(path)
+        self._segment_size = segment_size
+        self._lock = threading.Lock()
+        # record mode
+        self._segment: Optional[BinaryIO] = None
+        self._segment_number = 0
+        self._index: Optional[BinaryIO] = None
+        # replay mode, (kind, key) -> (segment, offset, length)
+        self._records: Optional[Dict[Tuple[str, str], "_Location"]] = None
+        self._readers: Dict[int, BinaryIO] = {}
+        # recorded, replayed, missing
+        self.stats = Counter()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == 'record'
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+
+    def __open_segment(self) -> None:
+        """Opens the next segment for writing (lock must be held).
+
+        :return: None
+        """
+        if self._segment is not None:
+            self._segment.close()
+
+        self._path.mkdir(parents=True, exist_ok=True)
+        # existing segments are never modified
+        while (
+            self._path / _SEGMENT_NAME.format(self._segment_number)
+        ).exists():
+            self._segment_number += 1
+
+        self._segment = open(
+            self._path / _SEGMENT_NAME.format(self._segment_number),
+            'ab'
+        )
+
+        if self._index is None:
+            self._index = open(self._path / _INDEX_NAME, 'ab')
+
+    def __write(self, kind: str, key: str, body: bytes) -> None:
+        header = b' '.join((
+            _VERSION,
+            kind.encode(),
+            str(int(time.time())).encode(),
+            key.encode()
+        ))
+        data = gzip.compress(header + b'\n' + body, compresslevel=6)
+
+        with self._lock:
+            if (
+                self._segment is None
+                or self._segment.tell() >= self._segment_size
+            ):
+                self.__open_segment()
+
+            offset = self._segment.tell()
+            self._segment.write(data)
+            # the record reaches the segment before its index line, so
+            #  a killed process doesn't leave lines pointing past the end
+            self._segment.flush()
+            self._index.write(
+                f'{kind} {self._segment_number} {offset} {len(data)} {key}\n'
+                .encode()
+            )
+            self._index.flush()
+            self.stats['recorded'] += 1
+
+    def __load(self) -> None:
+        """Loads the index (once).
+
+        :return: None
+        """
+        if self._records is not None:
+            return
+
+        self._records = {}
+
+        try:
+            with open(self._path / _INDEX_NAME, 'rb') as index:
+                for line in index:
+                    try:
+                        kind, segment, offset, length, key = (
+                            line.decode().rstrip('\n').split(' ', 4)
+                        )
+                    except ValueError:
+                        # the last line may be truncated by a crash
+                        continue
+                    # the latest record wins
+                    self._records[(kind, key)] = (
+                        int(segment),
+                        int(offset),
+                        int(length)
+                    )
+        except FileNotFoundError:
+            logger.warning('archive index not found: %s', self._path)
+
+        logger.info('archived responses: %d', len(self._records))
+
+    def __read(self, kind: str, key: str) -> Optional[bytes]:
+        with self._lock:
+            self.__load()
+            location = self._records.get((kind, key))
+
+            if location is None:
+                self.stats['missing'] += 1
+
+                return
+
+            segment, offset, length = location
+
+            if segment not in self._readers:
+                self._readers[segment] = open(
+                    self._path / _SEGMENT_NAME.format(segment),
+                    'rb'
+                )
+
+            reader = self._readers[segment]
+            reader.seek(offset)
+            data = reader.read(length)
+        # decompression doesn't need the lock
+        try:
+            if len(data) < length:
+                raise EOFError('segment is truncated')
+
+            body = gzip.decompress(data).split(b'\n', 1)[1]
+        except (EOFError, OSError, zlib.error, IndexError) as e:
+            # the segment of a killed process may be incomplete
+            logger.warning(
+                'archived response is corrupted: %s %s, reason: %r',
+                kind,
+                key,
+                e
+            )
+            body = None
+
+        with self._lock:
+            self.stats['missing' if body is None else 'replayed'] += 1
+
+        return body
+
+    async def write(self, kind: str, key: str, body: bytes) -> None:
+        """Appends the response to the archive (record mode only).
+
+        :param kind: str - request kind (`GET`, `POST`)
+        :param key: str - request key (url for GET, see `post_key`)
+        :param body: bytes - response body
+        :return: None
+        """
+        if self.recording:
+            await asyncio.to_thread(self.__write, kind, key, body)
+
+    async def read(self, kind: str, key: str) -> Optional[bytes]:
+        """Returns archived response body.
+
+        :param kind: str - request kind (`GET`, `POST`)
+        :param key: str - request key (url for GET, see `post_key`)
+        :return: Optional[bytes] - response body or None if missing
+         (or corrupted)
+        """
+        return await asyncio.to_thread(self.__read, kind, key)
+
+    def summary(self) -> Dict[str, int]:
+        """Returns statistics of the archive.
+
+        :return: Dict[str, int]
+        """
+        return {
+            'recorded': self.stats['recorded'],
+            'replayed': self.stats['replayed'],
+            'missing': self.stats['missing']
+        }
+
+    def close(self) -> None:
+        """Flushes and closes all files.
+
+        :return: None
+        """
+        with self._lock:
+            for file in (self._segment, self._index, *self._readers.values()):
+                if file is not None:
+                    file.close()
+
+            self._segment = None
+            self._index = None
+            self._readers = {}
+
+
+response_archive = ResponseArchive(
+    mode=app_config.archive.mode,
+    path=app_config.archive.path,
+    segment_size=app_config.archive.segment_size_mb * 1024 * 1024
+)
@@ -0,0 +1,304 @@
+"""This module contains `HttpCache` - optional on-disk cache of GET
+ responses.
+
+Bodies are stored compressed (gzip), one file per url, metadata is kept
+ in a small `sqlite3` index next to them:
+    - fresh entries (younger than url class TTL) are served without
+     any request
+    - stale entries are revalidated with `ETag`/`Last-Modified`
+     (conditional GET), 304 response refreshes the entry
+    - total size is bounded, least recently used entries are evicted
+"""
+
+
+import gzip
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from collections import Counter
+from typing import Dict, NamedTuple, Optional
+
+from autoria_scraper.config import app_config
+
+
+__all__ = ('http_cache', 'CacheEntry')
+
+
+# after eviction, total size is reduced to this share of the limit
+_EVICTION_TARGET: float = 0.9
+
+
+class CacheEntry(NamedTuple):
+    """Cached response."""
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fresh: bool
+
+
+class HttpCache:
+    """On-disk cache of GET responses, keyed by url.
+
+    Methods are executed in a thread (`asyncio.to_thread`), so disk I/O
+     doesn't block the event loop.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        path: str,
+        max_size: int,
+        catalog_prefix: str,
+        catalog_ttl: float,
+        direct_ttl: float
+    ) -> None:
+        """
+        :param enabled: bool - if False, the cache is always empty
+        :param path: str - cache directory
+        :param max_size: int - max total size of stored bodies (in bytes)
+        :param catalog_prefix: str - urls which start with this value are
+         catalog pages, others are direct pages
+        :param catalog_ttl: float - TTL of catalog pages (in seconds)
+        :param direct_ttl: float - TTL of direct pages (in seconds)
+        :return: None
+        """
+        self.enabled = enabled
+        self._path = Path(path)
+        self._max_size = max_size
+        self._catalog_prefix = catalog_prefix
+        self._catalog_ttl = catalog_ttl
+        self._direct_ttl = direct_ttl
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._size = 0
+        # hits, stale, misses, revalidated, stored, evicted
+        self.stats = Counter()
+
+    def __connect(self) -> sqlite3.Connection:
+        """Opens the index (once).
+
+        :return: sqlite3.Connection
+        """
+        if self._db is None:
+            self._path.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(
+                self._path / 'index.sqlite',
+                check_same_thread=False,
+                isolation_level=None
+            )
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, '
+                'url TEXT NOT NULL, '
+                'etag TEXT, '
+                'last_modified TEXT, '
+                'stored_at REAL NOT NULL, '
+                'accessed_at REAL NOT NULL, '
+                'size INTEGER NOT NULL)'
+            )
+            self._db.execute(
+                'CREATE INDEX IF NOT EXISTS entries_accessed_at '
+                'ON entries (accessed_at)'
+            )
+            self._size = self._db.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM entries'
+            ).fetchone()[0]
+
+        return self._db
+
+    @staticmethod
+    def __key(url: str) -> str:
+        return hashlib.sha1(url.encode()).hexdigest()
+
+    def __file(self, key: str) -> Path:
+        return self._path / key[:2] / f'{key}.gz'
+
+    def ttl(self, url: str) -> float:
+        """Returns TTL of the url class.
+
+        :param url: str - url
+        :return: float - TTL (in seconds)
+        """
+        if url.startswith(self._catalog_prefix):
+            return self._catalog_ttl
+
+        return self._direct_ttl
+
+    def __get(self, url: str) -> Optional["CacheEntry"]:
+        key = self.__key(url)
+
+        with self._lock:
+            row = self.__connect().execute(
+                'SELECT etag, last_modified, stored_at FROM entries '
+                'WHERE key = ?',
+                (key,)
+            ).fetchone()
+
+            if row is None:
+                self.stats['misses'] += 1
+
+                return
+
+            self._db.execute(
+                'UPDATE entries SET accessed_at = ? WHERE key = ?',
+                (time.time(), key)
+            )
+
+        try:
+            body = gzip.decompress(self.__file(key).read_bytes())
+        except (OSError, EOFError):
+            self.stats['misses'] += 1
+
+            return
+
+        etag, last_modified, stored_at = row
+        fresh = time.time() - stored_at < self.ttl(url)
+
+        self.stats['hits' if fresh else 'stale'] += 1
+
+        return CacheEntry(
+            body=body,
+            etag=etag,
+            last_modified=last_modified,
+            fresh=fresh
+        )
+
+    def __put(
+        self,
+        url: str,
+        body: bytes,
+        etag: Optional[str],
+        last_modified: Optional[str]
+    ) -> None:
+        key = self.__key(url)
+        file = self.__file(key)
+        data = gzip.compress(body, compresslevel=6)
+
+        file.parent.mkdir(parents=True, exist_ok=True)
+        # write + rename, so readers never see partially written files
+        tmp = file.with_suffix('.tmp')
+        tmp.write_bytes(data)
+        tmp.replace(file)
+
+        now = time.time()
+
+        with self._lock:
+            db = self.__connect()
+            previous = db.execute(
+                'SELECT size FROM entries WHERE key = ?',
+                (key,)
+            ).fetchone()
+            db.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, url, etag, last_modified, now, now, len(data))
+            )
+            self._size += len(data) - (previous[0] if previous else 0)
+            self.stats['stored'] += 1
+
+            if self._size > self._max_size:
+                self.__evict()
+
+    def __evict(self) -> None:
+        """Removes least recently used entries (lock must be held).
+
+        :return: None
+        """
+        target = self._max_size * _EVICTION_TARGET
+
+        for key, size in self._db.execute(
+            'SELECT key, size FROM entries ORDER BY accessed_at'
+        ).fetchall():
+            if self._size <= target:
+                break
+
+            self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            self.__file(key).unlink(missing_ok=True)
+            self._size -= size
+            self.stats['evicted'] += 1
+
+    def __refresh(self, url: str) -> None:
+        now = time.time()
+
+        with self._lock:
+            self.__connect().execute(
+                'UPDATE entries SET stored_at = ?, accessed_at = ? '
+                'WHERE key = ?',
+                (now, now, self.__key(url))
+            )
+            self.stats['revalidated'] += 1
+
+    async def get(self, url: str) -> Optional["CacheEntry"]:
+        """Returns cached response (fresh or stale).
+
+        :param url: str - url
+        :return: Optional[CacheEntry] - None if missing or disabled
+        """
+        if self.enabled:
+            return await asyncio.to_thread(self.__get, url)
+
+    async def put(
+        self,
+        url: str,
+        body: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ) -> None:
+        """Stores the response.
+
+        :param url: str - url
+        :param body: bytes - response body
+        :param etag: Optional[str] - `ETag` header value
+        :param last_modified: Optional[str] - `Last-Modified` header value
+        :return: None
+        """
+        if self.enabled:
+            await asyncio.to_thread(self.__put, url, body, etag, last_modified)
+
+    async def refresh(self, url: str) -> None:
+        """Marks the entry as fresh (after 304 response).
+
+        :param url: str - url
+        :return: None
+        """
+        if self.enabled:
+            await asyncio.to_thread(self.__refresh, url)
+
+    def summary(self) -> Dict[str, int]:
+        """Returns statistics of the cache.
+
+        :return: Dict[str, int]
+        """
+        return {
+            'hits': self.stats['hits'],
+            'stale': self.stats['stale'],
+            'misses': self.stats['misses'],
+            'revalidated': self.stats['revalidated'],
+            'stored': self.stats['stored'],
+            'evicted': self.stats['evicted'],
+            'size': self._size
+        }
+
+    def close(self) -> None:
+        """Closes the index.
+
+        :return: None
+        """
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+
+            self._db = None
+
+
+http_cache = HttpCache(
+    enabled=app_config.cache.enabled,
+    path=app_config.cache.path,
+    max_size=app_config.cache.max_size_mb * 1024 * 1024,
+    catalog_prefix=app_config.scraper.root_url.__str__(),
+    catalog_ttl=app_config.cache.catalog_ttl,
+    direct_ttl=app_config.cache.direct_ttl
+)
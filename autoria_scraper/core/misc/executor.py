@@ -0,0 +1,71 @@
+"""This module contains `ParseExecutor` - runs CPU-bound parsing
+ outside of the event loop.
+"""
+
+
+import asyncio
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from autoria_scraper.config import app_config
+
+
+__all__ = ('parse_executor',)
+
+
+class ParseExecutor:
+    """Executes parsing functions in a pool of worker processes,
+     so the event loop keeps doing I/O only.
+
+    If `workers` is 0, functions are executed right in the event loop
+     thread (no pool at all).
+    Functions and their arguments must be picklable (module-level functions,
+     plain python objects).
+    Don't forget to call `.close()` on exit.
+    """
+
+    def __init__(self, workers: int) -> None:
+        """
+        :param workers: int - amount of worker processes
+        :return: None
+        """
+        self._workers = workers
+        self._pool: Optional["ProcessPoolExecutor"] = None
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        """Executes `func(*args)` and returns its result.
+
+        :param func: Callable - picklable function
+        :param args: Any - picklable positional arguments
+        :return: Any - function result
+        """
+        if self._workers < 1:
+            return func(*args)
+
+        if self._pool is None:
+            # `spawn` is used, because forking a process with running
+            #  threads (logging listener) and event loop is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self._workers,
+                mp_context=get_context('spawn')
+            )
+
+        return await asyncio.get_running_loop().run_in_executor(
+            self._pool,
+            func,
+            *args
+        )
+
+    def close(self) -> None:
+        """Shuts the pool down (if it was started).
+
+        :return: None
+        """
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+        self._pool = None
+
+
+parse_executor = ParseExecutor(workers=app_config.scraper.parse_workers)
@@ -0,0 +1,213 @@
+"""This module contains `Extractor` - runs extraction engines
+ (see `autoria_scraper.core.extractors`) via `parse_executor` or while
+ pages are downloaded (streaming mode).
+"""
+
+
+import random
+from logging import getLogger
+from typing import Any
+
+from autoria_scraper.config import app_config
+from autoria_scraper.core.extractors import engine
+from autoria_scraper.core.misc.metrics import metrics
+from autoria_scraper.core.misc.executor import parse_executor
+from autoria_scraper.core.misc.cache import http_cache
+from autoria_scraper.core.misc.archive import response_archive
+from autoria_scraper.core.misc.http import fetch_bytes, fetch_stream
+
+
+__all__ = ('extractor',)
+
+
+# reference engine, used as a fallback and for parity checks
+_REFERENCE_ENGINE: str = 'bs4'
+# the only engine able to parse a page while it's downloaded
+_STREAMING_ENGINE: str = 'lxml'
+
+_extraction_seconds = metrics.histogram(
+    'autoria_extraction_seconds',
+    'Duration of html extraction (worker round-trip included).',
+    ('func', 'engine')
+)
+_fallbacks = metrics.counter(
+    'autoria_extraction_fallbacks_total',
+    'Extractions repeated by the reference engine after a failure.',
+    ('func',)
+)
+
+logger = getLogger(__name__)
+
+
+class Extractor:
+    """Executes extraction functions of the selected engine.
+
+    If the selected engine fails, the reference (`bs4`) engine is used
+     instead. A share of calls (`parity_rate`) is executed by both engines
+     and mismatching results are logged, so the engine can be switched
+     safely.
+    """
+
+    def __init__(
+        self,
+        engine: str,
+        parity_rate: float,
+        streaming: bool = False
+    ) -> None:
+        """
+        :param engine: str - engine name, one of `ENGINES` keys
+        :param parity_rate: float - share of calls to check (0 - 1)
+        :param streaming: bool - if True, pages fetched by `.fetch()` are
+         parsed incrementally while downloaded (`lxml` engine only)
+        :return: None
+        """
+        self._engine = engine
+        self._parity_rate = parity_rate
+        self._streaming = streaming
+
+    @property
+    def streaming(self) -> bool:
+        """Checks whether pages are parsed while downloaded: the whole
+         body is required by the http cache and the archive.
+
+        :return: bool
+        """
+        return (
+            self._streaming
+            and self._engine == _STREAMING_ENGINE
+            and not http_cache.enabled
+            and response_archive.mode == 'off'
+        )
+
+    async def __reference(self, func: str, *args: Any) -> Any:
+        """Executes the reference engine function.
+
+        :param func: str - function name
+        :param args: Any - function args
+        :return: Any - function result
+        """
+        with _extraction_seconds.time(func, _REFERENCE_ENGINE):
+            return await parse_executor.run(
+                getattr(engine(_REFERENCE_ENGINE), func),
+                *args
+            )
+
+    async def run(self, func: str, *args: Any) -> Any:
+        """Executes the extraction function.
+
+        :param func: str - function name, e.g: `extract_car`
+        :param args: Any - function args (raw markup goes first)
+        :return: Any - function result
+        """
+        if self._engine == _REFERENCE_ENGINE:
+            return await self.__reference(func, *args)
+
+        try:
+            with _extraction_seconds.time(func, self._engine):
+                result = await parse_executor.run(
+                    getattr(engine(self._engine), func),
+                    *args
+                )
+        except Exception as e:
+            _fallbacks.inc(func)
+            logger.warning(
+                '%s engine failed, func: [%s], reason: "%s", args: %s, '
+                'falling back to %s engine',
+                self._engine,
+                func,
+                e,
+                args[1:],
+                _REFERENCE_ENGINE
+            )
+
+            return await self.__reference(func, *args)
+
+        if random.random() < self._parity_rate:
+            try:
+                reference = await self.__reference(func, *args)
+            except Exception as e:
+                reference = e
+
+            if reference != result:
+                logger.warning(
+                    'parity check failed, func: [%s], args: %s, '
+                    '%s: %s, %s: %s',
+                    func,
+                    args[1:],
+                    self._engine,
+                    result,
+                    _REFERENCE_ENGINE,
+                    reference
+                )
+
+        return result
+
+    async def fetch(self, func: str, url: str, *args: Any) -> Any:
+        """Fetches the page and executes the extraction function.
+
+        In streaming mode (see `.streaming`) the page is parsed while
+         downloaded and the download is aborted as soon as the rest of the
+         page isn't needed (`tree.StreamExtractor`), parity checks are
+         skipped. If streamed extraction fails, the page is fetched once
+         more and extracted by the reference engine.
+
+        ! Raises `FetchError` if the page isn't fetched (all attempts
+         failed)
+
+        :param func: str - function name, e.g: `extract_car`
+        :param url: str - page url
+        :param args: Any - function args, except the markup
+        :return: Any - function result, None if the page doesn't exist
+         (e.g. 404)
+        """
+        if not self.streaming:
+            markup = await fetch_bytes(url)
+
+            if markup is not None:
+                return await self.run(func, markup, *args)
+
+            return
+
+        stream_extractor = engine(self._engine).StreamExtractor
+        stream = await fetch_stream(
+            url,
+            consumer=lambda: stream_extractor(func, *args)
+        )
+
+        if stream is None:
+            return
+
+        try:
+            result = stream.close()
+        except Exception as e:
+            _fallbacks.inc(func)
+            logger.warning(
+                '%s engine failed (streaming), func: [%s], reason: "%s", '
+                'url: %s, falling back to %s engine',
+                self._engine,
+                func,
+                e,
+                url,
+                _REFERENCE_ENGINE
+            )
+            markup = await fetch_bytes(url)
+
+            if markup is not None:
+                return await self.__reference(func, markup, *args)
+
+            return
+        finally:
+            _extraction_seconds.observe(
+                stream.seconds,
+                func,
+                f'{self._engine}-stream'
+            )
+
+        return result
+
+
+extractor = Extractor(
+    engine=app_config.scraper.extraction_engine,
+    parity_rate=app_config.scraper.extraction_parity_rate,
+    streaming=app_config.scraper.streaming_parse
+)
@@ -1,117 +1,554 @@
 """This module contains `aiohttp` wrappers."""
 
 
+import json
 import asyncio
 from logging import getLogger
 from functools import wraps
-from typing import Callable, Any, Optional, Dict
+from typing import (
+    Callable,
+    Any,
+    Optional,
+    Dict,
+    List,
+    NamedTuple,
+    TYPE_CHECKING
+)
 
-from bs4 import BeautifulSoup
-from fake_useragent import UserAgent
-from aiohttp import ClientSession, ClientTimeout
+from aiohttp import (
+    ClientSession,
+    ClientTimeout,
+    TCPConnector,
+    ClientResponseError,
+    TraceConfig
+)
 
 from autoria_scraper.config import app_config
+from autoria_scraper.core.misc.throttle import (
+    rate_controller,
+    backoff_delay,
+    parse_retry_after
+)
+from autoria_scraper.core.misc.metrics import metrics
+from autoria_scraper.core.misc.cache import http_cache
+from autoria_scraper.core.misc.archive import response_archive, post_key
+from autoria_scraper.core.misc.agents import user_agents
+from autoria_scraper.startup import startup_profile
 
 
-__all__ = ('fetch_soup', 'post')
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
 
 
-# delay after each reattempt in `_aiohttp_session` (on failure)
+__all__ = (
+    'FetchError',
+    'fetch_bytes',
+    'fetch_stream',
+    'fetch_soup',
+    'post',
+    'session_manager'
+)
+
+
+# base delay after each reattempt in `_aiohttp_session` (on failure),
+#  grows exponentially (with jitter) up to `_REATTEMPT_DELAY_MAX`
 _REATTEMPT_DELAY: float = app_config.aiohttp.attempt_delay
+_REATTEMPT_DELAY_MAX: float = app_config.aiohttp.attempt_delay_max
 # number of reattempts for each request (on failure)
 _REATTEMPTS_LIMIT: int = app_config.aiohttp.attempts_limit
 # if a request exceeds that value, a `TimeoutError` will be raised
 # default value provided by aiohttp is 60 * 5 = 300sec
 # usually, it's faster to make a new request, than wait 5 minutes...
 _timeout = ClientTimeout(total=app_config.aiohttp.timeout)
-# using `fake-useragent` package to rotate user-agents
-_ua = UserAgent()
+# the host is overloaded or rate-limits us, slow down and retry
+_THROTTLE_STATUSES = frozenset((429, 503))
+# temporary server-side errors, retry
+_RETRY_STATUSES = frozenset((500, 502, 504))
+# the rest of an aborted stream is still read (and discarded) if it's that
+#  small, so the keep-alive connection is reused instead of being closed
+_DRAIN_LIMIT: int = 64 * 1024
+
+_request_seconds = metrics.histogram(
+    'autoria_http_request_seconds',
+    'Duration of http request attempts (throttling excluded).',
+    ('method',)
+)
+_requests = metrics.counter(
+    'autoria_http_requests_total',
+    'Http request attempts by outcome (status code, timeout, error).',
+    ('method', 'outcome')
+)
+_retries = metrics.counter(
+    'autoria_http_retries_total',
+    'Http reattempts by number of the failed attempt.',
+    ('method', 'attempt')
+)
+_stream_aborts = metrics.counter(
+    'autoria_http_stream_aborts_total',
+    'Streamed responses no longer needed by the consumer: the connection '
+    'is closed or the rest of the body is drained (small remainder).',
+    ('action',)
+)
 
 logger = getLogger(__name__)
 
 
+class FetchError(Exception):
+    """The page isn't fetched: all attempts failed (network errors,
+     timeouts, 429/5xx statuses).
+    """
+
+
+class SessionManager:
+    """Holds a single process-wide `aiohttp.ClientSession`.
+
+    The session is created lazily on first use and keeps a pool of
+     keep-alive connections, so consecutive requests to the same host
+     don't pay for a new TCP+TLS handshake and DNS lookup.
+    Don't forget to call `.close()` on exit.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        limit_per_host: int,
+        dns_cache_ttl: int,
+        keepalive_timeout: float
+    ) -> None:
+        """
+        :param limit: int - total amount of simultaneous connections
+        :param limit_per_host: int - amount of simultaneous connections
+         to the same host
+        :param dns_cache_ttl: int - ttl of cached DNS records (in seconds)
+        :param keepalive_timeout: float - idle connection lifetime
+         (in seconds)
+        :return: None
+        """
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._dns_cache_ttl = dns_cache_ttl
+        self._keepalive_timeout = keepalive_timeout
+        self._trace_configs: List["TraceConfig"] = []
+        self._session: Optional["ClientSession"] = None
+
+    def add_trace_config(self, trace_config: "TraceConfig") -> None:
+        """Attaches request tracing hooks (e.g. for benchmarks), must be
+         called before the session is created.
+
+        :param trace_config: TraceConfig - tracing hooks
+        :return: None
+        """
+        self._trace_configs.append(trace_config)
+
+    def get(self) -> "ClientSession":
+        """Returns the shared session, creates a new one if necessary.
+
+        :return: ClientSession
+        """
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(
+                connector=TCPConnector(
+                    limit=self._limit,
+                    limit_per_host=self._limit_per_host,
+                    ttl_dns_cache=self._dns_cache_ttl,
+                    keepalive_timeout=self._keepalive_timeout
+                ),
+                timeout=_timeout,
+                trace_configs=self._trace_configs or None
+            )
+
+        return self._session
+
+    async def close(self) -> None:
+        """Closes the shared session and its connection pool.
+
+        :return: None
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+        self._session = None
+
+
+session_manager = SessionManager(
+    limit=app_config.aiohttp.connections_limit,
+    limit_per_host=app_config.aiohttp.connections_limit_per_host,
+    dns_cache_ttl=app_config.aiohttp.dns_cache_ttl,
+    keepalive_timeout=app_config.aiohttp.keepalive_timeout
+)
+
+
+def _headers(**kwargs: str) -> Dict[str, str]:
+    """Builds request headers with a rotated user-agent.
+
+    :param kwargs: str - additional headers
+    :return: Dict[str, str]
+    """
+    headers = {'User-Agent': user_agents.random(), **kwargs}
+    # the request is about to be sent
+    startup_profile.first_request()
+
+    return headers
+
+
 def _aiohttp_session(
     attempts: int = _REATTEMPTS_LIMIT,
-    delay: float = _REATTEMPT_DELAY
+    delay: float = _REATTEMPT_DELAY,
+    delay_max: float = _REATTEMPT_DELAY_MAX,
+    method: Optional[str] = None,
+    raise_on_failure: bool = False
 ) -> Callable:
-    """Starts a new properly-configured `aiohttp.ClientSession`.
+    """Obtains the shared `aiohttp.ClientSession` from `session_manager`.
     Injects this session as keyword argument to the decorated function.
 
+    Each attempt waits for a slot of the url host (see `rate_controller`).
+    Reattempts are made on network errors, timeouts and 429/5xx statuses,
+     other bad statuses (e.g. 404) return None right away.
+    Decorated function must receive `url` as the first argument and call
+     `response.raise_for_status()`.
+
     :param attempts: int - number of reattempts
-    :param delay: float - delay before each reattempt in seconds
+    :param delay: float - base delay before each reattempt in seconds
+    :param delay_max: float - max delay before each reattempt in seconds
+    :param method: Optional[str] - http method (metrics label), derived
+     from the function name if not specified
+    :param raise_on_failure: bool - if True, `FetchError` is raised once
+     all attempts fail (None is returned otherwise), so callers can tell
+     a failed request from a missing page (e.g. 404)
     :return: Callable
     """
     def decorator(func: Callable) -> Callable:
+        # `_get` -> `GET`
+        method_ = method or func.__name__.lstrip('_').upper()
+
         @wraps(func)
         async def wrapper(*args: Any, **kwargs: Any) -> Any:
-            async with ClientSession(
-                headers={'User-Agent': _ua.chrome},
-                timeout=_timeout
-            ) as session:
-                for attempt in range(attempts):
-                    # if OK, breaks the loop with `return` statement
-                    # if failed -> next iteration
-                    try:
-                        return await func(session=session, *args, **kwargs)
-                    except Exception as e:
-                        # 1. current attempt
-                        # 2. total attempts
-                        # 3. function name
-                        # 4. exception message or `timeout` for `TimeoutError`
-                        # 5. failed function args
-                        # 6. failed function kwargs
-                        logger.warning(
-                            'aiohttp request failed, attempt: %d of %d, '
-                            'func: [%s], reason: "%s", args: %s, kwargs: %s',
-                            attempt + 1,
-                            attempts,
-                            func.__name__,
-                            e
-                            if not isinstance(e, TimeoutError)
-                            else 'timeout',
-                            args,
-                            kwargs
-                        )
-                    # delay before each reattempt
-                    await asyncio.sleep(delay)
+            session = session_manager.get()
+            url = kwargs['url'] if 'url' in kwargs else args[0]
+            throttle = rate_controller.host(url)
+            error: Optional[Exception] = None
+
+            for attempt in range(attempts):
+                # pause requested by the host (`Retry-After`), if any
+                retry_after = None
+                # if OK, breaks the loop with `return` statement
+                # if failed -> next iteration
+                try:
+                    async with throttle.slot():
+                        with _request_seconds.time(method_):
+                            result = await func(
+                                session=session,
+                                *args,
+                                **kwargs
+                            )
+                    throttle.on_success()
+                    _requests.inc(method_, 'ok')
+
+                    return result
+                except Exception as e:
+                    error = e
+                    _requests.inc(
+                        method_,
+                        str(e.status)
+                        if isinstance(e, ClientResponseError)
+                        else 'timeout'
+                        if isinstance(e, TimeoutError)
+                        else 'error'
+                    )
+
+                    if isinstance(e, ClientResponseError):
+                        if e.status in _THROTTLE_STATUSES:
+                            retry_after = parse_retry_after(
+                                e.headers.get('Retry-After')
+                                if e.headers is not None
+                                else None
+                            )
+                            throttle.on_throttle(retry_after)
+                        elif e.status not in _RETRY_STATUSES:
+                            logger.warning(
+                                'aiohttp request failed, func: [%s], '
+                                'status: %d, args: %s, kwargs: %s',
+                                func.__name__,
+                                e.status,
+                                args,
+                                kwargs
+                            )
+
+                            return
+                    elif isinstance(e, TimeoutError):
+                        # timeouts usually mean the host is overloaded
+                        throttle.on_throttle()
+                    # 1. current attempt
+                    # 2. total attempts
+                    # 3. function name
+                    # 4. exception message or `timeout` for `TimeoutError`
+                    # 5. failed function args
+                    # 6. failed function kwargs
+                    logger.warning(
+                        'aiohttp request failed, attempt: %d of %d, '
+                        'func: [%s], reason: "%s", args: %s, kwargs: %s',
+                        attempt + 1,
+                        attempts,
+                        func.__name__,
+                        e
+                        if not isinstance(e, TimeoutError)
+                        else 'timeout',
+                        args,
+                        kwargs
+                    )
+                # no need to wait after the last attempt
+                if attempt + 1 < attempts:
+                    _retries.inc(method_, str(attempt + 1))
+                    # delay before each reattempt, jitter prevents
+                    #  concurrent requests from retrying in sync
+                    await asyncio.sleep(max(
+                        retry_after or 0,
+                        backoff_delay(attempt, delay, delay_max)
+                    ))
+
+            if raise_on_failure:
+                raise FetchError(
+                    f'{method_} {url}: all {attempts} attempts failed'
+                ) from error
 
         return wrapper
     return decorator
 
 
-@_aiohttp_session()
-async def fetch_soup(
+class _Response(NamedTuple):
+    """Response of `_get`."""
+    status: int
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+@_aiohttp_session(raise_on_failure=True)
+async def _get(
+    url: str,
+    session: "ClientSession",
+    **headers: str
+) -> Optional["_Response"]:
+    """This function makes a GET request to a given url.
+
+    :param url: str - targeted url
+    :param session: ClientSession - automatically injected
+    :param headers: str - additional headers
+    :return: Optional[_Response] - response if OK (or 304), None if
+     the page doesn't exist (e.g. 404), `FetchError` is raised if all
+     attempts fail
+    """
+    async with session.get(url, headers=_headers(**headers)) as response:
+        response.raise_for_status()
+
+        return _Response(
+            status=response.status,
+            body=await response.content.read(),
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified')
+        )
+
+
+@_aiohttp_session(method='GET', raise_on_failure=True)
+async def _get_stream(
     url: str,
     session: "ClientSession",
-) -> Optional["BeautifulSoup"]:
+    consumer: Callable[[], Any]
+) -> Optional[Any]:
+    """Same as `_get`, but the body is passed to the consumer chunk by
+     chunk as it arrives, instead of being read as a whole.
+
+    :param url: str - targeted url
+    :param session: ClientSession - automatically injected
+    :param consumer: Callable[[], Any] - creates a consumer (a new one per
+     attempt), its `.feed(chunk)` returns True once the rest of the body
+     isn't needed
+    :return: Optional[Any] - the consumer if OK, None if the page doesn't
+     exist (e.g. 404), `FetchError` is raised if all attempts fail
+    """
+    target = consumer()
+
+    async with session.get(url, headers=_headers()) as response:
+        response.raise_for_status()
+        received = 0
+
+        async for chunk in response.content.iter_any():
+            received += len(chunk)
+
+            if not target.feed(chunk):
+                continue
+
+            if (
+                response.content_length is not None
+                and response.content_length - received <= _DRAIN_LIMIT
+            ):
+                await response.content.read()
+                _stream_aborts.inc('drained')
+            else:
+                # the rest isn't downloaded at all
+                response.close()
+                _stream_aborts.inc('closed')
+
+            break
+
+        return target
+
+
+async def fetch_stream(
+    url: str,
+    consumer: Callable[[], Any]
+) -> Optional[Any]:
+    """This function makes a GET request to a given url and feeds its
+     response body to the consumer as it arrives (e.g.
+     `tree.StreamExtractor`), so the body is never kept as a whole and
+     the download is aborted once the consumer has got everything it
+     needs.
+
+    Neither `http_cache` nor `response_archive` are used (both need the
+     whole body), see `fetch_bytes`.
+
+    ! Raises `FetchError` if all attempts fail
+
+    :param url: str - targeted url
+    :param consumer: Callable[[], Any] - creates a consumer (a new one per
+     attempt), its `.feed(chunk: bytes) -> bool` returns True once the
+     rest of the body isn't needed
+    :return: Optional[Any] - the consumer fed with the body if OK, None
+     if the page doesn't exist (e.g. 404)
+    """
+    return await _get_stream(url, consumer=consumer)
+
+
+async def _fetch_cached(url: str) -> Optional[bytes]:
+    """Same as `fetch_bytes`, but `response_archive` is ignored.
+
+    :param url: str - targeted url
+    :return: Optional[bytes] - response body if OK, None if the page
+     doesn't exist (e.g. 404)
+    """
+    cached = await http_cache.get(url)
+
+    if cached is not None and cached.fresh:
+        return cached.body
+
+    headers = {}
+
+    if cached is not None:
+        if cached.etag:
+            headers['If-None-Match'] = cached.etag
+
+        if cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+
+    response = await _get(url, **headers)
+
+    if response is None:
+        return
+
+    if response.status == 304 and cached is not None:
+        await http_cache.refresh(url)
+
+        return cached.body
+
+    if response.status == 200:
+        await http_cache.put(
+            url,
+            response.body,
+            etag=response.etag,
+            last_modified=response.last_modified
+        )
+
+    return response.body
+
+
+async def fetch_bytes(url: str) -> Optional[bytes]:
+    """This function makes a GET request to a given url and returns
+     its raw response body.
+
+    If `http_cache` is enabled, fresh cached bodies are returned without
+     any request, stale ones are revalidated (conditional GET).
+    In replay mode of `response_archive`, bodies are read from the archive
+     (no network), in record mode they are appended to it.
+
+    ! Raises `FetchError` if all attempts fail
+
+    :param url: str - targeted url
+    :return: Optional[bytes] - response body if OK, None if the page
+     doesn't exist (e.g. 404) or isn't archived (replay mode)
+    """
+    if response_archive.replaying:
+        return await response_archive.read('GET', url)
+
+    body = await _fetch_cached(url)
+
+    if body is not None:
+        await response_archive.write('GET', url, body)
+
+    return body
+
+
+async def fetch_soup(url: str) -> Optional["BeautifulSoup"]:
     """This function makes a GET request to a given url and returns
      its response as `BeautifulSoup` instance.
 
-    :param session: ClientSession - automatically injected
+    ! Raises `FetchError` if all attempts fail
+
     :param url: str - targeted url
     :return: Optional[BeautifulSoup] - `BeautifulSoup` instance
      if OK, else None
     """
-    async with session.get(url) as response:
-        return BeautifulSoup(
-            markup=await response.content.read(),
-            features='lxml'
-        )
+    from bs4 import BeautifulSoup
+
+    markup = await fetch_bytes(url=url)
+
+    if markup is not None:
+        return BeautifulSoup(markup=markup, features='lxml')
 
 
 @_aiohttp_session()
-async def post(
+async def _post(
     url: str,
     session: "ClientSession",
     **kwargs: Any
-) -> Optional[Dict[str, Any]]:
+) -> Optional[bytes]:
+    """This function makes a POST request to a given url.
+
+    :param url: str - targeted url
+    :param session: ClientSession - automatically injected
+    :param kwargs: Any - additional keyword params supported by `aiohttp.post`
+    :return: Optional[bytes] - response body if OK, else None
+    """
+    kwargs['headers'] = _headers(**kwargs.get('headers', {}))
+
+    async with session.post(url, **kwargs) as response:
+        response.raise_for_status()
+
+        return await response.read()
+
+
+async def post(url: str, **kwargs: Any) -> Optional[Dict[str, Any]]:
     """This function makes a POST request to a given url and returns
      its response as `json` (dict).
 
+    In replay mode of `response_archive`, responses are read from
+     the archive (no network), in record mode they are appended to it.
+
     :param url: str - targeted url
-    :param session: ClientSession - automatically injected
     :param kwargs: Any - additional keyword params supported by `aiohttp.post`
     :return: Optional[Dict[str, Any]] - json response if OK, else None
     """
-    async with session.post(url, **kwargs) as response:
-        return await response.json()
+    key = post_key(url, kwargs.get('json'))
+
+    if response_archive.replaying:
+        body = await response_archive.read('POST', key)
+    else:
+        body = await _post(url, **kwargs)
+
+        if body is not None:
+            await response_archive.write('POST', key, body)
+
+    if body is not None:
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            logger.warning('invalid json response: %s, url: %s', e, url)
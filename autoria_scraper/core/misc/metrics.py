@@ -0,0 +1,450 @@
+"""This module contains runtime metrics - counters, histograms and
+ gauges, exposed in Prometheus text format.
+
+Metrics are always collected (a single dict update per observation),
+ the http endpoint is started only if `METRICS__ENABLED` is set.
+
+**Usage example**
+
+```python
+requests = metrics.counter('requests_total', 'Requests.', ('status',))
+requests.inc('200')
+
+latency = metrics.histogram('request_seconds', 'Latency.', ('method',))
+with latency.time('GET'):
+    ...
+```
+"""
+
+
+import time
+from bisect import bisect_left
+from abc import ABC, abstractmethod
+from logging import getLogger
+from contextlib import contextmanager
+from typing import (
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TYPE_CHECKING
+)
+
+from autoria_scraper.config import app_config
+
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+
+__all__ = ('metrics',)
+
+
+# upper bounds (in seconds), covers both parsing (ms) and slow requests
+_DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1, 2.5, 5, 10, 30, 60
+)
+_CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+logger = getLogger(__name__)
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Renders label pairs, e.g: `{method="GET",status="200"}`.
+
+    :param names: Sequence[str] - label names
+    :param values: Sequence[str] - label values
+    :return: str - rendered labels (empty string if no labels)
+    """
+    if not names:
+        return ''
+
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', '\\\\').replace('"', '\\"')
+        )
+        for name, value in zip(names, values)
+    )
+
+    return f'{{{pairs}}}'
+
+
+class _Metric(ABC):
+    """Base class of all metrics."""
+
+    type_: str = ''
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = ()
+    ) -> None:
+        """
+        :param name: str - metric name
+        :param documentation: str - `HELP` text
+        :param label_names: Sequence[str] - label names
+        :return: None
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+
+    @abstractmethod
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        """Yields `(suffix, labels, value)` of each sample.
+
+        :return: Iterator[Tuple[str, str, float]]
+        """
+
+    def render(self) -> List[str]:
+        """Renders the metric in Prometheus text format.
+
+        :return: List[str] - lines
+        """
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type_}',
+            *(
+                f'{self.name}{suffix}{labels} {value}'
+                for suffix, labels, value in self.samples()
+            )
+        ]
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+
+    type_ = 'counter'
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        """Increases the value of the label set.
+
+        :param label_values: str - label values (in `label_names` order)
+        :param amount: float - increment
+        :return: None
+        """
+        self._values[label_values] = (
+            self._values.get(label_values, 0) + amount
+        )
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def items(self) -> List[Tuple[Tuple[str, ...], float]]:
+        return sorted(self._values.items())
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for label_values, value in self.items():
+            yield '', _labels(self.label_names, label_values), value
+
+
+class Gauge(_Metric):
+    """Current value per label set, read from callbacks on render."""
+
+    type_ = 'gauge'
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+
+        self._callbacks: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def track(
+        self,
+        callback: Optional[Callable[[], float]],
+        *label_values: str
+    ) -> None:
+        """Sets (or removes, if `callback` is None) the value source
+         of the label set.
+
+        :param callback: Optional[Callable[[], float]] - value source
+        :param label_values: str - label values (in `label_names` order)
+        :return: None
+        """
+        if callback is None:
+            self._callbacks.pop(label_values, None)
+        else:
+            self._callbacks[label_values] = callback
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for label_values, callback in sorted(self._callbacks.items()):
+            yield '', _labels(self.label_names, label_values), callback()
+
+
+class Histogram(_Metric):
+    """Distribution of observed values per label set (cumulative
+     buckets, sum and count).
+    """
+
+    type_ = 'histogram'
+
+    def __init__(
+        self,
+        *args,
+        buckets: Sequence[float] = _DEFAULT_BUCKETS,
+        **kwargs
+    ) -> None:
+        super().__init__(*args, **kwargs)
+
+        self._buckets = tuple(sorted(buckets))
+        # label values -> per-bucket counts (+Inf bucket is the last one)
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """Records a single value.
+
+        :param value: float - observed value
+        :param label_values: str - label values (in `label_names` order)
+        :return: None
+        """
+        if label_values not in self._counts:
+            self._counts[label_values] = [0] * (len(self._buckets) + 1)
+            self._sums[label_values] = 0.0
+
+        self._counts[label_values][bisect_left(self._buckets, value)] += 1
+        self._sums[label_values] += value
+
+    @contextmanager
+    def time(self, *label_values: str) -> Iterator[None]:
+        """Observes the duration of the block (in seconds).
+
+        :param label_values: str - label values (in `label_names` order)
+        :return: Iterator[None]
+        """
+        started = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def count(self, *label_values: str) -> int:
+        return sum(self._counts.get(label_values, ()))
+
+    def sum(self, *label_values: str) -> float:
+        return self._sums.get(label_values, 0.0)
+
+    def quantile(self, q: float, *label_values: str) -> Optional[float]:
+        """Estimates the quantile (linear interpolation within the bucket,
+         same as `histogram_quantile` in Prometheus).
+
+        :param q: float - quantile (0 - 1)
+        :param label_values: str - label values (in `label_names` order)
+        :return: Optional[float] - estimated value, None if empty
+        """
+        counts = self._counts.get(label_values, ())
+        total = sum(counts)
+
+        if not total:
+            return
+
+        rank = q * total
+        cumulative = 0
+
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                if i == len(self._buckets):
+                    # +Inf bucket, the highest finite bound is the best guess
+                    return self._buckets[-1]
+
+                lower = self._buckets[i - 1] if i else 0.0
+
+                return lower + (self._buckets[i] - lower) * (
+                    (rank - cumulative) / count
+                )
+
+            cumulative += count
+
+    def label_sets(self) -> List[Tuple[str, ...]]:
+        return sorted(self._counts)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for label_values in self.label_sets():
+            cumulative = 0
+
+            for bound, count in zip(
+                (*self._buckets, '+Inf'),
+                self._counts[label_values]
+            ):
+                cumulative += count
+                yield '_bucket', _labels(
+                    (*self.label_names, 'le'),
+                    (*label_values, bound)
+                ), cumulative
+
+            labels = _labels(self.label_names, label_values)
+            yield '_sum', labels, self._sums[label_values]
+            yield '_count', labels, cumulative
+
+
+class MetricsRegistry:
+    """Keeps all metrics of the process, renders them and serves them
+     over http.
+    Don't forget to call `.close()` on exit.
+    """
+
+    def __init__(self, enabled: bool, host: str, port: int) -> None:
+        """
+        :param enabled: bool - if True, `.start()` serves the metrics
+        :param host: str - interface of the http endpoint
+        :param port: int - port of the http endpoint
+        :return: None
+        """
+        self.enabled = enabled
+        self._host = host
+        self._port = port
+        self._metrics: Dict[str, "_Metric"] = {}
+        self._runner: Optional["web.AppRunner"] = None
+
+    def __register(self, metric: "_Metric") -> "_Metric":
+        # modules may be reloaded (e.g. in worker processes), so the same
+        #  metric is returned instead of raising
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = ()
+    ) -> "Counter":
+        return self.__register(Counter(name, documentation, label_names))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = ()
+    ) -> "Gauge":
+        return self.__register(Gauge(name, documentation, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = _DEFAULT_BUCKETS
+    ) -> "Histogram":
+        return self.__register(
+            Histogram(name, documentation, label_names, buckets=buckets)
+        )
+
+    def render(self) -> str:
+        """Renders all metrics in Prometheus text format.
+
+        :return: str
+        """
+        return '\n'.join(
+            line
+            for metric in self._metrics.values()
+            for line in metric.render()
+        ) + '\n'
+
+    def counters(self) -> Dict[str, float]:
+        """Snapshot of all counters, e.g. to aggregate them across
+         processes.
+
+        :return: Dict[str, float] - `name{labels}` -> value
+        """
+        return {
+            f'{metric.name}{_labels(metric.label_names, label_values)}': (
+                value
+            )
+            for metric in self._metrics.values()
+            if isinstance(metric, Counter)
+            for label_values, value in metric.items()
+        }
+
+    def summary(self) -> List[str]:
+        """Human-readable summary: counters totals, histograms count,
+         mean and estimated p50/p95.
+
+        :return: List[str] - lines
+        """
+        lines = []
+
+        for metric in self._metrics.values():
+            if isinstance(metric, Counter):
+                for label_values, value in metric.items():
+                    lines.append('{}{} = {:g}'.format(
+                        metric.name,
+                        _labels(metric.label_names, label_values),
+                        value
+                    ))
+            elif isinstance(metric, Histogram):
+                for label_values in metric.label_sets():
+                    count = metric.count(*label_values)
+                    lines.append(
+                        '{}{}: count = {}, mean = {:.4f}, p50 ~ {:.4f}, '
+                        'p95 ~ {:.4f}'.format(
+                            metric.name,
+                            _labels(metric.label_names, label_values),
+                            count,
+                            metric.sum(*label_values) / count,
+                            metric.quantile(0.5, *label_values),
+                            metric.quantile(0.95, *label_values)
+                        )
+                    )
+
+        return lines
+
+    async def __handler(self, _: "web.Request") -> "web.Response":
+        from aiohttp import web
+
+        return web.Response(
+            text=self.render(),
+            headers={'Content-Type': _CONTENT_TYPE}
+        )
+
+    async def start(self, port_offset: int = 0) -> None:
+        """Starts the http endpoint (`GET /metrics`) if enabled.
+
+        :param port_offset: int - added to the configured port (each
+         process of the sharded runner serves its own metrics)
+        :return: None
+        """
+        if not self.enabled or self._runner is not None:
+            return
+
+        # the http server is imported only if enabled
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get('/metrics', self.__handler)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        port = self._port + port_offset
+        await web.TCPSite(self._runner, self._host, port).start()
+
+        logger.info(
+            'metrics are served at http://%s:%d/metrics',
+            self._host,
+            port
+        )
+
+    async def close(self) -> None:
+        """Stops the http endpoint.
+
+        :return: None
+        """
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+        self._runner = None
+
+
+metrics = MetricsRegistry(
+    enabled=app_config.metrics.enabled,
+    host=app_config.metrics.host,
+    port=app_config.metrics.port
+)
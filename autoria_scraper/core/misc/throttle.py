@@ -0,0 +1,276 @@
+"""This module contains adaptive rate control for `aiohttp` requests.
+
+Each host gets its own `HostThrottle`:
+    - token bucket - limits the request rate (shared by all request types)
+    - AIMD concurrency limit - grows by 1 per window of successful requests,
+     halves on throttling signals (429/503, timeouts)
+    - pause - set from `Retry-After` header, blocks all requests to the host
+"""
+
+
+import time
+import random
+import asyncio
+from logging import getLogger
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from yarl import URL
+
+from autoria_scraper.config import app_config
+from autoria_scraper.core.misc.metrics import metrics
+
+
+__all__ = ('rate_controller', 'backoff_delay', 'parse_retry_after')
+
+
+# concurrency limit is multiplied by this value on throttling
+_DECREASE_FACTOR: float = 0.5
+# responses of requests sent before the decrease carry the same signal,
+#  so the limit is decreased at most once per this period (in seconds)
+_DECREASE_COOLDOWN: float = 1.0
+
+_in_flight = metrics.gauge(
+    'autoria_http_in_flight',
+    'Http requests in flight per host.',
+    ('host',)
+)
+_concurrency_limit = metrics.gauge(
+    'autoria_http_concurrency_limit',
+    'Adaptive concurrency limit per host.',
+    ('host',)
+)
+
+logger = getLogger(__name__)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter.
+
+    :param attempt: int - zero-based attempt number
+    :param base: float - delay of the first attempt (in seconds)
+    :param cap: float - max delay (in seconds)
+    :return: float - delay (in seconds)
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses `Retry-After` header value (seconds or HTTP-date).
+
+    :param value: Optional[str] - header value
+    :return: Optional[float] - delay (in seconds) or None if invalid
+    """
+    if not value:
+        return
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(
+            0.0,
+            (
+                parsedate_to_datetime(value) - datetime.now(timezone.utc)
+            ).total_seconds()
+        )
+    except (TypeError, ValueError):
+        return
+
+
+class TokenBucket:
+    """Classic token bucket, `rate` tokens per second, up to `burst`
+     tokens are accumulated.
+    If `rate` <= 0, the bucket is unlimited.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        """
+        :param rate: float - tokens per second
+        :param burst: int - bucket capacity
+        :return: None
+        """
+        self._rate = rate
+        self._burst = max(1, burst)
+        self._tokens = float(self._burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Waits until a token is available and takes it.
+
+        :return: None
+        """
+        if self._rate <= 0:
+            return
+        # lock guarantees FIFO order of waiting requests
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._burst,
+                    self._tokens + (now - self._updated) * self._rate
+                )
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+class HostThrottle:
+    """Rate and concurrency controller of a single host."""
+
+    def __init__(
+        self,
+        host: str,
+        rate: float,
+        burst: int,
+        min_concurrency: int,
+        max_concurrency: int
+    ) -> None:
+        """
+        :param host: str - host name (for logging)
+        :param rate: float - requests per second (<= 0 - unlimited)
+        :param burst: int - token bucket capacity
+        :param min_concurrency: int - lower bound of concurrency limit
+        :param max_concurrency: int - upper bound (and initial value)
+         of concurrency limit
+        :return: None
+        """
+        self._host = host
+        self._bucket = TokenBucket(rate=rate, burst=burst)
+        self._min = max(1, min_concurrency)
+        self._max = max(self._min, max_concurrency)
+        self._limit = float(self._max)
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._decreased_at = 0.0
+        self._condition = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        """Current concurrency limit."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """Amount of requests in flight."""
+        return self._in_flight
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator["HostThrottle"]:
+        """Waits for the pause (if any), a free concurrency slot and
+         a token, then holds the slot until exit.
+
+        :return: AsyncIterator[HostThrottle]
+        """
+        while (pause := self._paused_until - time.monotonic()) > 0:
+            await asyncio.sleep(pause)
+
+        async with self._condition:
+            await self._condition.wait_for(
+                lambda: self._in_flight < self.limit
+            )
+            self._in_flight += 1
+
+        try:
+            await self._bucket.acquire()
+
+            yield self
+        finally:
+            async with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def on_success(self) -> None:
+        """Additive increase: +1 per `limit` successful requests.
+
+        :return: None
+        """
+        self._limit = min(self._max, self._limit + 1 / self._limit)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """Multiplicative decrease, pauses the host if `retry_after`
+         is given.
+
+        :param retry_after: Optional[float] - pause (in seconds)
+        :return: None
+        """
+        now = time.monotonic()
+
+        if now - self._decreased_at >= _DECREASE_COOLDOWN:
+            self._limit = max(self._min, self._limit * _DECREASE_FACTOR)
+            self._decreased_at = now
+
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+
+        logger.warning(
+            'throttled by host: %s, concurrency limit: %d, pause: %s',
+            self._host,
+            self.limit,
+            retry_after
+        )
+
+
+class RateController:
+    """Keeps `HostThrottle` per host, shared by all request functions."""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        min_concurrency: int,
+        max_concurrency: int
+    ) -> None:
+        """
+        :param rate: float - requests per second per host
+         (<= 0 - unlimited)
+        :param burst: int - token bucket capacity
+        :param min_concurrency: int - lower bound of concurrency limit
+        :param max_concurrency: int - upper bound of concurrency limit
+        :return: None
+        """
+        self._rate = rate
+        self._burst = burst
+        self._min_concurrency = min_concurrency
+        self._max_concurrency = max_concurrency
+        self._hosts: Dict[str, "HostThrottle"] = {}
+
+    def host(self, url: str) -> "HostThrottle":
+        """Returns the throttle of the url host.
+
+        :param url: str - request url
+        :return: HostThrottle
+        """
+        host = URL(url).host or ''
+
+        if host not in self._hosts:
+            self._hosts[host] = HostThrottle(
+                host=host,
+                rate=self._rate,
+                burst=self._burst,
+                min_concurrency=self._min_concurrency,
+                max_concurrency=self._max_concurrency
+            )
+            throttle = self._hosts[host]
+            _in_flight.track(lambda: throttle.in_flight, host)
+            _concurrency_limit.track(lambda: throttle.limit, host)
+
+        return self._hosts[host]
+
+
+rate_controller = RateController(
+    rate=app_config.aiohttp.rate_limit,
+    burst=app_config.aiohttp.rate_burst,
+    min_concurrency=app_config.aiohttp.min_concurrency,
+    max_concurrency=app_config.aiohttp.connections_limit_per_host
+)
@@ -1,41 +1,145 @@
 """This module contains useful functions."""
 
 
-from asyncio import gather
-from typing import Any, AsyncGenerator, Callable
+import os
+import asyncio
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    Awaitable,
+    Dict,
+    Iterable,
+    List,
+    Tuple
+)
 
 
-__all__ = ('chunked_range_processing',)
+__all__ = ('bounded_as_completed', 'chunked', 'replace_file')
 
 
-async def chunked_range_processing(
-    func: Callable,
-    from_: int,
-    to_: int,
-    batch: int
+async def bounded_as_completed(
+    aws: Iterable[Awaitable],
+    limit: int,
+    ordered: bool = False
 ) -> AsyncGenerator[Any, None]:
     """This function is used to execute multiple tasks concurrently.
 
-    ! if the difference value between `to_` and `from_` is less than `batch`
-     value, the batch size will be reduced to this difference value
+    Keeps at most `limit` tasks in flight, a new task is scheduled as soon
+     as any running task completes (sliding window), so a single slow task
+     doesn't block the rest of the work.
 
-    ! Raises `ValueError` if `to_` <= `from_`
+    ! `aws` is consumed lazily, so it's fine to pass a generator of
+     coroutines of any length
 
-    ! `func` should receive two positional arguments: `from` and `to`
+    ! Raises `ValueError` if `limit` < 1
 
-    :param func: Callable - function, that takes `start:int` and `end:int`
-     params and returns a list of coroutines
-    :param from_: int - range from
-    :param to_: int - range to
-    :param batch: int - batch size
+    ! pending tasks are cancelled if the generator is closed early
+
+    :param aws: Iterable[Awaitable] - awaitables to execute
+    :param limit: int - max amount of tasks in flight
+    :param ordered: bool - if True, results are yielded in the order
+     of `aws`, otherwise as soon as they are available
     :return: AsyncGenerator[Any, None]
     """
-    if to_ <= from_:
-        raise ValueError(f'bad range params: from = {from_}, to = {to_}')
-    # batch size is reduced in case its value is greater than
-    # the difference between `to_` and `from_`
-    batch = min(batch, to_ - from_)
-    for i in range(from_, to_, batch):
-        end = min(i + batch, to_)
-        # yields a tuple of results
-        yield await gather(*func(i, end))
+    if limit < 1:
+        raise ValueError(f'bad limit param: {limit}')
+
+    aws = iter(aws)
+    # maps running task to its index in `aws`
+    pending: Dict[asyncio.Task, int] = {}
+    # results which are ready, but can't be yielded yet (`ordered` mode)
+    buffer: Dict[int, Any] = {}
+    submitted = 0
+    next_index = 0
+
+    def refill() -> None:
+        nonlocal submitted
+
+        while len(pending) < limit:
+            try:
+                aw = next(aws)
+            except StopIteration:
+                return
+
+            pending[asyncio.ensure_future(aw)] = submitted
+            submitted += 1
+
+    try:
+        refill()
+
+        while pending:
+            done, _ = await asyncio.wait(
+                pending,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                # raises the task exception (if any), same as `gather` does
+                buffer[pending.pop(task)] = task.result()
+            # refills the window before yielding results, so the consumer
+            #  doesn't keep the pipe idle
+            refill()
+
+            if not ordered:
+                for index in sorted(buffer):
+                    yield buffer.pop(index)
+            else:
+                while next_index in buffer:
+                    yield buffer.pop(next_index)
+                    next_index += 1
+    finally:
+        for task in pending:
+            task.cancel()
+
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def chunked(
+    aiterable: AsyncIterable[Any],
+    size: int
+) -> AsyncGenerator[Tuple[Any, ...], None]:
+    """Groups items of an async iterable into tuples of `size` items.
+    The last tuple may be shorter.
+
+    :param aiterable: AsyncIterable[Any] - source of items
+    :param size: int - chunk size
+    :return: AsyncGenerator[Tuple[Any, ...], None]
+    """
+    chunk: List[Any] = []
+
+    async for item in aiterable:
+        chunk.append(item)
+
+        if len(chunk) >= size:
+            yield tuple(chunk)
+            chunk = []
+
+    if chunk:
+        yield tuple(chunk)
+
+
+def replace_file(path: str, data: str) -> None:
+    """Atomically replaces the file: a temporary file is written, synced
+     and renamed, so readers (and a crash) never see a partial file.
+
+    :param path: str - file path
+    :param data: str - new content
+    :return: None
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp = f'{path}.tmp'
+
+    with open(temp, 'w') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(temp, path)
+    # the rename itself has to be durable as well
+    fd = os.open(directory, os.O_RDONLY)
+
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
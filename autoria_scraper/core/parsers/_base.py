@@ -2,16 +2,24 @@
 """
 
 
-from pydantic import BaseModel
+from typing import Any, Dict
 
 
 __all__ = ('BaseParser',)
 
 
-class BaseParser(BaseModel):
-    """`pydantic.BaseModel` with preconfigured settings.
-    Use instead of `BaseModel` for parsers.
+class BaseParser:
+    """Base class for parsed records.
+
+    Use together with `@dataclass(slots=True)`: each record is a compact
+     object with plain values only, computed once on creation.
     """
 
-    class Config:
-        arbitrary_types_allowed = True
+    __slots__ = ()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Returns record fields as dict (values aren't copied).
+
+        :return: Dict[str, Any]
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
@@ -2,88 +2,136 @@
 
 
 import re
+from hashlib import blake2b
+from dataclasses import dataclass
 from typing import Optional, Dict, Any
 
-from bs4 import Tag
-from pydantic import computed_field, Field
-
 from autoria_scraper.core.parsers._base import BaseParser
 
 
 __all__ = ('CarParser',)
 
 
+# fields which define the content of the listing (seller's phone number
+#  is obtained separately, so it's excluded)
+_FINGERPRINT_FIELDS = (
+    'title',
+    'price_usd',
+    'odometer',
+    'username',
+    'image_url',
+    'images_count',
+    'car_number',
+    'car_vin'
+)
+
+
+@dataclass(slots=True)
 class CarParser(BaseParser):
-    """Attributes which start with `t_` are hidden in `.model_dump()`.
+    """Parsed car record, fields are named after `Car` columns.
+    Use `.parse()` to create a record from raw strings.
     Define data parsing logic here.
     """
-    t_url: str = Field(exclude=True)
-    t_title: "Tag" = Field(exclude=True)
-    t_price_usd: "Tag" = Field(exclude=True)
-    t_odometer: "Tag" = Field(exclude=True)
-    t_username: "Tag" = Field(exclude=True)
-    t_phone_number: Dict[str, Any] = Field(exclude=True)
-    t_image_url: "Tag" = Field(exclude=True)
-    t_images_count: "Tag" = Field(exclude=True)
-    t_car_number: Optional["Tag"] = Field(default=None, exclude=True)
-    t_car_vin: Optional["Tag"] = Field(default=None, exclude=True)
-
-    @computed_field
-    def url(self) -> str:
-        return self.t_url
-
-    @computed_field
-    def title(self) -> str:
-        return self.t_title.get_text(strip=True)
-
-    @computed_field
-    def price_usd(self) -> int:
-        return int(
-            ''.join(self.t_price_usd.get_text(strip=True).split(' ')[:-1])
+    url: str
+    title: str
+    price_usd: int
+    odometer: int
+    username: str
+    image_url: Optional[str]
+    images_count: int
+    car_number: Optional[str] = None
+    car_vin: Optional[str] = None
+    phone_number: Optional[str] = None
+    # see `.fingerprint()`
+    content_hash: Optional[int] = None
+
+    def fingerprint(self) -> int:
+        """Computes 64-bit hash of the listing content, used to detect
+         changes between crawls.
+
+        :return: int - signed 64-bit integer (fits `BIGINT` column)
+        """
+        return int.from_bytes(
+            blake2b(
+                '\x1f'.join(
+                    repr(getattr(self, name)) for name in _FINGERPRINT_FIELDS
+                ).encode(),
+                digest_size=8
+            ).digest(),
+            'big',
+            signed=True
         )
 
-    @computed_field
-    def odometer(self) -> int:
-        return int(
-            re
-            .search(r'^\d+', self.t_odometer.get_text(strip=True))
-            .group()
-        ) * 1000 if [_ for _ in self.t_odometer.text if _.isnumeric()] else 0
-
-    @computed_field
-    def car_vin(self) -> Optional[str]:
-        return self.t_car_vin.get_text(strip=True) if self.t_car_vin else None
+    @classmethod
+    def parse(
+        cls,
+        url: str,
+        title: str,
+        price_usd: str,
+        odometer: str,
+        username: str,
+        image_url: Optional[str],
+        images_count: str,
+        car_number: Optional[str] = None,
+        car_vin: Optional[str] = None
+    ) -> "CarParser":
+        """Creates a record from raw strings extracted from the page
+         (text content of tags is stripped, see
+         `autoria_scraper.core.extractors`), so the parser doesn't depend
+         on the extraction engine.
+
+        ! Raises `ValueError` if required values are missing
+
+        :param url: str - direct link to the car
+        :param title: str - title text
+        :param price_usd: str - price text, e.g: "12 500 $"
+        :param odometer: str - odometer text, e.g: "100 тис. км пробіг"
+        :param username: str - seller name
+        :param image_url: Optional[str] - primary image url
+        :param images_count: str - images count text, e.g: "з 17"
+        :param car_number: Optional[str] - state number
+        :param car_vin: Optional[str] - vin code
+        :return: CarParser
+        """
+        if title is None or username is None:
+            raise ValueError(f'title/username is missing: {url}')
+
+        car = cls(
+            url=url,
+            title=title,
+            price_usd=int(''.join(price_usd.split(' ')[:-1])),
+            odometer=int(
+                re
+                .search(r'^\d+', odometer)
+                .group()
+            ) * 1000 if [_ for _ in odometer if _.isnumeric()] else 0,
+            username=username,
+            image_url=image_url,
+            images_count=int(images_count.split(' ')[-1]),
+            car_number=(
+                car_number.strip()
+                if car_number is not None
+                else None
+            ),
+            car_vin=car_vin
+        )
+        car.content_hash = car.fingerprint()
 
-    @computed_field
-    def image_url(self) -> str:
-        return self.t_image_url.get('srcset')
+        return car
 
-    @computed_field
-    def username(self) -> str:
-        return self.t_username.get_text(strip=True)
+    @staticmethod
+    def parse_phone_number(payload: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Extracts phone number from the `popUp` endpoint response.
 
-    @computed_field
-    def phone_number(self) -> Optional[str]:
+        :param payload: Optional[Dict[str, Any]] - json response
+        :return: Optional[str] - phone number, e.g: 380671234567
+        """
         try:
             return '38{}'.format(
-                self.t_phone_number['additionalParams']['phoneStr']
+                payload['additionalParams']['phoneStr']
                 .replace(' ', '')
                 .replace('(', '')
                 .replace(')', '')
             )
-        except KeyError:
+        except (KeyError, TypeError):
             return
-
-    @computed_field
-    def images_count(self) -> int:
-        return int(self.t_images_count.get_text(strip=True).split(' ')[-1])
-
-    @computed_field
-    def car_number(self) -> Optional[str]:
-        if self.t_car_number:
-            return ''.join(
-                self.t_car_number.find_all(
-                    string=True,
-                    recursive=False
-                )
-            ).strip()
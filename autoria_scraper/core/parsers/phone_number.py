@@ -1,10 +1,7 @@
 """This module contains `PhoneNumberParser`."""
 
 
-import re
-
-from bs4 import Tag
-from pydantic import computed_field, Field
+from dataclasses import dataclass
 
 from autoria_scraper.core.parsers._base import BaseParser
 
@@ -12,26 +9,18 @@ from autoria_scraper.core.parsers._base import BaseParser
 __all__ = ('PhoneNumberParser',)
 
 
+@dataclass(slots=True)
 class PhoneNumberParser(BaseParser):
-    """Attributes which start with `t_` are hidden in `.model_dump()`.
-    Define data parsing logic here.
+    """Pieces of seller's phone number, required for the `popUp`
+     endpoint request.
+
+    ! Raises `ValueError` if any piece is missing
     """
-    t_auto_id: "Tag" = Field(exclude=True)
-    t_phone_id: "Tag" = Field(exclude=True)
-    t_user_id: str = Field(exclude=True)
-
-    @computed_field
-    def auto_id(self) -> str:
-        return self.t_auto_id.get('data-auto-id')
-
-    @computed_field
-    def phone_id(self) -> str:
-        return self.t_phone_id.get('data-value-id')
-
-    @computed_field
-    def user_id(self) -> str:
-        return (
-            re
-            .search(r'data-owner-id="(\d*)"', self.t_user_id)
-            .group(1)
-        )
+    auto_id: str
+    phone_id: str
+    user_id: str
+
+    def __post_init__(self) -> None:
+        for name in self.__slots__:
+            if getattr(self, name) is None:
+                raise ValueError(f'phone number piece is missing: {name}')
@@ -0,0 +1,169 @@
+"""This module contains `PhoneCache` class."""
+
+
+import time
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple
+)
+
+from autoria_scraper.core.misc import metrics
+
+
+__all__ = ('PhoneCache',)
+
+
+# (user_id, phone_id)
+_Key = Tuple[str, str]
+
+_lookups = metrics.counter(
+    'autoria_phone_cache_total',
+    'Phone number lookups: hit - cached, shared - joined a request in '
+    'flight, miss - requested.',
+    ('result',)
+)
+
+
+class PhoneCache:
+    """Memoizes sellers' phone numbers by (`user_id`, `phone_id`),
+     so dealers with many listings cost a single `popUp` request.
+
+    In-memory LRU with TTL, persisted by the database (`phones` table):
+     warm it up with stored numbers on startup and save `.drain()`-ed
+     entries along with the listings.
+    Concurrent lookups of the same key share a single request.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        """
+        :param max_size: int - max amount of cached numbers
+        :param ttl: float - lifetime of cached numbers (in seconds)
+        :return: None
+        """
+        self._max_size = max_size
+        self._ttl = ttl
+        # key -> (phone number, resolution timestamp)
+        self._entries: OrderedDict[_Key, Tuple[str, float]] = OrderedDict()
+        self._in_flight: Dict[_Key, "asyncio.Future"] = {}
+        # resolved by this process, not persisted yet (`Phone` columns)
+        self._pending: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(
+        self,
+        user_id: str,
+        phone_id: str,
+        phone_number: str,
+        resolved_at: Optional[datetime] = None
+    ) -> None:
+        """Caches a single number (e.g. loaded from the database).
+
+        :param user_id: str - seller id
+        :param phone_id: str - phone id
+        :param phone_number: str - phone number
+        :param resolved_at: Optional[datetime] - resolution datetime (UTC,
+         same as `Phone.datetime_resolved`), now if not specified
+        :return: None
+        """
+        self._entries[(user_id, phone_id)] = (
+            phone_number,
+            resolved_at.replace(tzinfo=timezone.utc).timestamp()
+            if resolved_at is not None
+            else time.time()
+        )
+        self._entries.move_to_end((user_id, phone_id))
+
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, user_id: str, phone_id: str) -> Optional[str]:
+        """Returns the cached number if it's not expired.
+
+        :param user_id: str - seller id
+        :param phone_id: str - phone id
+        :return: Optional[str] - phone number or None
+        """
+        entry = self._entries.get((user_id, phone_id))
+
+        if entry is None:
+            return
+
+        if time.time() - entry[1] > self._ttl:
+            del self._entries[(user_id, phone_id)]
+
+            return
+
+        self._entries.move_to_end((user_id, phone_id))
+
+        return entry[0]
+
+    async def resolve(
+        self,
+        user_id: str,
+        phone_id: str,
+        request: Callable[[], Awaitable[Optional[str]]]
+    ) -> Optional[str]:
+        """Returns the cached number, or obtains it with `request`
+         (at most one request per key at a time).
+
+        :param user_id: str - seller id
+        :param phone_id: str - phone id
+        :param request: Callable[[], Awaitable[Optional[str]]] - obtains
+         the number, failures (None) aren't cached
+        :return: Optional[str] - phone number or None
+        """
+        if (phone_number := self.get(user_id, phone_id)) is not None:
+            _lookups.inc('hit')
+
+            return phone_number
+
+        key = (user_id, phone_id)
+
+        if key in self._in_flight:
+            _lookups.inc('shared')
+
+            return await asyncio.shield(self._in_flight[key])
+
+        _lookups.inc('miss')
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+
+        phone_number = None
+
+        try:
+            phone_number = await request()
+        finally:
+            # waiters receive None if the request failed
+            future.set_result(phone_number)
+            del self._in_flight[key]
+
+        if phone_number is not None:
+            self.add(user_id, phone_id, phone_number)
+            self._pending.append({
+                'user_id': user_id,
+                'phone_id': phone_id,
+                'phone_number': phone_number,
+                'datetime_resolved': datetime.utcnow()
+            })
+
+        return phone_number
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """Returns numbers resolved since the previous call, those have
+         to be persisted.
+
+        :return: List[Dict[str, Any]] - records (`Phone` columns)
+        """
+        pending, self._pending = self._pending, []
+
+        return pending
@@ -0,0 +1,356 @@
+"""This module contains `Pipeline` class, which connects scrapers and
+ persistence into concurrent stages.
+
+catalog (links) -> direct (parsed entities) -> phone (phone numbers)
+ -> save (db)
+
+Stages are connected by bounded queues (`Frontier` - the priority queue
+ of links, `asyncio.Queue` instances), so a slow stage applies
+ backpressure to the previous one instead of growing memory usage.
+"""
+
+
+import asyncio
+from logging import getLogger
+from contextlib import aclosing
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from autoria_scraper.config import app_config
+from autoria_scraper.core.ids import ListingSet
+from autoria_scraper.core.index import ListingIndex
+from autoria_scraper.core.phones import PhoneCache
+from autoria_scraper.core.checkpoint import Checkpoint
+from autoria_scraper.core.frontier import Frontier
+from autoria_scraper.core.misc import FetchError, metrics
+from autoria_scraper.core.scrapers import CatalogScraper, DirectScraper
+
+
+__all__ = ('Pipeline',)
+
+
+logger = getLogger(__name__)
+
+# marks the end of a queue (one per consumer)
+_STOP = object()
+# partially filled batch is saved if no new entity appears during
+#  this period (in seconds)
+_FLUSH_INTERVAL: float = 1.0
+
+_queue_depth = metrics.gauge(
+    'autoria_pipeline_queue_depth',
+    'Amount of items waiting in the queue between stages.',
+    ('queue',)
+)
+_saved_entities = metrics.counter(
+    'autoria_pipeline_entities_total',
+    'Entities passed to the save stage.'
+)
+
+
+class Pipeline:
+    """Runs catalog link discovery, direct page extraction and
+     persistence concurrently.
+    """
+
+    def __init__(
+        self,
+        catalog_scraper: "CatalogScraper",
+        direct_scraper: "DirectScraper",
+        save: Callable[[List[Any]], Awaitable[Any]],
+        direct_concurrency: int,
+        save_concurrency: int,
+        save_batch_size: int,
+        frontier: "Frontier",
+        entities_queue_size: int,
+        phone_concurrency: Optional[int] = None,
+        phones_queue_size: Optional[int] = None,
+        checkpoint: Optional["Checkpoint"] = None
+    ) -> None:
+        """
+        :param catalog_scraper: CatalogScraper - links producer
+        :param direct_scraper: DirectScraper - used to process each link
+        :param save: Callable[[List[Any]], Awaitable[Any]] - persists
+         a batch of parsed entities
+        :param direct_concurrency: int - amount of concurrent direct tasks
+        :param save_concurrency: int - amount of concurrent `save` calls
+        :param save_batch_size: int - max amount of entities per `save` call
+        :param frontier: Frontier - catalog -> direct queue (links are
+         handed out by priority)
+        :param entities_queue_size: int - capacity of phone -> save queue
+        :param phone_concurrency: Optional[int] - amount of concurrent
+         phone number tasks (`direct_concurrency` if not specified)
+        :param phones_queue_size: Optional[int] - capacity of direct ->
+         phone queue (`entities_queue_size` if not specified)
+        :param checkpoint: Optional[Checkpoint] - progress of the crawl
+         (the same instance has to be passed to `catalog_scraper`), links
+         are marked as finished or failed by the stages
+        :return: None
+        """
+        self._catalog_scraper = catalog_scraper
+        self._direct_scraper = direct_scraper
+        self._save = save
+        self._direct_concurrency = direct_concurrency
+        self._phone_concurrency = phone_concurrency or direct_concurrency
+        self._save_concurrency = save_concurrency
+        self._save_batch_size = save_batch_size
+        self._frontier = frontier
+        self._phones = asyncio.Queue(
+            maxsize=phones_queue_size or entities_queue_size
+        )
+        self._entities = asyncio.Queue(maxsize=entities_queue_size)
+        self._checkpoint = checkpoint
+
+    @classmethod
+    def from_config(
+        cls,
+        save: Callable[[List[Any]], Awaitable[Any]],
+        index: Optional["ListingIndex"] = None,
+        phones: Optional["PhoneCache"] = None,
+        checkpoint: Optional["Checkpoint"] = None,
+        shard: Tuple[int, int] = (0, 1)
+    ) -> "Pipeline":
+        """Creates the pipeline configured by `app_config.scraper`.
+
+        :param save: Callable[[List[Any]], Awaitable[Any]] - persists
+         a batch of parsed entities
+        :param index: Optional[ListingIndex] - listings known from
+         previous runs
+        :param phones: Optional[PhoneCache] - memoized phone numbers
+        :param checkpoint: Optional[Checkpoint] - progress of the crawl
+        :param shard: Tuple[int, int] - index of this shard and total
+         amount of shards, catalog pages are split between shards
+        :return: Pipeline
+        """
+        config = app_config.scraper
+
+        return cls(
+            catalog_scraper=CatalogScraper(
+                root_url=config.root_url.__str__(),
+                batch_size=config.catalog_concurrency or config.batch_size,
+                pages_limit=config.pages_limit,
+                index=index,
+                incremental_pages=config.incremental_pages,
+                recheck=config.recheck_known,
+                checkpoint=checkpoint,
+                shard=shard[0],
+                shards=shard[1]
+            ),
+            direct_scraper=DirectScraper(
+                phone_url=config.phone_url.__str__(),
+                batch_size=config.direct_concurrency or config.batch_size,
+                phones=phones,
+                index=index
+            ),
+            save=save,
+            direct_concurrency=config.direct_concurrency or config.batch_size,
+            save_concurrency=config.save_concurrency,
+            save_batch_size=config.save_batch_size or config.batch_size,
+            frontier=Frontier.from_config(index=index),
+            entities_queue_size=config.entities_queue_size,
+            phone_concurrency=config.phone_concurrency,
+            phones_queue_size=config.phones_queue_size,
+            checkpoint=checkpoint
+        )
+
+    @property
+    def discovered(self) -> "ListingSet":
+        """Direct links discovered by the catalog stage.
+
+        :return: ListingSet
+        """
+        return self._catalog_scraper.discovered
+
+    def __finish(self, url: str, failed: bool = False) -> None:
+        """Marks the link as finished or failed (if checkpoints are
+         enabled).
+
+        :param url: str - direct link to the car
+        :param failed: bool - if True, the link is retried on resume
+        :return: None
+        """
+        if self._checkpoint is None:
+            return
+
+        if failed:
+            self._checkpoint.fail(url)
+        else:
+            self._checkpoint.finish(url)
+
+    async def __catalog_stage(self) -> None:
+        """Pushes discovered links to the frontier, discovery is stopped
+         once the crawl budget is exhausted (unserved links stay pending).
+
+        :return: None
+        """
+        async with aclosing(self._catalog_scraper.stream()) as links:
+            async for url in links:
+                # blocks if direct stage can't keep up (backpressure)
+                if await self._frontier.put(
+                    url,
+                    failed=self._checkpoint is not None
+                    and self._checkpoint.was_failed(url)
+                ):
+                    continue
+
+                if self._frontier.exhausted:
+                    break
+                # re-checked recently
+                self.__finish(url)
+
+        await self._frontier.close()
+
+    async def __direct_worker(self) -> None:
+        """Processes links one by one and pushes parsed entities
+         (without phone numbers) to the phones queue.
+
+        :return: None
+        """
+        while (url := await self._frontier.get()) is not None:
+            # a single broken page shouldn't stop the whole crawl
+            try:
+                extracted = await self._direct_scraper.extract_listing(url)
+            except FetchError as e:
+                logger.error('page is not fetched: %s, reason: %s', url, e)
+                # retried after the rest of links (stays pending)
+                if not self._frontier.retry(url):
+                    self.__finish(url, failed=True)
+
+                continue
+            except Exception as e:
+                logger.error('extraction failed: %s, reason: %s', url, e)
+                # the same page fails the same way, retried on resume only
+                self.__finish(url, failed=True)
+
+                continue
+            finally:
+                await self._frontier.done()
+
+            if extracted is None:
+                # unavailable or unchanged
+                self.__finish(url)
+            else:
+                await self._phones.put(extracted)
+
+    async def __direct_stage(self) -> None:
+        """Runs direct workers.
+
+        :return: None
+        """
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(self._direct_concurrency):
+                tg.create_task(self.__direct_worker())
+
+        for _ in range(self._phone_concurrency):
+            await self._phones.put(_STOP)
+
+    async def __phone_worker(self) -> None:
+        """Obtains phone numbers and pushes complete entities to
+         the entities queue.
+
+        :return: None
+        """
+        while (extracted := await self._phones.get()) is not _STOP:
+            car, pnp = extracted
+
+            try:
+                entity = await self._direct_scraper.resolve_phone(car, pnp)
+            except Exception as e:
+                logger.error(
+                    'phone number resolution failed: %s, reason: %s',
+                    car.url,
+                    e
+                )
+                self.__finish(car.url, failed=True)
+
+                continue
+
+            await self._entities.put(entity)
+
+    async def __phone_stage(self) -> None:
+        """Runs phone workers.
+
+        :return: None
+        """
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(self._phone_concurrency):
+                tg.create_task(self.__phone_worker())
+
+        for _ in range(self._save_concurrency):
+            await self._entities.put(_STOP)
+
+    async def __save_worker(self) -> None:
+        """Collects entities into batches and saves them.
+        A batch is saved when it's full or if the queue stays empty
+         for `_FLUSH_INTERVAL` seconds.
+
+        :return: None
+        """
+        batch = []
+        stopped = False
+
+        while not stopped:
+            try:
+                entity = await asyncio.wait_for(
+                    self._entities.get(),
+                    timeout=_FLUSH_INTERVAL if batch else None
+                )
+            except TimeoutError:
+                entity = None
+
+            if entity is _STOP:
+                stopped = True
+            elif entity is not None:
+                batch.append(entity)
+
+                if len(batch) < self._save_batch_size:
+                    continue
+
+            if batch:
+                await self._save(batch)
+                _saved_entities.inc(amount=len(batch))
+
+                for entity in batch:
+                    self.__finish(entity.url)
+
+                batch = []
+
+    async def __save_stage(self) -> None:
+        """Runs save workers.
+
+        :return: None
+        """
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(self._save_concurrency):
+                tg.create_task(self.__save_worker())
+
+    async def run(self) -> None:
+        """Starts all stages and waits until every discovered link
+         is processed and saved.
+        If any stage fails, the rest of them are cancelled.
+
+        :return: None
+        """
+        logger.info(
+            'pipeline started, direct tasks: %d, phone tasks: %d, '
+            'save tasks: %d',
+            self._direct_concurrency,
+            self._phone_concurrency,
+            self._save_concurrency
+        )
+
+        _queue_depth.track(self._frontier.qsize, 'links')
+        _queue_depth.track(self._phones.qsize, 'phones')
+        _queue_depth.track(self._entities.qsize, 'entities')
+
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(self.__catalog_stage())
+                tg.create_task(self.__direct_stage())
+                tg.create_task(self.__phone_stage())
+                tg.create_task(self.__save_stage())
+        finally:
+            _queue_depth.track(None, 'links')
+            _queue_depth.track(None, 'phones')
+            _queue_depth.track(None, 'entities')
+
+        logger.info('pipeline finished')
@@ -19,8 +19,9 @@ Catalog scraper:
 
 Direct scraper:
     Extracts necessary information from each "direct" link (1 link = 1 car).
-    Yields a collection of `CarParser` instances (each `CarParser` instance
-     can be easily converted to `Car` instance)
+    Yields a collection of `CarParser` records (`CarParser.as_dict()`
+     returns `Car` columns, ready to be saved by
+     `autoria_scraper.db.save_multiple`)
 
     **Usage example**
 
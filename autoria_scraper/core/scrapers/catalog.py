@@ -2,22 +2,22 @@
 
 
 from logging import getLogger
-from itertools import chain
+from contextlib import aclosing
 from typing import (
-    Coroutine,
     Optional,
     List,
     AsyncGenerator,
     Tuple
 )
 
-from autoria_scraper.core.selectors import (
-    ListedSelectors,
-    PaginationSelectors
-)
+from autoria_scraper.core.ids import ListingSet
+from autoria_scraper.core.index import ListingIndex
+from autoria_scraper.core.checkpoint import Checkpoint
 from autoria_scraper.core.misc import (
-    fetch_soup,
-    chunked_range_processing
+    FetchError,
+    extractor,
+    bounded_as_completed,
+    chunked
 )
 from autoria_scraper.core.scrapers._base import BaseScraper
 
@@ -37,13 +37,33 @@ class CatalogScraper(BaseScraper):
         self,
         root_url: str,
         batch_size: int,
-        pages_limit: Optional[int] = None
+        pages_limit: Optional[int] = None,
+        index: Optional["ListingIndex"] = None,
+        incremental_pages: Optional[int] = None,
+        recheck: bool = False,
+        checkpoint: Optional["Checkpoint"] = None,
+        shard: int = 0,
+        shards: int = 1
     ) -> None:
         """
         :param root_url: str - base url for web-scraping
         :param batch_size: int - batch size for concurrent processing
         :param pages_limit: Optional[int] - limits the amount of pages
          (for testing purposes)
+        :param index: Optional[ListingIndex] - listings known from previous
+         runs, those are skipped (unless `recheck` is set)
+        :param incremental_pages: Optional[int] - if specified, the catalog
+         is processed page by page (in order) and the crawl stops as soon as
+         that amount of consecutive pages yields no new listings
+        :param recheck: bool - if True, known listings are yielded as well
+         (in order to detect changes)
+        :param checkpoint: Optional[Checkpoint] - progress of the crawl,
+         completed pages are skipped, pending links of the interrupted
+         crawl are yielded first
+        :param shard: int - index of this shard (starts with 0), only
+         pages `shard + 1`, `shard + 1 + shards`, ... are processed
+        :param shards: int - total amount of shards (see
+         `autoria_scraper.core.sharding`)
         :return: None
         """
         super().__init__()
@@ -51,94 +71,179 @@ class CatalogScraper(BaseScraper):
         self._root = root_url
         self._batch_size = batch_size
         self._pages_limit = pages_limit
+        self._index = index if index is not None else ListingIndex()
+        self._incremental_pages = incremental_pages
+        self._recheck = recheck
+        self._checkpoint = checkpoint
+        self._shard = shard
+        self._shards = shards
         # each item in this set is a https link to the listed car on AutoRia
+        #  (kept as listing id, a few bytes per link)
         # it's used to avoid duplicates
-        self._url_pool = set()
+        self._url_pool = ListingSet()
+
+    @property
+    def discovered(self) -> "ListingSet":
+        """Direct links discovered by this scraper (dedupe pool).
+
+        :return: ListingSet
+        """
+        return self._url_pool
+
+    def page_url(self, page: int) -> str:
+        """Returns the url of the catalog page.
 
-    async def __count_pages(self) -> int:
+        :param page: int - page number (starts with 1)
+        :return: str - listing url, e.g: https://autoria.com/.../?page=1
+        """
+        return f'{self._root}?page={page}'
+
+    async def count_pages(self) -> int:
         """Use this method to obtain the total amount of pages.
 
+        ! Raises `FetchError` if the root page isn't fetched
+
         :return: int - number of pages
         """
         if self._pages_limit is not None:
             return self._pages_limit
 
-        response = await fetch_soup(url=self._root)
-        # AutoRia pagination has a hidden link widget
-        # text of that link follows format: '{current_page} / {total_pages}'
-        # example: "1 / 18 100", so we have to parse it
-        # split string by '/' and take the last element, in result: " 18 100"
-        # then replace spaces with "" and convert that value to int
-        return int(
-            response
-            .find(**PaginationSelectors.container)
-            .find(**PaginationSelectors.link)
-            .get_text(strip=True)
-            .split('/')[-1]
-            .replace(' ', '')
-        )
-
-    async def __extract_links(self, url: str) -> List[str]:
+        return await extractor.fetch('extract_pages_count', self._root)
+
+    async def extract_links(self, url: str) -> Tuple[List[str], int]:
         """This method processes page context to obtain the collection
          of valid "direct" urls. Extends `self._url_pool` set with collected
          urls and returns them as list. Also, removes links which contain
-         '/newauto/' keyword.
+         '/newauto/' keyword and links known from previous runs (unless
+         `recheck` is set).
 
         :param url: str - listing url, e.g: https://autoria.com/.../?page=1
-        :return: List[str] - the list of valid urls
+        :return: Tuple[List[str], int] - the list of valid urls and
+         the amount of new (not known) ones among them
+
+        ! Raises `FetchError` if the page isn't fetched
         """
-        response = await fetch_soup(url=url)
-        # applies `.get('href')` method for each tag element
-        # and returns only those that are not in the `self._url_pool` set
+        links = await extractor.fetch('extract_links', url)
+
+        if links is None:
+            return [], 0
+        # returns only those links that are not in the `self._url_pool` set
         #  and do not contain '/newauto/' keyword
         urls = [
             url
-            for url in map(lambda tag: tag.get('href'),
-                           response.find_all(**ListedSelectors.link))
-            if url not in self._url_pool and '/newauto/' not in url
+            for url in dict.fromkeys(links)
+            if url not in self._url_pool
+            and '/newauto/' not in url
         ]
         # pushes extracted urls to the pool (crucial to avoid duplicates)
         self._url_pool.update(urls)
+        new = [url for url in urls if url not in self._index]
 
-        return urls
+        return (urls if self._recheck else new), len(new)
 
-    async def start(self) -> AsyncGenerator[Tuple[str], None]:
-        """This method starts the web-scraping process.
+    async def __extract_page(
+        self,
+        page: int
+    ) -> Tuple[int, Optional[List[str]], int]:
+        """Same as `.extract_links()`, the page number goes first.
+
+        :param page: int - page number
+        :return: Tuple[int, Optional[List[str]], int] - links are None if
+         the page isn't fetched
+        """
+        try:
+            return page, *await self.extract_links(self.page_url(page))
+        except FetchError as e:
+            logger.error('catalog page is not fetched: %s', e)
+
+            return page, None, 0
+
+    async def stream(self) -> AsyncGenerator[str, None]:
+        """Yields each collected `direct` url as soon as its catalog page
+         is processed.
 
         **Usage example**
 
         ```python
         scraper = CatalogScraper(...)
 
-        async for urls in scraper.start():
-            print(urls) # Collection[str]
+        async for url in scraper.stream():
+            print(url) # str
         ```
 
-        :return: AsyncGenerator[Collection[str], None]
+        :return: AsyncGenerator[str, None]
         """
+        pages_count = await self.count_pages()
+        # amount of consecutive pages without new listings (incremental mode)
+        known_streak = 0
 
-        def func_(s: int, e: int) -> List[Coroutine]:
-            """Returns a list of coroutines for concurrent processing.
+        logger.info('pages discovered: %d', pages_count)
 
-            :param s: int - start index
-            :param e: int - end index
-            :return: List[Coroutine]
-            """
-            return [
-                self.__extract_links(f'{self._root}?page={_}')
-                for _ in range(s, e)
-            ]
+        if self._checkpoint is not None:
+            for link in self._checkpoint.restored():
+                self._url_pool.add(link)
+                yield link
+
+        # `aclosing` guarantees that pending tasks are cancelled right away
+        #  if the crawl is stopped early
+        async with aclosing(bounded_as_completed(
+            aws=(
+                self.__extract_page(page)
+                for page in range(
+                    self._shard + 1,
+                    pages_count + 1,
+                    self._shards
+                )
+                if self._checkpoint is None
+                or not self._checkpoint.is_completed(page)
+            ),
+            limit=self._batch_size,
+            # consecutive pages make sense only in the order of the catalog
+            ordered=self._incremental_pages is not None
+        )) as pages:
+            async for page, links, new in pages:
+                if links is None:
+                    # isn't completed, so the page is crawled again on resume
+                    if self._checkpoint is not None:
+                        self._checkpoint.fail_page(page)
+                    # the page tells nothing about new listings, so it
+                    #  doesn't count towards `known_streak`
+                    continue
+
+                for link in links:
+                    if self._checkpoint is not None:
+                        self._checkpoint.add_pending(link)
+
+                    yield link
+                # all links of the page are pending (queued) now
+                if self._checkpoint is not None:
+                    self._checkpoint.complete_page(page)
+
+                known_streak = 0 if new else known_streak + 1
+
+                if (
+                    self._incremental_pages is not None
+                    and known_streak >= self._incremental_pages
+                ):
+                    logger.info(
+                        'no new listings on %d consecutive pages, stopping',
+                        known_streak
+                    )
+                    break
 
-        pages_count = await self.__count_pages()
+    async def start(self) -> AsyncGenerator[Tuple[str], None]:
+        """This method starts the web-scraping process.
 
-        logger.info('pages discovered: %d', pages_count)
+        **Usage example**
 
-        async for chunk in chunked_range_processing(
-            func=func_,
-            from_=1,
-            to_=pages_count + 1,
-            batch=self._batch_size
-        ):
-            # using `itertools.chain` to flatten the response
-            # example: [[1, 2], [3, 4]] -> [1, 2, 3, 4]
-            yield tuple(chain(*chunk))
+        ```python
+        scraper = CatalogScraper(...)
+
+        async for urls in scraper.start():
+            print(urls) # Collection[str]
+        ```
+
+        :return: AsyncGenerator[Collection[str], None]
+        """
+        async for urls in chunked(self.stream(), self._batch_size):
+            yield urls
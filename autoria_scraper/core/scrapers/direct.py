@@ -6,19 +6,21 @@ from typing import (
     Any,
     Collection,
     Tuple,
-    Coroutine,
     Dict,
     Optional,
-    List,
     AsyncGenerator
 )
 
 from autoria_scraper.core.misc import (
-    fetch_soup,
+    FetchError,
     post,
-    chunked_range_processing
+    extractor,
+    metrics,
+    bounded_as_completed,
+    chunked
 )
-from autoria_scraper.core.selectors import CarSelectors
+from autoria_scraper.core.index import ListingIndex
+from autoria_scraper.core.phones import PhoneCache
 from autoria_scraper.core.scrapers._base import BaseScraper
 from autoria_scraper.core.parsers import CarParser, PhoneNumberParser
 
@@ -28,6 +30,14 @@ __all__ = ('DirectScraper',)
 
 logger = getLogger(__name__)
 
+_listings = metrics.counter(
+    'autoria_direct_listings_total',
+    'Processed direct pages: new, changed, unchanged (known listing with '
+    'the same content hash, not written), unavailable or not_fetched '
+    '(all attempts failed, retried or marked as failed by the caller).',
+    ('result',)
+)
+
 
 class DirectScraper(BaseScraper):
     """This scaper is used for data extraction from the pool of given links.
@@ -37,13 +47,20 @@ class DirectScraper(BaseScraper):
     def __init__(
         self,
         phone_url: str,
-        links: Collection[str],
-        batch_size: int
+        batch_size: int,
+        links: Collection[str] = (),
+        phones: Optional["PhoneCache"] = None,
+        index: Optional["ListingIndex"] = None
     ) -> None:
         """
         :param phone_url: str - required for obtaining sellers' phone numbers
-        :param links: Collection[str] - collection of direct links
         :param batch_size: int - batch size for concurrent processing
+        :param links: Collection[str] - collection of direct links
+         (required for `.start()` only)
+        :param phones: Optional[PhoneCache] - memoized phone numbers,
+         each number is requested every time if not specified
+        :param index: Optional[ListingIndex] - listings known from previous
+         runs, unchanged ones are skipped by `.extract_listing()`
         :return: None
         """
         super().__init__()
@@ -51,6 +68,8 @@ class DirectScraper(BaseScraper):
         self._phone_url = phone_url
         self._links = links
         self._batch_size = batch_size
+        self._phones = phones
+        self._index = index if index is not None else ListingIndex()
 
     async def __obtain_phone_number(
         self,
@@ -89,7 +108,88 @@ class DirectScraper(BaseScraper):
             headers={'Content-Type': 'application/json'}
         )
 
-    async def __extract_data(self, url: str) -> Optional["CarParser"]:
+    async def extract_listing(
+        self,
+        url: str
+    ) -> Optional[Tuple["CarParser", "PhoneNumberParser"]]:
+        """This method extracts all necessary data from the given url,
+         except the phone number (see `.resolve_phone()`).
+
+        Html is parsed by `extractor` (in worker processes or while
+         downloaded if enabled), only I/O is performed here.
+        Known listings with the same content hash are skipped (no phone
+         number request, nothing to write), see `ListingIndex`.
+
+        ! Raises `FetchError` if the page isn't fetched, unlike
+         an unavailable listing it has to be retried
+
+        :param url: str - direct link to the car
+        :return: Optional[Tuple[CarParser, PhoneNumberParser]] - parsed
+         record and pieces of phone number, None if the listing is
+         unavailable (removed, sold, 404) or unchanged
+        """
+        try:
+            extracted = await extractor.fetch('extract_car', url, url)
+        except FetchError:
+            _listings.inc('not_fetched')
+
+            raise
+
+        if extracted is None:
+            logger.info('data unavailable, skipping: %s', url)
+            _listings.inc('unavailable')
+
+            return
+
+        if self._index.is_unchanged(url, extracted[0].content_hash):
+            logger.debug('unchanged, skipping: %s', url)
+            _listings.inc('unchanged')
+            self._index.mark_checked(url)
+
+            return
+
+        _listings.inc('changed' if url in self._index else 'new')
+
+        return extracted
+
+    async def resolve_phone(
+        self,
+        car: "CarParser",
+        pnp: "PhoneNumberParser"
+    ) -> "CarParser":
+        """This method obtains seller's phone number (memoized per seller
+         if `phones` is specified) and sets it to the record.
+
+        :param car: CarParser - parsed record
+        :param pnp: PhoneNumberParser - parsed pieces of phone number
+        :return: CarParser - the same record, without content hash if
+         the phone number isn't obtained
+        """
+        async def request() -> Optional[str]:
+            return CarParser.parse_phone_number(
+                await self.__obtain_phone_number(pnp)
+            )
+
+        if self._phones is None:
+            car.phone_number = await request()
+        else:
+            car.phone_number = await self._phones.resolve(
+                pnp.user_id,
+                pnp.phone_id,
+                request
+            )
+
+        if car.phone_number is None:
+            # the phone number isn't part of the content hash, so the
+            #  hash is dropped (unknown hashes never match) and the
+            #  listing is requested again on the next re-check
+            car.content_hash = None
+        # displays parsed record in json format
+        logger.info('extracted: %s', car)
+
+        return car
+
+    async def extract(self, url: str) -> Optional["CarParser"]:
         """This method extract all necessary data from the given url.
 
         Collects:
@@ -103,70 +203,27 @@ class DirectScraper(BaseScraper):
             - primary image url
             - phone number
 
+        ! Raises `FetchError` if the page isn't fetched
+
         :param url: str - direct link to the car
-        :return: Optional["CarParser"] - parsed instance or None
+        :return: Optional["CarParser"] - parsed record or None
         """
-        response = await fetch_soup(url)
-        # first of all, we've to check the availability of the car
-        # in some cases, car's page is accessible, but still not listed
-        #  (doesn't have any data) and the following message appears:
-        #  "Оголошення ... ще не опубліковане і не бере участі в пошуку"
-        # so, we've to check the presence of specific tag `car_unavailable`
-        # and if it's present -> skip
-        if response.find(**CarSelectors.unavailable) is None:
-            _checked_vin = response.find(**CarSelectors.vin_checked)
-            _unchecked_vin = response.find(**CarSelectors.vin_unchecked)
-            # sometimes `car_vin` may be absent in the regular place
-            # we choose between `_checked_vin` and `_unchecked_vin`
-            # None value is still possible, but it's OK
-            car_vin = _checked_vin or _unchecked_vin
-            user_id = response.__str__()
-            auto_id = response.find(**CarSelectors.phone_number_auto_id)
-            phone_id = response.find(**CarSelectors.phone_number_phone_id)
-            car_number = response.find(**CarSelectors.state_number)
-            title = response.find_all(**CarSelectors.title)[-1]
-            username = response.find(**CarSelectors.username)
-            odometer = response.find(**CarSelectors.odometer)
-            primary_image = response.find_all(**CarSelectors.image_url)[1]
-            price_usd = (
-                response
-                .find(**CarSelectors.price_container)
-                .find(**CarSelectors.price)
-            )
-            images_count = (
-                response
-                .find_all(**CarSelectors.images_count_container)
-                [0]
-                .find(**CarSelectors.images_count)
-            )
-            phone_number = await self.__obtain_phone_number(
-                PhoneNumberParser(
-                    t_auto_id=auto_id,
-                    t_phone_id=phone_id,
-                    t_user_id=user_id
-                )
-            )
-            # now, parse the data using `pydantic` features
-            # `.model_dump()` returns a valid dict with all necessary fields
-            #  in proper format
-            parsed_entity = CarParser(
-                t_url=url,
-                t_car_vin=car_vin,
-                t_title=title,
-                t_username=username,
-                t_price_usd=price_usd,
-                t_odometer=odometer,
-                t_car_number=car_number,
-                t_image_url=primary_image,
-                t_images_count=images_count,
-                t_phone_number=phone_number
-            )
-            # displays parsed entity in json format
-            logger.info('extracted: %s', parsed_entity.model_dump())
+        extracted = await self.extract_listing(url)
 
-            return parsed_entity
-        else:
-            logger.info('data unavailable, skipping: %s', url)
+        if extracted is not None:
+            return await self.resolve_phone(*extracted)
+
+    async def __extract_or_skip(self, url: str) -> Optional["CarParser"]:
+        """Same as `.extract()`, but pages which aren't fetched are
+         skipped (logged).
+
+        :param url: str - direct link to the car
+        :return: Optional["CarParser"] - parsed record or None
+        """
+        try:
+            return await self.extract(url)
+        except FetchError as e:
+            logger.error('page is not fetched, skipping: %s', e)
 
     async def start(
         self
@@ -185,23 +242,13 @@ class DirectScraper(BaseScraper):
         :return: AsyncGenerator[Tuple[Optional["CarParser"]], None]
         """
 
-        def func_(s: int, e: int) -> List[Coroutine]:
-            """Returns a list of coroutines for concurrent processing.
-
-            Uses a subset of the `self._links` set, where from = s, to = e
-
-            :param s: int - from index
-            :param e: int - to index
-            :return: List[Coroutine]
-            """
-            return [self.__extract_data(link) for link in self._links[s:e]]
-
         logger.info('pages to crawl: %d', len(self._links))
 
-        async for chunk in chunked_range_processing(
-            func=func_,
-            from_=0,
-            to_=len(self._links) + 1,
-            batch=self._batch_size
+        async for chunk in chunked(
+            bounded_as_completed(
+                aws=(self.__extract_or_skip(link) for link in self._links),
+                limit=self._batch_size
+            ),
+            self._batch_size
         ):
             yield chunk
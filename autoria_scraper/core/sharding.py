@@ -0,0 +1,268 @@
+"""This module contains `ShardRunner` class - the standalone crawl split
+ between worker processes (one event loop per core).
+
+Each shard is a separate process with its own event loop (optionally
+ `uvloop`), http connection pool, database connections and checkpoint,
+ it crawls a disjoint slice of catalog pages (`CatalogScraper(shard=...)`).
+The parent process aggregates counters reported by shards, logs combined
+ throughput and merges dedupe pools of shards once they are finished.
+"""
+
+
+import os
+import time
+import queue
+import asyncio
+import multiprocessing
+from logging import getLogger, Formatter
+from typing import Any, Dict, List, Optional, Tuple
+
+from autoria_scraper.config import app_config
+from autoria_scraper.core.ids import ListingSet
+
+
+__all__ = ('ShardRunner',)
+
+
+logger = getLogger(__name__)
+
+# counters logged by progress reports (summed across shards)
+_PROGRESS_COUNTERS: Tuple[Tuple[str, str], ...] = (
+    ('entities saved', 'autoria_pipeline_entities_total'),
+    ('requests', 'autoria_http_requests_total'),
+)
+
+
+def _shard_main(
+    shard: int,
+    shards: int,
+    resume: bool,
+    use_uvloop: bool,
+    report_interval: float,
+    reports: "multiprocessing.Queue"
+) -> None:
+    """Entrypoint of a shard process.
+
+    :param shard: int - index of the shard
+    :param shards: int - total amount of shards
+    :param resume: bool - continue the interrupted crawl of the shard
+    :param use_uvloop: bool - run the shard on `uvloop` (if installed)
+    :param report_interval: float - counters are reported that often
+    :param reports: multiprocessing.Queue - reports to the parent process
+    :return: None
+    """
+    # archive segments can't be appended by several processes, so each
+    #  shard records (and replays) its own archive
+    app_config.archive.path = os.path.join(
+        app_config.archive.path,
+        f'shard-{shard}'
+    )
+
+    from autoria_scraper import start, stderr_handler
+
+    stderr_handler.setFormatter(
+        Formatter(
+            fmt='%(asctime)s %(processName)s [%(name)s] %(levelname)s: '
+                '%(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+    )
+
+    loop_factory = None
+
+    if use_uvloop:
+        try:
+            import uvloop
+        except ImportError:
+            logger.warning('uvloop is not installed, asyncio loop is used')
+        else:
+            loop_factory = uvloop.new_event_loop
+
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        runner.run(
+            start(
+                resume=resume,
+                shard=(shard, shards),
+                report=lambda *report: reports.put((shard, *report)),
+                report_interval=report_interval
+            )
+        )
+
+
+class ShardRunner:
+    """Runs the standalone crawl in `shards` processes and aggregates
+     their progress.
+    """
+
+    def __init__(
+        self,
+        shards: int,
+        use_uvloop: bool,
+        report_interval: float,
+        resume: bool = False
+    ) -> None:
+        """
+        :param shards: int - amount of shard processes
+        :param use_uvloop: bool - run shards on `uvloop` (if installed)
+        :param report_interval: float - progress report period (in seconds)
+        :param resume: bool - continue interrupted crawls of shards (the
+         same amount of shards is expected)
+        :return: None
+        """
+        self._shards = shards
+        self._use_uvloop = use_uvloop
+        self._report_interval = report_interval
+        self._resume = resume
+        # the latest counters of each shard
+        self._counters: Dict[int, Dict[str, float]] = {}
+        # merged dedupe pools of finished shards
+        self._discovered = ListingSet()
+        self._discovered_total = 0
+
+    @classmethod
+    def from_config(
+        cls,
+        shards: Optional[int] = None,
+        resume: bool = False
+    ) -> "ShardRunner":
+        """Creates the runner configured by `app_config.sharding`.
+
+        :param shards: Optional[int] - overrides `SHARDING__SHARDS`
+        :param resume: bool - continue interrupted crawls of shards
+        :return: ShardRunner
+        """
+        config = app_config.sharding
+
+        return cls(
+            shards=shards or config.shards or os.cpu_count() or 1,
+            use_uvloop=config.uvloop,
+            report_interval=config.report_interval,
+            resume=resume
+        )
+
+    def __total(self, name: str) -> float:
+        """Sums the counter (all label sets) across shards.
+
+        :param name: str - counter name
+        :return: float
+        """
+        return sum(
+            value
+            for counters in self._counters.values()
+            for key, value in counters.items()
+            if key == name or key.startswith(f'{name}{{')
+        )
+
+    def __report(self, elapsed: float, alive: int) -> None:
+        """Logs combined progress of shards.
+
+        :param elapsed: float - seconds since start
+        :param alive: int - amount of running shards
+        :return: None
+        """
+        logger.info(
+            'shards running: %d/%d, %s',
+            alive,
+            self._shards,
+            ', '.join(
+                f'{title}: {total:g} ({total / elapsed:.2f}/sec)'
+                for title, total in (
+                    (title, self.__total(name))
+                    for title, name in _PROGRESS_COUNTERS
+                )
+            )
+        )
+
+    def __receive(self, report: Tuple[Any, ...]) -> None:
+        """Stores counters of the shard, merges its dedupe pool (sent once
+         the shard is finished).
+
+        :param report: Tuple[Any, ...] - shard index, counters and
+         (optionally) discovered links
+        :return: None
+        """
+        shard, counters, *pool = report
+        self._counters[shard] = counters
+
+        if pool:
+            self._discovered.merge(pool[0])
+            self._discovered_total += len(pool[0])
+
+    def run(self) -> bool:
+        """Starts shard processes and waits until all of them exit.
+
+        :return: bool - True if every shard finished successfully
+        """
+        # fresh interpreters: no event loop, sessions or pools are
+        #  inherited from the parent process
+        context = multiprocessing.get_context('spawn')
+        reports = context.Queue()
+        processes: List[multiprocessing.Process] = [
+            context.Process(
+                target=_shard_main,
+                name=f'shard-{shard}',
+                args=(
+                    shard,
+                    self._shards,
+                    self._resume,
+                    self._use_uvloop,
+                    self._report_interval,
+                    reports
+                )
+            )
+            for shard in range(self._shards)
+        ]
+        interrupted = False
+        started = reported = time.monotonic()
+
+        logger.info('starting %d shards', self._shards)
+
+        for process in processes:
+            process.start()
+        # reports are read until all shards exit, otherwise a shard may
+        #  block on a full queue
+        while any(process.is_alive() for process in processes):
+            try:
+                self.__receive(reports.get(timeout=1))
+            except queue.Empty:
+                pass
+            except KeyboardInterrupt:
+                # shards receive the same signal and save their checkpoints
+                interrupted = True
+                logger.warning('interrupted, waiting for shards')
+
+            alive = sum(process.is_alive() for process in processes)
+            # the final report is logged once all shards exit
+            if alive and time.monotonic() - reported >= self._report_interval:
+                reported = time.monotonic()
+                self.__report(reported - started, alive)
+
+        for process in processes:
+            process.join()
+        # reports sent right before the exit
+        while True:
+            try:
+                self.__receive(reports.get_nowait())
+            except queue.Empty:
+                break
+
+        self.__report(time.monotonic() - started, 0)
+        logger.info(
+            'links discovered: %d, unique: %d (duplicates across shards: '
+            '%d)',
+            self._discovered_total,
+            len(self._discovered),
+            self._discovered_total - len(self._discovered)
+        )
+
+        if interrupted:
+            raise KeyboardInterrupt
+
+        failed = [
+            process.name for process in processes if process.exitcode != 0
+        ]
+
+        if failed:
+            logger.error('shards failed: %s', ', '.join(failed))
+
+        return not failed
@@ -2,54 +2,414 @@
 
 
 import sys
-from typing import Collection
 from logging import getLogger
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncGenerator,
+    Collection,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple
+)
 
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy import select, update, func, literal_column, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine
+)
 
 from autoria_scraper.config import app_config
-from autoria_scraper.db.models import Base
+from autoria_scraper.db.models import Car, CarChange, Phone
+from autoria_scraper.db.migrations import (
+    is_current,
+    migrate,
+    maintain_partitions
+)
+from autoria_scraper.core.misc.metrics import metrics
 
 
-__all__ = ('init_db', 'save_multiple')
+__all__ = (
+    'init_db',
+    'save_multiple',
+    'iter_urls',
+    'iter_listings',
+    'iter_cars',
+    'save_checked',
+    'save_phones',
+    'iter_phones',
+    'SaveResult'
+)
 
 
 logger = getLogger(__name__)
 
-engine = create_async_engine(url=app_config.database.url.__str__())
+engine = create_async_engine(
+    url=app_config.database.url.__str__(),
+    # pooled connections may be closed by the server while idle (e.g.
+    #  between daemon sweeps), those are replaced on checkout
+    pool_pre_ping=True
+)
 # using `sessionmaker` for automatic configuration of new sessions
 SessionFactory = async_sessionmaker(bind=engine, expire_on_commit=True)
 
+# postgres supports up to 32767 bind params per statement
+_MAX_PARAMS: int = 32_767
+# these columns are never overwritten on conflict
+_IMMUTABLE_COLUMNS = frozenset(('id', 'url', 'datetime_found'))
+
+_save_seconds = metrics.histogram(
+    'autoria_db_save_seconds',
+    'Duration of `save_multiple` transactions (commit included).'
+)
+_saved_rows = metrics.counter(
+    'autoria_db_rows_total',
+    'Rows processed by `save_multiple` (inserted, updated, unchanged, '
+    'failed).',
+    ('result',)
+)
+
+
+class SaveResult(NamedTuple):
+    """Result of `save_multiple` call."""
+    inserted: int = 0
+    updated: int = 0
+    # stored rows with the same content hash (not written)
+    unchanged: int = 0
+
 
 async def init_db() -> None:
-    """This function checks the connection and creates necessary tables
-        if they don't exist.
+    """This function checks the connection, creates necessary tables
+        if they don't exist and migrates existing ones (see
+        `autoria_scraper.db.migrations`).
 
     :return: None
     """
+    config = app_config.database
+
     try:
         async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
+            # the schema is checked by a couple of cheap queries, so cold
+            #  starts don't pay for `create_all` reflection
+            if not await is_current(conn):
+                await migrate(conn)
+
+            if config.partition_changes:
+                await maintain_partitions(conn, config.retention_months)
     except Exception as e:
         logger.error('connection error: %s', e)
 
         sys.exit(-1)
 
 
-async def save_multiple(data: Collection["Base"]) -> None:
-    """This function saves a list of instance to the db.
+async def save_multiple(data: Collection[Dict[str, Any]]) -> SaveResult:
+    """This function saves a collection of records to the db using
+     `INSERT ... ON CONFLICT (url) DO UPDATE`, so re-scraped listings
+     are updated instead of duplicated. Stored rows with the same
+     `content_hash` aren't rewritten (only `datetime_checked` is updated),
+     each inserted or changed row is recorded to `car_changes`.
 
-    :param data: Collection["Base"] - the collection of instances
-    :return: None
+    Records are written with multi-row statements (no ORM unit of work).
+
+    :param data: Collection[Dict[str, Any]] - records (`Car` columns)
+    :return: SaveResult - amount of inserted, updated and unchanged rows
     """
+    # the same row can't be affected twice by one statement, so duplicates
+    #  are removed (the last one wins)
+    records: List[Dict[str, Any]] = list({
+        record['url']: record
+        for record in data
+    }.values())
+
+    if not records:
+        return SaveResult()
+
+    # column defaults are rendered as bind params as well, so the amount
+    #  of table columns is used as the upper bound
+    chunk_size = _MAX_PARAMS // len(Car.__table__.columns)
+
+    with _save_seconds.time():
+        result = await _upsert(records, chunk_size)
+
+    _saved_rows.inc('inserted', amount=result.inserted)
+    _saved_rows.inc('updated', amount=result.updated)
+    _saved_rows.inc('unchanged', amount=result.unchanged)
+    _saved_rows.inc('failed', amount=len(records) - sum(result))
+
+    return result
+
+
+async def _upsert(
+    records: List[Dict[str, Any]],
+    chunk_size: int
+) -> "SaveResult":
+    """Executes `save_multiple` statements in a single transaction.
+
+    :param records: List[Dict[str, Any]] - unique records (`Car` columns)
+    :param chunk_size: int - max amount of records per statement
+    :return: SaveResult - amount of inserted, updated and unchanged rows
+    """
+    columns = [*records[0].keys(), 'datetime_checked']
+    inserted = updated = unchanged = 0
+
     async with SessionFactory() as session:
         try:
-            session.add_all(data)
+            for i in range(0, len(records), chunk_size):
+                chunk = records[i:i + chunk_size]
+                stmt = insert(Car).values(chunk)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[Car.url],
+                    set_={
+                        column: stmt.excluded[column]
+                        for column in columns
+                        if column not in _IMMUTABLE_COLUMNS
+                    },
+                    # rows with the same content aren't rewritten (and
+                    #  aren't returned), records without content hash
+                    #  (e.g. the phone number isn't obtained) always are
+                    where=or_(
+                        Car.content_hash.is_distinct_from(
+                            stmt.excluded.content_hash
+                        ),
+                        stmt.excluded.content_hash.is_(None)
+                    )
+                ).returning(
+                    Car.url,
+                    Car.price_usd,
+                    Car.odometer,
+                    Car.content_hash,
+                    # `xmax` is 0 only for freshly inserted rows
+                    literal_column('xmax = 0')
+                )
+                changes = []
+
+                for url, price_usd, odometer, content_hash, is_inserted in (
+                    await session.execute(stmt)
+                ):
+                    changes.append({
+                        'url': url,
+                        'price_usd': price_usd,
+                        'odometer': odometer,
+                        'content_hash': content_hash
+                    })
+
+                    if is_inserted:
+                        inserted += 1
+                    else:
+                        updated += 1
+
+                if changes:
+                    await session.execute(insert(CarChange).values(changes))
+
+                if len(changes) < len(chunk):
+                    written = {change['url'] for change in changes}
+                    await _touch(
+                        session,
+                        [r['url'] for r in chunk if r['url'] not in written]
+                    )
+                    unchanged += len(chunk) - len(changes)
 
             await session.commit()
             # `success` log-message with number of items saved
-            logger.info('transaction succeeded, items: [%s]', len(data))
+            logger.info(
+                'transaction succeeded, inserted: [%s], updated: [%s], '
+                'unchanged: [%s]',
+                inserted,
+                updated,
+                unchanged
+            )
         except Exception as e:
             logger.error('transaction failed, reason: %s', e)
 
             await session.rollback()
+
+            return SaveResult()
+
+    return SaveResult(
+        inserted=inserted,
+        updated=updated,
+        unchanged=unchanged
+    )
+
+
+async def _touch(session: "AsyncSession", urls: List[str]) -> None:
+    """Sets `datetime_checked` of the stored listings to now.
+
+    :param session: AsyncSession - session of the current transaction
+    :param urls: List[str] - direct links to the cars
+    :return: None
+    """
+    now = datetime.utcnow()
+
+    for i in range(0, len(urls), _MAX_PARAMS - 1):
+        await session.execute(
+            update(Car)
+            .where(Car.url.in_(urls[i:i + _MAX_PARAMS - 1]))
+            .values(datetime_checked=now)
+        )
+
+
+async def save_checked(urls: Collection[str]) -> None:
+    """This function updates `datetime_checked` of listings which were
+     crawled again but haven't changed (see `ListingIndex.drain_checked()`).
+
+    :param urls: Collection[str] - direct links to the cars
+    :return: None
+    """
+    if not urls:
+        return
+
+    async with SessionFactory() as session:
+        try:
+            await _touch(session, list(urls))
+            await session.commit()
+        except Exception as e:
+            logger.error('checked listings transaction failed, reason: %s', e)
+
+            await session.rollback()
+
+
+async def iter_urls() -> AsyncGenerator[str, None]:
+    """This function streams urls of all stored cars
+     (server-side cursor, so memory usage doesn't depend on table size).
+
+    :return: AsyncGenerator[str, None]
+    """
+    async with SessionFactory() as session:
+        result = await session.stream_scalars(
+            select(Car.url)
+            .distinct()
+            .execution_options(yield_per=10_000)
+        )
+
+        async for url in result:
+            yield url
+
+
+async def iter_listings() -> AsyncGenerator[
+    Tuple[str, Optional[int], datetime],
+    None
+]:
+    """This function streams urls, content hashes and last check datetimes
+     (`datetime_found` if never re-checked) of all stored cars
+     (server-side cursor, so memory usage doesn't depend on table size).
+
+    :return: AsyncGenerator[Tuple[str, Optional[int], datetime], None] -
+     (url, content_hash, checked)
+    """
+    async with SessionFactory() as session:
+        result = await session.stream(
+            select(
+                Car.url,
+                Car.content_hash,
+                func.coalesce(Car.datetime_checked, Car.datetime_found)
+            )
+            .execution_options(yield_per=10_000)
+        )
+
+        async for row in result:
+            yield tuple(row)
+
+
+async def iter_cars(
+    columns: Sequence[str],
+    since: datetime,
+    until: datetime,
+    batch_size: int
+) -> AsyncGenerator[List[Tuple[Any, ...]], None]:
+    """This function streams cars found within `[since, until)` in batches,
+     ordered by `datetime_found` (server-side cursor, so memory usage
+     depends on `batch_size` only).
+
+    :param columns: Sequence[str] - `Car` columns to select
+    :param since: datetime - min `datetime_found` (UTC, inclusive)
+    :param until: datetime - max `datetime_found` (UTC, exclusive)
+    :param batch_size: int - amount of rows per batch
+    :return: AsyncGenerator[List[Tuple[Any, ...]], None] - rows (values
+     in the order of `columns`)
+    """
+    async with SessionFactory() as session:
+        result = await session.stream(
+            select(*(getattr(Car, column) for column in columns))
+            .where(Car.datetime_found >= since, Car.datetime_found < until)
+            .order_by(Car.datetime_found, Car.id)
+            .execution_options(yield_per=batch_size)
+        )
+
+        async for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+
+
+async def save_phones(data: Collection[Dict[str, Any]]) -> None:
+    """This function saves resolved phone numbers (`Phone` columns),
+     already stored ones are refreshed.
+
+    :param data: Collection[Dict[str, Any]] - records (`Phone` columns)
+    :return: None
+    """
+    records: List[Dict[str, Any]] = list({
+        (record['user_id'], record['phone_id']): record
+        for record in data
+    }.values())
+
+    if not records:
+        return
+
+    chunk_size = _MAX_PARAMS // len(Phone.__table__.columns)
+
+    async with SessionFactory() as session:
+        try:
+            for i in range(0, len(records), chunk_size):
+                stmt = insert(Phone).values(records[i:i + chunk_size])
+                await session.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[Phone.user_id, Phone.phone_id],
+                        set_={
+                            'phone_number': stmt.excluded.phone_number,
+                            'datetime_resolved': (
+                                stmt.excluded.datetime_resolved
+                            )
+                        }
+                    )
+                )
+
+            await session.commit()
+        except Exception as e:
+            logger.error('phones transaction failed, reason: %s', e)
+
+            await session.rollback()
+
+
+async def iter_phones(
+    since: datetime,
+    limit: int
+) -> AsyncGenerator[Tuple[str, str, str, datetime], None]:
+    """This function streams phone numbers resolved after `since`,
+     the most recent ones go first.
+
+    :param since: datetime - min resolution datetime (UTC)
+    :param limit: int - max amount of numbers
+    :return: AsyncGenerator[Tuple[str, str, str, datetime], None] -
+     (user_id, phone_id, phone_number, datetime_resolved)
+    """
+    async with SessionFactory() as session:
+        result = await session.stream(
+            select(
+                Phone.user_id,
+                Phone.phone_id,
+                Phone.phone_number,
+                Phone.datetime_resolved
+            )
+            .where(Phone.datetime_resolved > since)
+            .order_by(Phone.datetime_resolved.desc())
+            .limit(limit)
+            .execution_options(yield_per=10_000)
+        )
+
+        async for row in result:
+            yield tuple(row)
@@ -0,0 +1,244 @@
+"""This module contains versioned schema migrations and `car_changes`
+ partition maintenance.
+
+`create_all` creates missing tables only, so changes of existing tables
+ are applied by numbered migrations, applied versions are recorded to
+ `schema_version` table. Every statement is idempotent: a fresh database
+ (already created by `create_all` with the latest schema) runs them as
+ no-ops.
+"""
+
+
+import re
+from logging import getLogger
+from datetime import date
+from typing import Optional, Tuple
+
+from sqlalchemy import select, func, insert, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from autoria_scraper.db.models import Base, SchemaVersion
+
+
+__all__ = ('is_current', 'migrate', 'maintain_partitions', 'SCHEMA_VERSION')
+
+
+logger = getLogger(__name__)
+
+# `pg_advisory_xact_lock` key, concurrent workers migrate one by one
+_LOCK_KEY: int = 0x6175746F
+# version `n` is `_MIGRATIONS[n - 1]`
+_MIGRATIONS: Tuple[Tuple[str, ...], ...] = (
+    # 1: change detection columns of re-crawled listings
+    (
+        'ALTER TABLE cars ADD COLUMN IF NOT EXISTS content_hash BIGINT',
+        'ALTER TABLE cars ADD COLUMN IF NOT EXISTS datetime_checked '
+        'TIMESTAMP',
+    ),
+    # 2: `cars.url` wasn't unique initially, duplicates are removed (the
+    #  latest row is kept), so `ON CONFLICT (url)` upserts work
+    (
+        'DELETE FROM cars a USING cars b '
+        'WHERE a.url = b.url AND a.id < b.id',
+        'CREATE UNIQUE INDEX IF NOT EXISTS cars_url_key ON cars (url)',
+    ),
+    # 3: VIN/number lookups and time-range scans (see `Car`)
+    (
+        'CREATE INDEX IF NOT EXISTS ix_cars_car_vin ON cars (car_vin)',
+        'CREATE INDEX IF NOT EXISTS ix_cars_car_number ON cars (car_number)',
+        'CREATE INDEX IF NOT EXISTS ix_cars_datetime_found ON cars '
+        'USING brin (datetime_found)',
+    ),
+)
+SCHEMA_VERSION: int = len(_MIGRATIONS)
+
+# the plain table is converted once, its rows are kept by the default
+#  partition (it also receives rows of months without a partition)
+_PARTITION_CHANGES: Tuple[str, ...] = (
+    'ALTER TABLE car_changes RENAME TO car_changes_default',
+    # the primary key of the partition is created by the parent one (it
+    #  has to include the partition key)
+    'ALTER TABLE car_changes_default DROP CONSTRAINT car_changes_pkey',
+    'ALTER INDEX ix_car_changes_url RENAME TO ix_car_changes_default_url',
+    'CREATE TABLE car_changes (LIKE car_changes_default INCLUDING DEFAULTS) '
+    'PARTITION BY RANGE (datetime_changed)',
+    # the partition key has to be a part of the primary key
+    'ALTER TABLE car_changes ADD PRIMARY KEY (id, datetime_changed)',
+    'CREATE INDEX ix_car_changes_url ON car_changes (url)',
+    'ALTER SEQUENCE car_changes_id_seq OWNED BY car_changes.id',
+    'ALTER TABLE car_changes ATTACH PARTITION car_changes_default DEFAULT',
+)
+# monthly partitions are created in advance
+_PARTITIONS_AHEAD: int = 2
+_PARTITION_NAME = re.compile(r'^car_changes_p(\d{4})(\d{2})$')
+
+
+async def is_current(conn: AsyncConnection) -> bool:
+    """Checks whether all tables exist and all migrations are applied,
+     so `create_all` (a reflection query per table) and migrations can
+     be skipped.
+
+    :param conn: AsyncConnection - connection with an open transaction
+    :return: bool
+    """
+    tables = set(await conn.scalars(text(
+        'SELECT tablename FROM pg_tables '
+        'WHERE schemaname = current_schema()'
+    )))
+
+    if not tables.issuperset(Base.metadata.tables):
+        return False
+
+    return await conn.scalar(
+        select(func.max(SchemaVersion.version))
+    ) == SCHEMA_VERSION
+
+
+async def migrate(conn: AsyncConnection) -> int:
+    """Creates missing tables and applies pending migrations (within
+     the transaction of `conn`). Both are done under the lock, so
+     concurrent workers starting on an empty database don't create
+     the same tables at once.
+
+    :param conn: AsyncConnection - connection with an open transaction
+    :return: int - current schema version
+    """
+    await conn.execute(select(func.pg_advisory_xact_lock(_LOCK_KEY)))
+    await conn.run_sync(Base.metadata.create_all)
+
+    version = (
+        await conn.scalar(select(func.max(SchemaVersion.version)))
+    ) or 0
+
+    for number in range(version + 1, SCHEMA_VERSION + 1):
+        for statement in _MIGRATIONS[number - 1]:
+            await conn.execute(text(statement))
+
+        await conn.execute(insert(SchemaVersion).values(version=number))
+
+        logger.info('schema migrated to version %d', number)
+
+    return max(version, SCHEMA_VERSION)
+
+
+def _month(day: date, shift: int = 0) -> date:
+    """Returns the first day of the month, shifted by `shift` months.
+
+    :param day: date - any day of the month
+    :param shift: int - amount of months (may be negative)
+    :return: date
+    """
+    months = day.year * 12 + day.month - 1 + shift
+
+    return date(months // 12, months % 12 + 1, 1)
+
+
+async def _create_partition(
+    conn: AsyncConnection,
+    first: date,
+    last: date
+) -> None:
+    """Creates the partition of the month (unless it exists). Rows of
+     the month kept by the default partition (e.g. the month had no
+     partition yet) are moved to the new one, otherwise it can't be
+     attached.
+
+    :param conn: AsyncConnection - connection with an open transaction
+    :param first: date - the first day of the month
+    :param last: date - the first day of the next month
+    :return: None
+    """
+    name = f'car_changes_p{first:%Y%m}'
+
+    if await conn.scalar(
+        text('SELECT to_regclass(:name)'),
+        {'name': name}
+    ) is not None:
+        return
+
+    await conn.execute(text(
+        f'CREATE TABLE {name} (LIKE car_changes INCLUDING DEFAULTS)'
+    ))
+    moved = await conn.execute(
+        text(
+            'WITH moved AS ('
+            'DELETE FROM car_changes_default '
+            'WHERE datetime_changed >= :first '
+            'AND datetime_changed < :last '
+            'RETURNING *'
+            f') INSERT INTO {name} SELECT * FROM moved'
+        ),
+        {'first': first, 'last': last}
+    )
+    await conn.execute(text(
+        f'ALTER TABLE car_changes ATTACH PARTITION {name} '
+        f"FOR VALUES FROM ('{first}') TO ('{last}')"
+    ))
+
+    logger.info(
+        'partition %s is created, rows moved from the default one: %d',
+        name,
+        moved.rowcount
+    )
+
+
+async def maintain_partitions(
+    conn: AsyncConnection,
+    retention_months: Optional[int] = None
+) -> None:
+    """Converts `car_changes` to monthly range partitions (once), creates
+     partitions of the current and the next months and drops expired ones.
+
+    :param conn: AsyncConnection - connection with an open transaction
+    :param retention_months: Optional[int] - partitions older than that
+     (in months) are dropped, None - kept forever
+    :return: None
+    """
+    await conn.execute(select(func.pg_advisory_xact_lock(_LOCK_KEY)))
+
+    if await conn.scalar(text(
+        # `"char"` is returned as bytes unless it's cast
+        'SELECT relkind::text FROM pg_class '
+        "WHERE oid = 'car_changes'::regclass"
+    )) != 'p':
+        for statement in _PARTITION_CHANGES:
+            await conn.execute(text(statement))
+
+        logger.info('car_changes is converted to monthly partitions')
+
+    today = date.today()
+
+    for shift in range(_PARTITIONS_AHEAD + 1):
+        await _create_partition(
+            conn,
+            _month(today, shift),
+            _month(today, shift + 1)
+        )
+
+    if retention_months is None:
+        return
+
+    cutoff = _month(today, -retention_months)
+
+    for (name,) in await conn.execute(text(
+        'SELECT c.relname FROM pg_inherits i '
+        'JOIN pg_class c ON c.oid = i.inhrelid '
+        "WHERE i.inhparent = 'car_changes'::regclass"
+    )):
+        match = _PARTITION_NAME.match(name)
+
+        if match and _month(
+            date(int(match.group(1)), int(match.group(2)), 1),
+            1
+        ) <= cutoff:
+            await conn.execute(text(f'DROP TABLE {name}'))
+
+            logger.info('expired partition is dropped: %s', name)
+
+    await conn.execute(
+        text(
+            'DELETE FROM car_changes_default '
+            'WHERE datetime_changed < :cutoff'
+        ),
+        {'cutoff': cutoff}
+    )
@@ -2,4 +2,10 @@
 
 
 from .car import Car
+from .car_change import CarChange
+from .phone import Phone
+from .task import Task
+from .worker import Worker
+from .crawl import Crawl
+from .schema_version import SchemaVersion
 from ._base import Base
@@ -4,7 +4,7 @@
 from typing import Optional
 from datetime import datetime
 
-from sqlalchemy import DateTime
+from sqlalchemy import BigInteger, DateTime, Index
 from sqlalchemy.orm import mapped_column, Mapped
 
 from autoria_scraper.db.models._base import Base
@@ -15,9 +15,21 @@ __all__ = ('Car',)
 
 class Car(Base):
     __tablename__ = 'cars'
+    __table_args__ = (
+        # history of the vehicle across listings
+        Index('ix_cars_car_vin', 'car_vin'),
+        Index('ix_cars_car_number', 'car_number'),
+        # rows are appended in the order of `datetime_found`, so a tiny
+        #  BRIN index is enough for time-range scans (e.g. `iter_cars`)
+        Index(
+            'ix_cars_datetime_found',
+            'datetime_found',
+            postgresql_using='brin'
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    url: Mapped[str] = mapped_column(nullable=False)
+    url: Mapped[str] = mapped_column(nullable=False, unique=True)
     title: Mapped[str] = mapped_column(nullable=False)
     price_usd: Mapped[float] = mapped_column(nullable=False)
     odometer: Mapped[int] = mapped_column(nullable=False)
@@ -27,7 +39,18 @@ class Car(Base):
     images_count: Mapped[int] = mapped_column(nullable=False, default=0)
     car_number: Mapped[Optional[str]] = mapped_column(nullable=True)
     car_vin: Mapped[Optional[str]] = mapped_column(nullable=True)
+    # `CarParser.fingerprint()` of the stored content
+    content_hash: Mapped[Optional[int]] = mapped_column(
+        BigInteger,
+        nullable=True
+    )
     datetime_found: Mapped[datetime] = mapped_column(
         DateTime,
         default=datetime.utcnow
     )
+    # the last crawl which found the listing (changed or not)
+    datetime_checked: Mapped[Optional[datetime]] = mapped_column(
+        DateTime,
+        nullable=True,
+        default=datetime.utcnow
+    )
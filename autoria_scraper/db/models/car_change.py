@@ -0,0 +1,33 @@
+"""This module contains `CarChange` db model."""
+
+
+from typing import Optional
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime
+from sqlalchemy.orm import mapped_column, Mapped
+
+from autoria_scraper.db.models._base import Base
+
+
+__all__ = ('CarChange',)
+
+
+class CarChange(Base):
+    """Compact history of listings: a row per inserted or changed
+     `Car` (price and odometer only, the rest is kept by `cars`).
+    """
+    __tablename__ = 'car_changes'
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    url: Mapped[str] = mapped_column(nullable=False, index=True)
+    price_usd: Mapped[float] = mapped_column(nullable=False)
+    odometer: Mapped[int] = mapped_column(nullable=False)
+    content_hash: Mapped[Optional[int]] = mapped_column(
+        BigInteger,
+        nullable=True
+    )
+    datetime_changed: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow
+    )
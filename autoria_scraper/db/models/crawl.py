@@ -0,0 +1,34 @@
+"""This module contains `Crawl` db model."""
+
+
+from typing import Optional
+from datetime import datetime
+
+from sqlalchemy import DateTime
+from sqlalchemy.orm import mapped_column, Mapped
+
+from autoria_scraper.db.models._base import Base
+
+
+__all__ = ('Crawl',)
+
+
+class Crawl(Base):
+    """Crawls started by the coordinator of coordinator/worker mode,
+     workers wait for the latest one (see `autoria_scraper.db.queue`).
+
+    Statuses: `starting` (catalog pages are counted) -> `running` (pages
+     are queued) -> `finished` (the queue is drained) / `failed`.
+    """
+    __tablename__ = 'crawls'
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    status: Mapped[str] = mapped_column(nullable=False, default='starting')
+    datetime_started: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow
+    )
+    datetime_finished: Mapped[Optional[datetime]] = mapped_column(
+        DateTime,
+        nullable=True
+    )
@@ -0,0 +1,28 @@
+"""This module contains `Phone` db model."""
+
+
+from datetime import datetime
+
+from sqlalchemy import DateTime
+from sqlalchemy.orm import mapped_column, Mapped
+
+from autoria_scraper.db.models._base import Base
+
+
+__all__ = ('Phone',)
+
+
+class Phone(Base):
+    """Sellers' phone numbers resolved via the `popUp` endpoint,
+     keyed by `PhoneNumberParser` pieces.
+    """
+    __tablename__ = 'phones'
+
+    user_id: Mapped[str] = mapped_column(primary_key=True)
+    phone_id: Mapped[str] = mapped_column(primary_key=True)
+    phone_number: Mapped[str] = mapped_column(nullable=False)
+    datetime_resolved: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        index=True
+    )
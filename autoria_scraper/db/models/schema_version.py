@@ -0,0 +1,25 @@
+"""This module contains `SchemaVersion` db model."""
+
+
+from datetime import datetime
+
+from sqlalchemy import DateTime
+from sqlalchemy.orm import mapped_column, Mapped
+
+from autoria_scraper.db.models._base import Base
+
+
+__all__ = ('SchemaVersion',)
+
+
+class SchemaVersion(Base):
+    """Applied schema migrations (see `autoria_scraper.db.migrations`),
+     a row per version.
+    """
+    __tablename__ = 'schema_version'
+
+    version: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    datetime_applied: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow
+    )
@@ -0,0 +1,49 @@
+"""This module contains `Task` db model."""
+
+
+from typing import Optional
+from datetime import datetime
+
+from sqlalchemy import DateTime, Index, UniqueConstraint
+from sqlalchemy.orm import mapped_column, Mapped
+
+from autoria_scraper.db.models._base import Base
+
+
+__all__ = ('Task',)
+
+
+class Task(Base):
+    """Work queue of coordinator/worker mode (see
+     `autoria_scraper.db.queue`), a row per catalog page or direct link.
+
+    Statuses: `pending` -> `leased` -> `done` / `failed`, leased tasks
+     are returned to `pending` once the lease expires.
+    """
+    __tablename__ = 'tasks'
+    __table_args__ = (
+        UniqueConstraint('kind', 'url'),
+        # `claim_tasks` takes the oldest pending tasks of the kind
+        Index('ix_tasks_kind_status_id', 'kind', 'status', 'id'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # `catalog` or `direct`
+    kind: Mapped[str] = mapped_column(nullable=False)
+    url: Mapped[str] = mapped_column(nullable=False)
+    status: Mapped[str] = mapped_column(nullable=False, default='pending')
+    attempts: Mapped[int] = mapped_column(nullable=False, default=0)
+    lease_owner: Mapped[Optional[str]] = mapped_column(nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime,
+        nullable=True
+    )
+    # (re)queued at
+    datetime_queued: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow
+    )
+    datetime_done: Mapped[Optional[datetime]] = mapped_column(
+        DateTime,
+        nullable=True
+    )
@@ -0,0 +1,25 @@
+"""This module contains `Worker` db model."""
+
+
+from datetime import datetime
+
+from sqlalchemy import DateTime
+from sqlalchemy.orm import mapped_column, Mapped
+
+from autoria_scraper.db.models._base import Base
+
+
+__all__ = ('Worker',)
+
+
+class Worker(Base):
+    """Heartbeats of coordinator/worker mode workers, used for
+     throughput reporting.
+    """
+    __tablename__ = 'workers'
+
+    worker_id: Mapped[str] = mapped_column(primary_key=True)
+    processed: Mapped[int] = mapped_column(nullable=False, default=0)
+    failed: Mapped[int] = mapped_column(nullable=False, default=0)
+    datetime_started: Mapped[datetime] = mapped_column(DateTime)
+    datetime_heartbeat: Mapped[datetime] = mapped_column(DateTime)
@@ -0,0 +1,404 @@
+"""This module contains the work queue of coordinator/worker mode.
+
+Tasks (`Task` rows) are claimed with `SELECT ... FOR UPDATE SKIP LOCKED`,
+ so any amount of workers can share the queue without blocking each other.
+A claimed task is leased by the worker until `lease_expires_at`, leases
+ of crashed workers expire and their tasks are returned to the queue
+ (see `expire_leases`).
+"""
+
+
+from logging import getLogger
+from datetime import datetime, timedelta
+from typing import (
+    Collection,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple
+)
+
+from sqlalchemy import DateTime, case, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from autoria_scraper.db import SessionFactory, _MAX_PARAMS
+from autoria_scraper.db.models import Crawl, Task, Worker
+
+
+__all__ = (
+    'ClaimedTask',
+    'CrawlState',
+    'start_crawl',
+    'update_crawl',
+    'current_crawl',
+    'enqueue_tasks',
+    'claim_tasks',
+    'complete_tasks',
+    'fail_tasks',
+    'expire_leases',
+    'extend_leases',
+    'queue_stats',
+    'save_heartbeat',
+    'list_workers'
+)
+
+
+logger = getLogger(__name__)
+
+# columns are `TIMESTAMP WITHOUT TIME ZONE` in UTC (same as
+#  `datetime.utcnow` defaults)
+_NOW = func.timezone('UTC', func.now(), type_=DateTime)
+# statuses of crawls which are over
+_FINAL_STATUSES: Tuple[str, ...] = ('finished', 'failed')
+
+
+class ClaimedTask(NamedTuple):
+    """Task leased by the worker."""
+    id: int
+    url: str
+    datetime_queued: datetime
+
+
+class CrawlState(NamedTuple):
+    """The latest crawl started by the coordinator."""
+    id: int
+    status: str
+
+
+async def start_crawl() -> int:
+    """This function records the start of a crawl (workers wait for it,
+     see `current_crawl`).
+
+    :return: int - crawl id
+    """
+    async with SessionFactory() as session:
+        crawl_id = await session.scalar(
+            insert(Crawl).values(status='starting').returning(Crawl.id)
+        )
+        await session.commit()
+
+    return crawl_id
+
+
+async def update_crawl(crawl_id: int, status: str) -> None:
+    """This function changes the status of the crawl.
+
+    :param crawl_id: int - crawl id
+    :param status: str - `running`, `finished` or `failed`
+    :return: None
+    """
+    async with SessionFactory() as session:
+        await session.execute(
+            update(Crawl)
+            .where(Crawl.id == crawl_id)
+            .values(
+                status=status,
+                datetime_finished=_NOW if status in _FINAL_STATUSES else None
+            )
+        )
+        await session.commit()
+
+
+async def current_crawl() -> Optional["CrawlState"]:
+    """This function returns the latest crawl.
+
+    :return: Optional[CrawlState] - None if no crawl was started
+    """
+    async with SessionFactory() as session:
+        row = (await session.execute(
+            select(Crawl.id, Crawl.status).order_by(Crawl.id.desc()).limit(1)
+        )).first()
+
+    return CrawlState(*row) if row is not None else None
+
+
+async def enqueue_tasks(
+    kind: str,
+    urls: Collection[str],
+    requeue_before: Optional[datetime] = None
+) -> int:
+    """This function adds tasks to the queue, already queued ones are
+     skipped.
+
+    :param kind: str - `catalog` or `direct`
+    :param urls: Collection[str] - task urls
+    :param requeue_before: Optional[datetime] - finished (`done`/`failed`)
+     tasks are returned to the queue if they were queued before that
+     datetime (UTC), never if not specified
+    :return: int - amount of added or returned tasks
+    """
+    urls = list(dict.fromkeys(urls))
+    queued = 0
+    # column defaults and `_NOW` are rendered as bind params as well, so
+    #  the amount of table columns is used as the upper bound
+    chunk_size = _MAX_PARAMS // len(Task.__table__.columns)
+
+    async with SessionFactory() as session:
+        for i in range(0, len(urls), chunk_size):
+            stmt = insert(Task).values([
+                {'kind': kind, 'url': url, 'datetime_queued': _NOW}
+                for url in urls[i:i + chunk_size]
+            ])
+
+            if requeue_before is None:
+                stmt = stmt.on_conflict_do_nothing()
+            else:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[Task.kind, Task.url],
+                    set_={
+                        'status': 'pending',
+                        'attempts': 0,
+                        'lease_owner': None,
+                        'lease_expires_at': None,
+                        'datetime_queued': _NOW,
+                        'datetime_done': None
+                    },
+                    where=(
+                        Task.status.in_(('done', 'failed'))
+                        & (Task.datetime_queued < requeue_before)
+                    )
+                )
+
+            queued += len((await session.scalars(
+                stmt.returning(Task.id)
+            )).all())
+
+        await session.commit()
+
+    return queued
+
+
+async def claim_tasks(
+    kind: str,
+    worker_id: str,
+    limit: int,
+    lease_seconds: float
+) -> List["ClaimedTask"]:
+    """This function leases the oldest pending tasks of the kind, tasks
+     locked by concurrent claims are skipped.
+
+    :param kind: str - `catalog` or `direct`
+    :param worker_id: str - lease owner
+    :param limit: int - max amount of tasks
+    :param lease_seconds: float - lease duration
+    :return: List[ClaimedTask]
+    """
+    pending = (
+        select(Task.id)
+        .where(Task.kind == kind, Task.status == 'pending')
+        .order_by(Task.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+
+    async with SessionFactory() as session:
+        result = await session.execute(
+            update(Task)
+            .where(Task.id.in_(pending))
+            .values(
+                status='leased',
+                lease_owner=worker_id,
+                lease_expires_at=_NOW + timedelta(seconds=lease_seconds),
+                attempts=Task.attempts + 1
+            )
+            .returning(Task.id, Task.url, Task.datetime_queued)
+            .execution_options(synchronize_session=False)
+        )
+        tasks = [ClaimedTask(*row) for row in result]
+        await session.commit()
+
+    return sorted(tasks)
+
+
+async def complete_tasks(worker_id: str, ids: Collection[int]) -> int:
+    """This function marks leased tasks as done. Tasks whose lease was
+     lost (expired and claimed by another worker) aren't affected.
+
+    :param worker_id: str - lease owner
+    :param ids: Collection[int] - task ids
+    :return: int - amount of completed tasks
+    """
+    return await _release(worker_id, ids, status='done')
+
+
+async def fail_tasks(
+    worker_id: str,
+    ids: Collection[int],
+    max_attempts: int
+) -> int:
+    """This function returns leased tasks to the queue, or marks them as
+     failed if they are out of attempts.
+
+    :param worker_id: str - lease owner
+    :param ids: Collection[int] - task ids
+    :param max_attempts: int - max amount of claims per task
+    :return: int - amount of released tasks
+    """
+    return await _release(
+        worker_id,
+        ids,
+        status=case(
+            (Task.attempts >= max_attempts, 'failed'),
+            else_='pending'
+        )
+    )
+
+
+async def _release(worker_id: str, ids: Collection[int], status) -> int:
+    """Releases leased tasks with the given status.
+
+    :param worker_id: str - lease owner
+    :param ids: Collection[int] - task ids
+    :param status: str or sql expression - new status
+    :return: int - amount of released tasks
+    """
+    if not ids:
+        return 0
+
+    async with SessionFactory() as session:
+        result = await session.execute(
+            update(Task)
+            .where(
+                Task.id.in_(list(ids)),
+                Task.status == 'leased',
+                Task.lease_owner == worker_id
+            )
+            .values(
+                status=status,
+                lease_owner=None,
+                lease_expires_at=None,
+                datetime_done=_NOW
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+    return result.rowcount
+
+
+async def expire_leases(max_attempts: int) -> int:
+    """This function returns tasks with expired leases (crashed or stuck
+     workers) to the queue, or marks them as failed if they are out
+     of attempts.
+
+    :param max_attempts: int - max amount of claims per task
+    :return: int - amount of expired leases
+    """
+    async with SessionFactory() as session:
+        result = await session.execute(
+            update(Task)
+            .where(Task.status == 'leased', Task.lease_expires_at < _NOW)
+            .values(
+                status=case(
+                    (Task.attempts >= max_attempts, 'failed'),
+                    else_='pending'
+                ),
+                lease_owner=None,
+                lease_expires_at=None
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+    if result.rowcount:
+        logger.warning('expired leases: %d', result.rowcount)
+
+    return result.rowcount
+
+
+async def extend_leases(worker_id: str, lease_seconds: float) -> int:
+    """This function extends all leases of the worker (a part of
+     the worker heartbeat).
+
+    :param worker_id: str - lease owner
+    :param lease_seconds: float - lease duration (from now)
+    :return: int - amount of extended leases
+    """
+    async with SessionFactory() as session:
+        result = await session.execute(
+            update(Task)
+            .where(Task.status == 'leased', Task.lease_owner == worker_id)
+            .values(lease_expires_at=_NOW + timedelta(seconds=lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+    return result.rowcount
+
+
+async def queue_stats() -> Dict[Tuple[str, str], int]:
+    """This function counts tasks by kind and status.
+
+    :return: Dict[Tuple[str, str], int] - (kind, status) -> amount
+    """
+    async with SessionFactory() as session:
+        result = await session.execute(
+            select(Task.kind, Task.status, func.count())
+            .group_by(Task.kind, Task.status)
+        )
+
+        return {(kind, status): count for kind, status, count in result}
+
+
+async def save_heartbeat(
+    worker_id: str,
+    started: datetime,
+    processed: int,
+    failed: int
+) -> None:
+    """This function stores worker counters (see `list_workers`).
+
+    :param worker_id: str - worker id
+    :param started: datetime - worker start datetime (UTC)
+    :param processed: int - amount of processed tasks
+    :param failed: int - amount of failed tasks
+    :return: None
+    """
+    stmt = insert(Worker).values(
+        worker_id=worker_id,
+        processed=processed,
+        failed=failed,
+        datetime_started=started,
+        datetime_heartbeat=datetime.utcnow()
+    )
+
+    async with SessionFactory() as session:
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[Worker.worker_id],
+                set_={
+                    'processed': stmt.excluded.processed,
+                    'failed': stmt.excluded.failed,
+                    'datetime_started': stmt.excluded.datetime_started,
+                    'datetime_heartbeat': stmt.excluded.datetime_heartbeat
+                }
+            )
+        )
+        await session.commit()
+
+
+async def list_workers(
+    since: datetime
+) -> List[Tuple[str, int, int, datetime, datetime]]:
+    """This function returns workers seen after `since`.
+
+    :param since: datetime - min heartbeat datetime (UTC)
+    :return: List[Tuple[str, int, int, datetime, datetime]] - (worker_id,
+     processed, failed, datetime_started, datetime_heartbeat)
+    """
+    async with SessionFactory() as session:
+        result = await session.execute(
+            select(
+                Worker.worker_id,
+                Worker.processed,
+                Worker.failed,
+                Worker.datetime_started,
+                Worker.datetime_heartbeat
+            )
+            .where(Worker.datetime_heartbeat > since)
+            .order_by(Worker.worker_id)
+        )
+
+        return [tuple(row) for row in result]
@@ -0,0 +1,270 @@
+"""This module contains `Exporter` class - incremental export of `cars`
+ rows to csv or parquet files.
+
+Rows are streamed by a server-side cursor (`autoria_scraper.db.iter_cars`)
+ in the order of `datetime_found` and written to partitions:
+
+```
+dumps/
+    _watermark.json
+    datetime_found=2025-06-27/part-20250627T120000.csv
+    datetime_found=2025-06-28/part-20250627T120000.csv
+```
+
+Each run exports rows found after the watermark (the upper bound of
+ the previous run) only. Partition files are written as `*.tmp` and
+ renamed when complete, the watermark is advanced after all partitions
+ are renamed, so an interrupted export is simply repeated (the same
+ file names are overwritten).
+"""
+
+
+import os
+import csv
+import json
+from logging import getLogger
+from datetime import datetime, timedelta
+from typing import Any, List, Optional, Tuple
+
+from autoria_scraper.config import app_config
+from autoria_scraper.core.misc import replace_file
+
+
+__all__ = ('Exporter',)
+
+
+logger = getLogger(__name__)
+
+# same as `examples/output_data_example.csv`
+COLUMNS: Tuple[str, ...] = (
+    'id',
+    'url',
+    'title',
+    'price_usd',
+    'odometer',
+    'username',
+    'phone_number',
+    'image_url',
+    'images_count',
+    'car_number',
+    'car_vin',
+    'datetime_found'
+)
+_WATERMARK_FILE = '_watermark.json'
+# the first export starts here
+_EPOCH = datetime(1970, 1, 1)
+
+
+class _CsvWriter:
+    """Writes a single csv partition file."""
+
+    extension = 'csv'
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file, quoting=csv.QUOTE_NONNUMERIC)
+        self._writer.writerow(COLUMNS)
+
+    def write(self, rows: List[Tuple[Any, ...]]) -> None:
+        self._writer.writerows(rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ParquetWriter:
+    """Writes a single parquet partition file (one row group per batch)."""
+
+    extension = 'parquet'
+
+    def __init__(self, path: str) -> None:
+        # optional dependency, required for this format only
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._schema = pa.schema([
+            ('id', pa.int64()),
+            ('url', pa.string()),
+            ('title', pa.string()),
+            ('price_usd', pa.float64()),
+            ('odometer', pa.int64()),
+            ('username', pa.string()),
+            ('phone_number', pa.string()),
+            ('image_url', pa.string()),
+            ('images_count', pa.int64()),
+            ('car_number', pa.string()),
+            ('car_vin', pa.string()),
+            ('datetime_found', pa.timestamp('us')),
+        ])
+        self._writer = pq.ParquetWriter(
+            path,
+            self._schema,
+            compression='zstd'
+        )
+
+    def write(self, rows: List[Tuple[Any, ...]]) -> None:
+        self._writer.write_table(
+            self._pa.Table.from_arrays(
+                [
+                    self._pa.array(values, type=field.type)
+                    for values, field in zip(zip(*rows), self._schema)
+                ],
+                schema=self._schema
+            )
+        )
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+_WRITERS = {'csv': _CsvWriter, 'parquet': _ParquetWriter}
+
+
+class Exporter:
+    """Exports `cars` rows found since the previous export, partitioned
+     by `datetime_found` date. Memory usage depends on `batch_size` only.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        format_: str,
+        batch_size: int,
+        lag: float
+    ) -> None:
+        """
+        :param path: str - output directory
+        :param format_: str - `csv` or `parquet`
+        :param batch_size: int - amount of rows fetched (and written) at once
+        :param lag: float - rows found during this period (in seconds) are
+         exported next time (transactions in flight may commit them later)
+        :return: None
+        """
+        self._path = path
+        self._writer_type = _WRITERS[format_]
+        self._batch_size = batch_size
+        self._lag = lag
+
+    @classmethod
+    def from_config(
+        cls,
+        path: Optional[str] = None,
+        format_: Optional[str] = None
+    ) -> "Exporter":
+        """Creates the exporter configured by `app_config.export`.
+
+        :param path: Optional[str] - overrides `EXPORT__PATH`
+        :param format_: Optional[str] - overrides `EXPORT__FORMAT`
+        :return: Exporter
+        """
+        config = app_config.export
+
+        return cls(
+            path=path or config.path,
+            format_=format_ or config.format,
+            batch_size=config.batch_size,
+            lag=config.lag_seconds
+        )
+
+    def __watermark(self) -> datetime:
+        """Returns the upper bound of the previous export.
+
+        :return: datetime - UTC
+        """
+        try:
+            with open(os.path.join(self._path, _WATERMARK_FILE)) as file:
+                return datetime.fromisoformat(json.load(file)['until'])
+        except FileNotFoundError:
+            return _EPOCH
+
+    def __partition(self, day: str, since: datetime) -> Tuple[str, str]:
+        """Returns the temporary and the final path of the partition file.
+
+        :param day: str - `datetime_found` date, e.g: 2025-06-27
+        :param since: datetime - lower bound of the export (file name)
+        :return: Tuple[str, str]
+        """
+        directory = os.path.join(self._path, f'datetime_found={day}')
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(
+            directory,
+            f'part-{since:%Y%m%dT%H%M%S}.{self._writer_type.extension}'
+        )
+
+        return f'{path}.tmp', path
+
+    async def run(self) -> int:
+        """Exports rows found after the watermark.
+
+        :return: int - amount of exported rows
+        """
+        from autoria_scraper.db import iter_cars
+
+        since = self.__watermark()
+        until = datetime.utcnow() - timedelta(seconds=self._lag)
+
+        if until <= since:
+            logger.info('nothing to export, watermark: %s', since)
+
+            return 0
+
+        exported = 0
+        # partition files to rename once the export is complete
+        written: List[Tuple[str, str]] = []
+        day, writer = None, None
+
+        try:
+            async for rows in iter_cars(
+                COLUMNS,
+                since,
+                until,
+                self._batch_size
+            ):
+                # rows are ordered by `datetime_found`, so each partition
+                #  is written at once (a single open file)
+                start = 0
+
+                for i, row in enumerate((*rows, None)):
+                    row_day = row[-1].date().isoformat() if row else None
+
+                    if row_day == day:
+                        continue
+
+                    if writer is not None and i > start:
+                        writer.write(rows[start:i])
+
+                    start = i
+
+                    if row is None:
+                        break
+
+                    if writer is not None:
+                        writer.close()
+
+                    day = row_day
+                    written.append(self.__partition(day, since))
+                    writer = self._writer_type(written[-1][0])
+
+                exported += len(rows)
+                logger.info('rows exported: %d', exported)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        for temp, path in written:
+            os.replace(temp, path)
+
+        replace_file(
+            os.path.join(self._path, _WATERMARK_FILE),
+            json.dumps({'until': until.isoformat(), 'rows': exported})
+        )
+
+        logger.info(
+            'export finished, rows: %d, partitions: %d, watermark: %s',
+            exported,
+            len(written),
+            until
+        )
+
+        return exported
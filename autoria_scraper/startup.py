@@ -0,0 +1,94 @@
+"""This module contains `StartupProfile` - timings of cold start phases
+ (`python main.py --profile-startup`).
+
+Phases are marked from the entrypoint to the first http request, so it's
+ easy to see what the time-to-first-request consists of. Use
+ `python -X importtime main.py` for import timings of each module.
+"""
+
+
+import sys
+import time
+from logging import getLogger
+from typing import List, Tuple
+
+
+__all__ = ('StartupProfile', 'startup_profile')
+
+
+logger = getLogger(__name__)
+
+# heavy packages, reported as loaded or not loaded before the first
+#  request (most of them are imported lazily)
+_HEAVY_MODULES: Tuple[str, ...] = (
+    'pydantic',
+    'sqlalchemy',
+    'asyncpg',
+    'aiohttp',
+    'aiohttp.web',
+    'lxml',
+    'bs4',
+    'fake_useragent'
+)
+
+
+class StartupProfile:
+    """Elapsed time of startup phases, logged once the first http
+     request is sent (if enabled).
+    """
+
+    def __init__(self) -> None:
+        # the earliest point available without `/proc` parsing
+        self._started = self._last = time.perf_counter()
+        self._phases: List[Tuple[str, float]] = []
+        self._reported = False
+        self.enabled = False
+
+    def mark(self, phase: str) -> None:
+        """Finishes the phase (started when the previous one finished).
+
+        :param phase: str - phase title
+        :return: None
+        """
+        now = time.perf_counter()
+        self._phases.append((phase, now - self._last))
+        self._last = now
+
+    def first_request(self) -> None:
+        """Marks the first http request and logs the report (called on
+         each request, only the first call matters).
+
+        :return: None
+        """
+        if self._reported:
+            return
+
+        self._reported = True
+
+        if self.enabled:
+            self.mark('first request')
+            logger.info('startup profile:\n%s', '\n'.join(self.report()))
+
+    def report(self) -> List[str]:
+        """Human-readable report: phases and loaded heavy packages.
+
+        :return: List[str] - lines
+        """
+        return [
+            *(
+                f'{phase:<40} {seconds * 1000:>9.1f} ms'
+                for phase, seconds in self._phases
+            ),
+            f'{"total":<40} {(self._last - self._started) * 1000:>9.1f} ms',
+            'loaded: {}'.format(
+                ', '.join(m for m in _HEAVY_MODULES if m in sys.modules)
+            ),
+            'not loaded: {}'.format(
+                ', '.join(
+                    m for m in _HEAVY_MODULES if m not in sys.modules
+                ) or '-'
+            )
+        ]
+
+
+startup_profile = StartupProfile()
@@ -0,0 +1,5 @@
+"""This package contains the end-to-end benchmark suite.
+
+- `benchmarks.server` - local AutoRia stand-in server
+- `benchmarks.__main__` - benchmark runner (`python -m benchmarks`)
+"""
@@ -0,0 +1,315 @@
+"""End-to-end throughput benchmark.
+
+Starts the stand-in server (`benchmarks.server`) in a separate process,
+ drives the real crawling pipeline against it and reports throughput,
+ request latency percentiles, CPU time and peak RSS as json.
+
+How to start?
+```shell
+python -m benchmarks --pages 100 --latency-ms 50 --output run.json
+python -m benchmarks --pages 100 --latency-ms 50 --compare run.json
+```
+
+`--sink memory` (default) - parsed records are dropped, no database
+ required. `--sink postgres` - the whole `autoria_scraper.start()` is
+ executed, records are saved to `DATABASE__URL` (use an empty database,
+ otherwise known listings are skipped).
+"""
+
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import platform
+import resource
+from collections import Counter
+from datetime import datetime, timezone
+from dataclasses import asdict
+from multiprocessing import get_context
+from typing import Any, Dict, List, Optional
+
+from benchmarks.server import ROOT_PATH, PHONE_PATH, ServerOptions, serve
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+
+            time.sleep(0.05)
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """Nearest-rank percentiles (in milliseconds).
+
+    :param values: List[float] - latencies (in seconds)
+    :return: Dict[str, Optional[float]]
+    """
+    values = sorted(values)
+
+    def rank(p: float) -> Optional[float]:
+        if values:
+            index = min(len(values) - 1, max(0, round(p * len(values)) - 1))
+
+            return round(values[index] * 1000, 3)
+
+    return {
+        'p50': rank(0.5),
+        'p90': rank(0.9),
+        'p99': rank(0.99),
+        'max': rank(1.0)
+    }
+
+
+def _max_rss_mb(usage: "resource.struct_rusage") -> float:
+    # bytes on macOS, kilobytes elsewhere
+    divider = 1024 * 1024 if sys.platform == 'darwin' else 1024
+
+    return round(usage.ru_maxrss / divider, 1)
+
+
+class _Tracer:
+    """Collects request latencies via `aiohttp.TraceConfig`."""
+
+    def __init__(self) -> None:
+        from aiohttp import TraceConfig
+
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses = Counter()
+        self.config = TraceConfig()
+        self.config.on_request_start.append(self.__on_start)
+        self.config.on_request_end.append(self.__on_end)
+        self.config.on_request_exception.append(self.__on_exception)
+
+    @staticmethod
+    def kind(method: str, path: str) -> str:
+        if method == 'POST':
+            return 'phone'
+
+        return 'catalog' if path == ROOT_PATH else 'direct'
+
+    async def __on_start(self, session, context, params) -> None:
+        context.started = time.perf_counter()
+
+    async def __on_end(self, session, context, params) -> None:
+        kind = self.kind(params.method, params.url.path)
+        self.latencies.setdefault(kind, []).append(
+            time.perf_counter() - context.started
+        )
+        self.statuses[str(params.response.status)] += 1
+
+    async def __on_exception(self, session, context, params) -> None:
+        self.statuses[type(params.exception).__name__] += 1
+
+
+async def _run(sink: str) -> None:
+    """Runs the pipeline (imports are made after env is configured).
+
+    :param sink: str - `memory` or `postgres`
+    :return: None
+    """
+    from autoria_scraper import start, listener
+    from autoria_scraper.config import app_config
+    from autoria_scraper.core.phones import PhoneCache
+    from autoria_scraper.core.pipeline import Pipeline
+    from autoria_scraper.core.misc import session_manager, parse_executor
+
+    if sink == 'postgres':
+        return await start()
+
+    async def drop(_: List[Any]) -> None:
+        return
+
+    listener.start()
+
+    try:
+        await Pipeline.from_config(
+            save=drop,
+            phones=PhoneCache(
+                max_size=app_config.scraper.phone_cache_size,
+                ttl=app_config.scraper.phone_cache_ttl
+            )
+        ).run()
+    finally:
+        await session_manager.close()
+        parse_executor.close()
+        listener.stop()
+
+
+def _compare(result: Dict[str, Any], path: str) -> None:
+    with open(path) as file:
+        baseline = json.load(file)['results']
+
+    print(f'compared to {path}:', file=sys.stderr)
+
+    for key in ('listings_per_sec', 'pages_per_sec', 'cpu_seconds'):
+        before, after = baseline[key], result[key]
+        change = (after - before) / before * 100 if before else 0
+        print(
+            f'  {key}: {before} -> {after} ({change:+.1f}%)',
+            file=sys.stderr
+        )
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sink', choices=('memory', 'postgres'),
+                        default='memory')
+    parser.add_argument('--concurrency', type=int, default=200,
+                        help='SCRAPER__BATCH_SIZE')
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help='SCRAPER__PARSE_WORKERS')
+    parser.add_argument('--env', action='append', default=[],
+                        metavar='KEY=VALUE',
+                        help='any other setting, e.g. AIOHTTP__RATE_LIMIT=100')
+    parser.add_argument('--label', default='',
+                        help='free-form description of the run')
+    parser.add_argument('--log-level', default='WARNING')
+    parser.add_argument('--output', help='saves the result to a json file')
+    parser.add_argument('--compare', help='json file of a previous run')
+
+    for field, value in asdict(ServerOptions()).items():
+        parser.add_argument(
+            f'--{field.replace("_", "-")}',
+            type=type(value),
+            default=value
+        )
+
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    options = ServerOptions(**{
+        field: getattr(args, field) for field in asdict(ServerOptions())
+    })
+    port = _free_port()
+    base = f'http://127.0.0.1:{port}'
+    # the server is a separate process, so it doesn't compete with
+    #  the pipeline for the event loop
+    server = get_context('spawn').Process(
+        target=serve,
+        args=(options, '127.0.0.1', port),
+        daemon=True
+    )
+    server.start()
+
+    try:
+        _wait_for_port(port)
+        # `app_config` is created on import, so env goes first
+        os.environ.update({
+            'SCRAPER__ROOT_URL': f'{base}{ROOT_PATH}',
+            'SCRAPER__PHONE_URL': f'{base}{PHONE_PATH}',
+            'SCRAPER__BATCH_SIZE': str(args.concurrency),
+            'SCRAPER__PARSE_WORKERS': str(args.parse_workers),
+        })
+        os.environ.pop('SCRAPER__PAGES_LIMIT', None)
+
+        for key, value in (
+            ('DATABASE__URL', 'postgresql+asyncpg://localhost/benchmark'),
+            ('AIOHTTP__ATTEMPTS_LIMIT', '3'),
+            ('AIOHTTP__ATTEMPT_DELAY', '1'),
+            ('AIOHTTP__TIMEOUT', '60'),
+        ):
+            os.environ.setdefault(key, value)
+
+        os.environ.update(item.split('=', 1) for item in args.env)
+
+        from autoria_scraper.core.misc import session_manager, metrics
+
+        logging.getLogger('autoria_scraper').setLevel(args.log_level)
+        tracer = _Tracer()
+        session_manager.add_trace_config(tracer.config)
+
+        started = time.perf_counter()
+        asyncio.run(_run(args.sink))
+        duration = time.perf_counter() - started
+        # parsing workers are already joined, the server is still alive,
+        #  so children usage includes parsing workers only
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        # registered by the pipeline, the existing counter is returned
+        listings = metrics.counter(
+            'autoria_pipeline_entities_total',
+            ''
+        ).value()
+    finally:
+        server.terminate()
+        server.join()
+
+    requests = {
+        kind: len(values) for kind, values in tracer.latencies.items()
+    }
+    cpu_seconds = (
+        usage.ru_utime + usage.ru_stime
+        + children.ru_utime + children.ru_stime
+    )
+    result = {
+        'duration_sec': round(duration, 3),
+        'listings': int(listings),
+        'listings_per_sec': round(listings / duration, 2),
+        'pages_per_sec': round(
+            (requests.get('catalog', 0) + requests.get('direct', 0))
+            / duration,
+            2
+        ),
+        'requests': requests,
+        'statuses': dict(tracer.statuses),
+        'latency_ms': {
+            kind: _percentiles(values)
+            for kind, values in tracer.latencies.items()
+        },
+        'cpu_seconds': round(cpu_seconds, 3),
+        'cpu_utilization': round(cpu_seconds / duration, 3),
+        'peak_rss_mb': _max_rss_mb(usage),
+        'peak_rss_workers_mb': _max_rss_mb(children),
+    }
+    report = {
+        'label': args.label,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'settings': {
+            'sink': args.sink,
+            'concurrency': args.concurrency,
+            'parse_workers': args.parse_workers,
+            'env': args.env,
+            'server': asdict(options),
+        },
+        'results': result,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+
+    if args.compare:
+        _compare(result, args.compare)
+
+
+if __name__ == '__main__':
+    main()
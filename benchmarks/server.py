@@ -0,0 +1,237 @@
+"""This module contains a local AutoRia stand-in server.
+
+Serves synthetic pages with the same structure as the real ones (see
+ `autoria_scraper.core.selectors`):
+    - catalog - `/uk/car/used/?page=N`, `#pagination` and `m-link-ticket`
+     links
+    - direct - `/uk/auto_<make>_<model>_<id>.html`
+    - phone - `POST /bff/final-page/public/auto/popUp/`
+
+How to start?
+```shell
+python -m benchmarks.server --port 8765 --latency-ms 50
+```
+"""
+
+
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass, asdict
+
+from aiohttp import web
+
+
+__all__ = ('ServerOptions', 'create_app', 'serve')
+
+
+ROOT_PATH = '/uk/car/used/'
+PHONE_PATH = '/bff/final-page/public/auto/popUp/'
+
+_MODELS = (
+    ('bmw', 'x5'),
+    ('audi', 'a6'),
+    ('toyota', 'camry'),
+    ('volkswagen', 'passat'),
+    ('mercedes_benz', 'sprinter'),
+)
+
+
+@dataclass(slots=True)
+class ServerOptions:
+    """Synthetic content and latency settings."""
+    # total amount of catalog pages
+    pages: int = 50
+    # listings per catalog page
+    links_per_page: int = 20
+    # response delay (in milliseconds), uniformly distributed within
+    #  [latency_ms - latency_jitter_ms, latency_ms + latency_jitter_ms]
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    # padding added to each direct page (in kilobytes), real pages are
+    #  about 500-700 kB
+    page_size_kb: int = 0
+    # share of unavailable (sold/removed) listings
+    unavailable_rate: float = 0.01
+    # amount of distinct sellers, listings are distributed evenly
+    sellers: int = 1000
+
+
+# key of `ServerOptions` in the application
+OPTIONS = web.AppKey('options', ServerOptions)
+
+
+def _catalog(options: "ServerOptions", base: str, page: int) -> str:
+    links = ''.join(
+        '<section class="ticket-item">'
+        f'<a class="m-link-ticket" href="{base}/uk/auto_{make}_{model}_'
+        f'{listing_id}.html">{make} {model}</a>'
+        '</section>'
+        for listing_id in range(
+            page * options.links_per_page,
+            (page + 1) * options.links_per_page
+        )
+        for make, model in (_MODELS[listing_id % len(_MODELS)],)
+    )
+    # example: "1 / 18 100"
+    pages = f'{options.pages:,}'.replace(',', ' ')
+
+    return (
+        '<html><head><meta charset="utf-8"></head><body>'
+        f'<div id="searchResults">{links}</div>'
+        '<div id="pagination">'
+        f'<span class="dhide">{page} / {pages}</span>'
+        '</div></body></html>'
+    )
+
+
+def _direct(options: "ServerOptions", listing_id: int) -> str:
+    make, model = _MODELS[listing_id % len(_MODELS)]
+    # sellers (and their phones) are shared by many listings
+    seller = listing_id % options.sellers
+    # example: "12 500"
+    price = f'{listing_id % 50_000 + 1000:,}'.replace(',', ' ')
+    padding = 'x' * (options.page_size_kb * 1024)
+
+    return f'''<html><head><meta charset="utf-8"></head>
+<body data-auto-id="{listing_id}">
+<h1 class="head" title="{make} {model}">{make} {model} {listing_id}</h1>
+<div class="price_value"><strong>{price} $</strong></div>
+<div class="base-information bold">
+<span class="size18">{listing_id % 400}</span> тис. км пробіг
+</div>
+<div class="seller_info_name bold">Seller {seller}</div>
+<span class="state-num ua">
+AA {listing_id % 10_000:04d} BB<span class="popup">?</span>
+</span>
+<span class="label-vin">WBA{listing_id:014d}</span>
+<picture>
+<source type="image/webp" srcset="https://cdn.example/{listing_id}s.webp">
+<source type="image/webp" srcset="https://cdn.example/{listing_id}f.webp">
+</picture>
+<span class="count"><span class="mhide">з {listing_id % 30 + 1}</span></span>
+<a class="popup-successful-call" data-value-id="{seller + 1_000_000}">call</a>
+<div data-owner-id="{seller}"></div>
+<div class="description">{padding}</div>
+</body></html>'''
+
+
+_UNAVAILABLE = (
+    '<html><head><meta charset="utf-8"></head><body>'
+    '<div class="notice_head">Listing removed</div>'
+    '</body></html>'
+)
+
+
+async def _delay(options: "ServerOptions") -> None:
+    latency = random.uniform(
+        options.latency_ms - options.latency_jitter_ms,
+        options.latency_ms + options.latency_jitter_ms
+    )
+
+    if latency > 0:
+        await asyncio.sleep(latency / 1000)
+
+
+def _base(request: "web.Request") -> str:
+    return f'{request.scheme}://{request.host}'
+
+
+async def _catalog_handler(request: "web.Request") -> "web.Response":
+    options = request.app[OPTIONS]
+    page = int(request.query.get('page', 1))
+    await _delay(options)
+
+    return web.Response(
+        text=_catalog(options, _base(request), page),
+        content_type='text/html'
+    )
+
+
+async def _direct_handler(request: "web.Request") -> "web.Response":
+    options = request.app[OPTIONS]
+    listing_id = int(request.match_info['id'])
+    await _delay(options)
+    # the same listing is always (un)available
+    if random.Random(listing_id).random() < options.unavailable_rate:
+        return web.Response(text=_UNAVAILABLE, content_type='text/html')
+
+    return web.Response(
+        text=_direct(options, listing_id),
+        content_type='text/html'
+    )
+
+
+async def _phone_handler(request: "web.Request") -> "web.Response":
+    options = request.app[OPTIONS]
+    payload = await request.json()
+    await _delay(options)
+    phone_id = int(dict(payload['data'])['phoneId'])
+
+    return web.json_response({
+        'additionalParams': {
+            'phoneStr': f'(067) {phone_id % 1000:03d} {phone_id % 10000:04d}'
+        }
+    })
+
+
+def create_app(options: "ServerOptions") -> "web.Application":
+    """Creates the stand-in application.
+
+    :param options: ServerOptions - content and latency settings
+    :return: web.Application
+    """
+    app = web.Application()
+    app[OPTIONS] = options
+    app.router.add_get(ROOT_PATH, _catalog_handler)
+    app.router.add_get(
+        r'/uk/auto_{name:[a-z0-9_]+}_{id:\d+}.html',
+        _direct_handler
+    )
+    app.router.add_post(PHONE_PATH, _phone_handler)
+
+    return app
+
+
+def serve(options: "ServerOptions", host: str, port: int) -> None:
+    """Runs the stand-in server until interrupted.
+
+    :param options: ServerOptions - content and latency settings
+    :param host: str - interface to bind
+    :param port: int - port to bind
+    :return: None
+    """
+    web.run_app(
+        create_app(options),
+        host=host,
+        port=port,
+        print=None,
+        access_log=None
+    )
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+
+    for field, value in asdict(ServerOptions()).items():
+        parser.add_argument(
+            f'--{field.replace("_", "-")}',
+            type=type(value),
+            default=value
+        )
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = _parse_args()
+    serve(
+        ServerOptions(**{
+            field: getattr(args, field)
+            for field in asdict(ServerOptions())
+        }),
+        host=args.host,
+        port=args.port
+    )
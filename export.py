@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+"""Application `export.py` file - incremental export of scraped cars.
+
+How to start?
+```shell
+# rows found since the previous export -> dumps/datetime_found=.../*.csv
+python export.py
+# requires `pyarrow` package
+python export.py --format parquet --output /app/dumps
+```
+"""
+
+
+import asyncio
+import argparse
+
+from autoria_scraper import export
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Exports cars found since the previous export'
+    )
+    parser.add_argument(
+        '--format',
+        choices=('csv', 'parquet'),
+        help='output format, `EXPORT__FORMAT` by default'
+    )
+    parser.add_argument(
+        '--output',
+        help='output directory, `EXPORT__PATH` by default'
+    )
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    asyncio.run(export(path=args.output, format_=args.format))
@@ -5,14 +5,91 @@
 How to start?
 ```shell
 python main.py
+# continues the interrupted crawl from the checkpoint
+python main.py --resume
+# logs timings of startup phases once the first request is sent
+python main.py --profile-startup
+```
+
+Coordinator/worker mode (any amount of workers, one database):
+```shell
+python main.py coordinator
+python main.py worker
+python main.py worker --worker-id worker-2
+```
+
+Daemon mode (stays resident, crawls the catalog every `DAEMON__INTERVAL`
+ seconds):
+```shell
+python main.py daemon
+```
+
+Sharded mode (catalog pages are split between processes, one per core):
+```shell
+python main.py sharded
+python main.py sharded --shards 4 --resume
 ```
 """
 
 
+# imported first, startup phases are measured from here
+from autoria_scraper.startup import startup_profile
+
+import sys
 import asyncio
+import argparse
+
+from autoria_scraper import start, start_sharded
+
 
-from autoria_scraper import start
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='AutoRia.com web-scraper')
+    parser.add_argument(
+        'mode',
+        nargs='?',
+        choices=('standalone', 'coordinator', 'worker', 'daemon', 'sharded'),
+        default='standalone',
+        help='`standalone` - the whole crawl in this process (default), '
+             '`coordinator` - enqueues catalog pages and reports progress, '
+             '`worker` - processes queued tasks, '
+             '`daemon` - the standalone crawl repeated periodically, '
+             '`sharded` - the standalone crawl split between processes'
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='continues the interrupted standalone crawl (the first daemon '
+             'sweep) from the checkpoint'
+    )
+    parser.add_argument(
+        '--profile-startup',
+        action='store_true',
+        help='logs timings of startup phases (up to the first request)'
+    )
+    parser.add_argument(
+        '--shards',
+        type=int,
+        help='amount of shard processes (`sharded` mode), '
+             '`SHARDING__SHARDS` or CPU count by default'
+    )
+    parser.add_argument(
+        '--worker-id',
+        help='unique id of the worker (lease owner), `host-pid` by default'
+    )
+
+    return parser.parse_args()
 
 
 if __name__ == '__main__':
-    asyncio.run(start())
+    args = parse_args()
+    startup_profile.enabled = args.profile_startup
+    startup_profile.mark('entrypoint (main.py imports)')
+
+    if args.mode == 'sharded':
+        sys.exit(
+            0 if start_sharded(shards=args.shards, resume=args.resume) else 1
+        )
+
+    asyncio.run(
+        start(mode=args.mode, worker_id=args.worker_id, resume=args.resume)
+    )
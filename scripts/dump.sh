@@ -1,5 +1,5 @@
 #!/bin/bash
 
-export PGPASSWORD=$PG_PASSWORD
-
-pg_dump -U "$PG_USER" -h "$PG_HOST" -p 5432 -d "$PG_DB" -f /app/dumps/autoria_"$(date +%F_%H-%M-%S)".sql
+# incremental export: only cars found since the previous run are written
+#  to /app/dumps/datetime_found=YYYY-MM-DD/ partitions
+/usr/local/bin/python3 /app/export.py --output /app/dumps
@@ -0,0 +1,162 @@
+"""Shared fixtures of the test suite.
+
+Settings are validated on import of `autoria_scraper.config`, so they are
+ set here, before any test module is imported (`.env` files can't change
+ them). Database tests run against `TEST_DATABASE_URL` only (its `public`
+ schema is recreated by each test), they are skipped if it isn't
+ specified.
+
+Pages are built by the stand-in server of benchmarks (`benchmarks.server`)
+ with inline scripts added, the same as real pages have.
+"""
+
+
+import os
+import asyncio
+import tempfile
+from contextlib import asynccontextmanager
+from typing import Any, AsyncContextManager, Awaitable, Callable
+
+import pytest
+
+
+_TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+os.environ.update({
+    'DATABASE__URL': _TEST_DATABASE_URL
+    or 'postgresql+asyncpg://postgres@localhost:5432/autoria_test',
+    'SCRAPER__ROOT_URL': 'http://127.0.0.1:8765/uk/car/used/',
+    'SCRAPER__PHONE_URL': 'http://127.0.0.1:8765/popUp/',
+    'SCRAPER__BATCH_SIZE': '10',
+    'SCRAPER__PARSE_WORKERS': '0',
+    'SCRAPER__EXTRACTION_ENGINE': 'lxml',
+    'SCRAPER__EXTRACTION_PARITY_RATE': '0',
+    'SCRAPER__STREAMING_PARSE': 'false',
+    'AIOHTTP__ATTEMPTS_LIMIT': '2',
+    'AIOHTTP__ATTEMPT_DELAY': '0',
+    'AIOHTTP__TIMEOUT': '10',
+    'AIOHTTP__USER_AGENTS_PATH': os.path.join(
+        tempfile.gettempdir(),
+        'autoria_scraper_tests_user_agents.json'
+    ),
+    'CACHE__ENABLED': 'false',
+    'ARCHIVE__MODE': 'off',
+    'METRICS__ENABLED': 'false',
+    'DATABASE__PARTITION_CHANGES': 'false'
+})
+
+# inline script with markup-like content (real pages have dozens of them)
+SCRIPT: str = (
+    '<script>window.__data = {"html": "<div class=\\"x\\">", "n": 1 < 2};'
+    '</script>'
+)
+
+
+@pytest.fixture
+def db() -> Callable[[Awaitable[Any]], Any]:
+    """Recreates the schema of the test database.
+
+    :return: Callable[[Awaitable[Any]], Any] - runs a coroutine in a new
+     event loop (pooled connections are bound to the loop, so they are
+     disposed after each run)
+    """
+    if _TEST_DATABASE_URL is None:
+        pytest.skip('TEST_DATABASE_URL is not specified')
+
+    from sqlalchemy import text
+    from autoria_scraper.db import engine
+
+    def run(aw: Awaitable[Any]) -> Any:
+        async def main() -> Any:
+            try:
+                return await aw
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    async def reset() -> None:
+        async with engine.begin() as conn:
+            await conn.execute(text('DROP SCHEMA public CASCADE'))
+            await conn.execute(text('CREATE SCHEMA public'))
+
+    run(reset())
+
+    return run
+
+
+@pytest.fixture
+def serve() -> Callable[[Any], AsyncContextManager[str]]:
+    """Serves an `aiohttp` application on a free local port (within
+     the running event loop), the shared http session is closed on exit.
+
+    :return: Callable[[web.Application], AsyncContextManager[str]] -
+     yields the base url, e.g: `http://127.0.0.1:40000`
+    """
+    from aiohttp import web
+    from autoria_scraper.core.misc import session_manager
+
+    @asynccontextmanager
+    async def serving(app: "web.Application"):
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+
+        try:
+            yield 'http://127.0.0.1:{}'.format(runner.addresses[0][1])
+        finally:
+            await session_manager.close()
+            await runner.cleanup()
+
+    return serving
+
+
+@pytest.fixture
+def catalog_page() -> Callable[..., bytes]:
+    """Catalog page factory.
+
+    :return: Callable[..., bytes] - (page, pages=50, links_per_page=20)
+     -> raw html, links are `http://test/uk/auto_<make>_<model>_<id>.html`
+    """
+    from benchmarks.server import ServerOptions, _catalog
+
+    def build(page: int, pages: int = 50, links_per_page: int = 20) -> bytes:
+        html = _catalog(
+            ServerOptions(pages=pages, links_per_page=links_per_page),
+            'http://test',
+            page
+        )
+
+        return html.replace('<head>', f'<head>{SCRIPT}').replace(
+            '</section>',
+            f'</section>{SCRIPT}'
+        ).encode()
+
+    return build
+
+
+@pytest.fixture
+def direct_page() -> Callable[[int], bytes]:
+    """Direct page factory.
+
+    :return: Callable[[int], bytes] - listing id -> raw html
+    """
+    from benchmarks.server import ServerOptions, _direct
+
+    def build(listing_id: int) -> bytes:
+        html = _direct(ServerOptions(), listing_id)
+
+        return html.replace('<body', f'{SCRIPT}<body', 1).replace(
+            '<div class="price_value">',
+            f'{SCRIPT}<div class="price_value">'
+        ).encode()
+
+    return build
+
+
+@pytest.fixture
+def unavailable_page() -> bytes:
+    from benchmarks.server import _UNAVAILABLE
+
+    return _UNAVAILABLE.replace('<body>', f'<body>{SCRIPT}').encode()
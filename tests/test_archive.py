@@ -0,0 +1,121 @@
+"""Tests of `autoria_scraper.core.misc.archive`."""
+
+
+import asyncio
+
+from autoria_scraper.core.misc.archive import ResponseArchive, post_key
+
+
+def test_record_and_replay(tmp_path):
+    recorder = ResponseArchive('record', str(tmp_path), segment_size=1)
+    key = post_key('http://test/phone', {'b': 2, 'a': 1})
+    pages = {f'http://test/page/{i}': f'page {i}'.encode() * 10
+             for i in range(5)}
+
+    async def record():
+        for url, body in pages.items():
+            await recorder.write('GET', url, body)
+        await recorder.write('POST', key, b'{"phone": "123"}')
+
+    asyncio.run(record())
+    recorder.close()
+
+    # every record is larger than the limit, so segments are rotated
+    assert len(list(tmp_path.glob('segment-*.arc.gz'))) == len(pages) + 1
+    assert recorder.summary()['recorded'] == len(pages) + 1
+
+    replayer = ResponseArchive('replay', str(tmp_path), segment_size=1)
+
+    async def replay():
+        return (
+            [await replayer.read('GET', url) for url in pages],
+            await replayer.read('POST', key),
+            await replayer.read('GET', 'http://test/missing'),
+            # kinds don't share keys
+            await replayer.read('POST', 'http://test/page/0')
+        )
+
+    bodies, phone, missing, wrong_kind = asyncio.run(replay())
+    replayer.close()
+
+    assert bodies == list(pages.values())
+    assert phone == b'{"phone": "123"}'
+    assert missing is None and wrong_kind is None
+    assert replayer.summary() == {
+        'recorded': 0,
+        'replayed': len(pages) + 1,
+        'missing': 2
+    }
+
+
+def test_latest_record_wins_and_truncated_index(tmp_path):
+    recorder = ResponseArchive('record', str(tmp_path), segment_size=1 << 20)
+
+    async def record():
+        await recorder.write('GET', 'http://test/a', b'old')
+        await recorder.write('GET', 'http://test/a', b'new')
+
+    asyncio.run(record())
+    recorder.close()
+
+    # a crash in the middle of an index line
+    with open(tmp_path / 'index.cdx', 'ab') as index:
+        index.write(b'GET 0 12')
+
+    replayer = ResponseArchive('replay', str(tmp_path), segment_size=1 << 20)
+
+    assert asyncio.run(replayer.read('GET', 'http://test/a')) == b'new'
+    replayer.close()
+
+
+def test_off_mode_and_post_key(tmp_path):
+    archive = ResponseArchive('off', str(tmp_path / 'archive'), 1024)
+
+    asyncio.run(archive.write('GET', 'http://test/a', b'body'))
+
+    assert not archive.recording and not archive.replaying
+    assert not (tmp_path / 'archive').exists()
+    # payload order doesn't matter
+    assert post_key('http://test', {'a': 1, 'b': [1, 2]}) == post_key(
+        'http://test', {'b': [1, 2], 'a': 1}
+    ) == 'http://test#{"a":1,"b":[1,2]}'
+
+
+def test_truncated_segment(tmp_path):
+    recorder = ResponseArchive('record', str(tmp_path), segment_size=1 << 20)
+
+    async def record():
+        for url in ('http://test/a', 'http://test/b', 'http://test/c'):
+            await recorder.write('GET', url, url.encode() * 100)
+
+    asyncio.run(record())
+    # records are flushed one by one, so a killed process loses the
+    #  last one at most
+    index = (tmp_path / 'index.cdx').read_text().splitlines()
+    segment = tmp_path / 'segment-00000.arc.gz'
+
+    assert len(index) == 3
+    assert segment.stat().st_size == sum(
+        int(line.split()[3]) for line in index
+    )
+    recorder.close()
+
+    data = segment.read_bytes()
+    _, _, offset, length, _ = index[1].split()
+    offset, length = int(offset), int(length)
+    # the middle record is corrupted, the last one is truncated
+    segment.write_bytes(
+        data[:offset + 10] + b'x' * (length - 10)
+        + data[offset + length:-5]
+    )
+    replayer = ResponseArchive('replay', str(tmp_path), segment_size=1 << 20)
+
+    async def replay():
+        return [
+            await replayer.read('GET', url)
+            for url in ('http://test/a', 'http://test/b', 'http://test/c')
+        ]
+
+    assert asyncio.run(replay()) == [b'http://test/a' * 100, None, None]
+    assert replayer.summary()['missing'] == 2
+    replayer.close()
@@ -0,0 +1,73 @@
+"""Tests of the benchmark harness (`benchmarks`)."""
+
+
+import asyncio
+
+import aiohttp
+
+from benchmarks.__main__ import _Tracer, _percentiles
+from benchmarks.server import (
+    PHONE_PATH,
+    ROOT_PATH,
+    ServerOptions,
+    _UNAVAILABLE,
+    create_app
+)
+
+
+def test_percentiles():
+    latencies = [i / 1000 for i in range(100, 0, -1)]
+
+    assert _percentiles(latencies) == {
+        'p50': 50.0,
+        'p90': 90.0,
+        'p99': 99.0,
+        'max': 100.0
+    }
+    assert _percentiles([0.002]) == dict.fromkeys(
+        ('p50', 'p90', 'p99', 'max'),
+        2.0
+    )
+    assert set(_percentiles([]).values()) == {None}
+
+
+def test_request_kinds():
+    assert _Tracer.kind('GET', ROOT_PATH) == 'catalog'
+    assert _Tracer.kind('GET', '/uk/auto_bmw_x5_1.html') == 'direct'
+    assert _Tracer.kind('POST', PHONE_PATH) == 'phone'
+
+
+def test_stand_in_server(serve):
+    options = ServerOptions(pages=3, links_per_page=2, unavailable_rate=0.5)
+
+    async def main():
+        async with serve(create_app(options)) as base:
+            async with aiohttp.ClientSession(base) as session:
+                async with session.get(ROOT_PATH, params={'page': 2}) as r:
+                    catalog = await r.text()
+
+                direct = []
+
+                for _ in range(2):
+                    for id_ in range(10):
+                        async with session.get(
+                            f'/uk/auto_bmw_x5_{id_}.html'
+                        ) as r:
+                            direct.append(await r.text() == _UNAVAILABLE)
+
+                async with session.post(
+                    PHONE_PATH,
+                    json={'data': [['phoneId', '1000123']]}
+                ) as r:
+                    phone = await r.json()
+
+        return catalog, direct, phone
+
+    catalog, direct, phone = asyncio.run(main())
+
+    assert '2 / 3' in catalog
+    assert catalog.count('m-link-ticket') == 2
+    assert 'auto_mercedes_benz_sprinter_4.html' in catalog
+    # the same listings are unavailable on each request
+    assert direct[:10] == direct[10:] and 0 < sum(direct[:10]) < 10
+    assert phone['additionalParams']['phoneStr'] == '(067) 123 0123'
@@ -0,0 +1,118 @@
+"""Tests of `autoria_scraper.core.misc.cache`."""
+
+
+import os
+import asyncio
+
+from aiohttp import web
+
+from autoria_scraper.core.misc import http
+from autoria_scraper.core.misc.cache import HttpCache
+
+
+def _cache(path, **kwargs):
+    return HttpCache(**{
+        'enabled': True,
+        'path': str(path),
+        'max_size': 1024 * 1024,
+        'catalog_prefix': 'http://test/catalog',
+        'catalog_ttl': 60,
+        'direct_ttl': 0,
+        **kwargs
+    })
+
+
+def test_fresh_and_stale_entries(tmp_path):
+    cache = _cache(tmp_path)
+
+    async def main():
+        await cache.put('http://test/catalog?page=1', b'catalog', 'v1')
+        await cache.put('http://test/direct', b'direct', None, 'yesterday')
+
+        return (
+            await cache.get('http://test/catalog?page=1'),
+            await cache.get('http://test/direct'),
+            await cache.get('http://test/missing')
+        )
+
+    catalog, direct, missing = asyncio.run(main())
+    cache.close()
+
+    assert catalog.body == b'catalog' and catalog.fresh
+    assert catalog.etag == 'v1'
+    assert direct.body == b'direct' and not direct.fresh
+    assert direct.last_modified == 'yesterday'
+    assert missing is None
+    assert cache.summary()['hits'] == cache.summary()['stale'] == 1
+    # the index is persisted
+    reopened = _cache(tmp_path)
+
+    assert asyncio.run(reopened.get('http://test/catalog?page=1')).fresh
+
+    reopened.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    # incompressible bodies of ~400 bytes each
+    bodies = [os.urandom(400) for _ in range(3)]
+    cache = _cache(tmp_path, max_size=1000)
+
+    async def main():
+        await cache.put('http://test/catalog/0', bodies[0])
+        await cache.put('http://test/catalog/1', bodies[1])
+        # the first entry is used recently
+        await cache.get('http://test/catalog/0')
+        await cache.put('http://test/catalog/2', bodies[2])
+
+        return [
+            await cache.get(f'http://test/catalog/{i}') is not None
+            for i in range(3)
+        ]
+
+    assert asyncio.run(main()) == [True, False, True]
+    assert cache.summary()['evicted'] == 1
+
+    cache.close()
+
+
+def test_disabled_cache_is_empty(tmp_path):
+    cache = _cache(tmp_path / 'cache', enabled=False)
+
+    async def main():
+        await cache.put('http://test/catalog', b'body')
+
+        return await cache.get('http://test/catalog')
+
+    assert asyncio.run(main()) is None
+    assert not (tmp_path / 'cache').exists()
+
+
+def test_conditional_get(serve, tmp_path, monkeypatch):
+    requests = []
+
+    async def page(request):
+        requests.append(request.headers.get('If-None-Match'))
+
+        if request.headers.get('If-None-Match') == '"v1"':
+            return web.Response(status=304)
+
+        return web.Response(body=b'<html>v1</html>', headers={'ETag': '"v1"'})
+
+    app = web.Application()
+    app.router.add_get('/direct', page)
+
+    async def main():
+        async with serve(app) as base:
+            monkeypatch.setattr(http, 'http_cache', _cache(
+                tmp_path,
+                catalog_prefix=f'{base}/catalog'
+            ))
+
+            return [await http.fetch_bytes(f'{base}/direct') for _ in range(2)]
+
+    assert asyncio.run(main()) == [b'<html>v1</html>'] * 2
+    # the stale entry is revalidated
+    assert requests == [None, '"v1"']
+    assert http.http_cache.summary()['revalidated'] == 1
+
+    http.http_cache.close()
@@ -0,0 +1,134 @@
+"""Tests of `autoria_scraper.core.scrapers.catalog`."""
+
+
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from autoria_scraper.core.checkpoint import Checkpoint
+from autoria_scraper.core.index import ListingIndex
+from autoria_scraper.core.misc import FetchError
+from autoria_scraper.core.scrapers import CatalogScraper
+
+
+def _app(catalog_page, broken=()):
+    async def page(request):
+        number = int(request.query.get('page', 1))
+
+        if number in broken:
+            raise web.HTTPInternalServerError()
+
+        return web.Response(
+            body=catalog_page(number, pages=5, links_per_page=3),
+            content_type='text/html'
+        )
+
+    app = web.Application()
+    app.router.add_get('/catalog', page)
+
+    return app
+
+
+async def _collect(scraper):
+    return [link async for link in scraper.stream()]
+
+
+def test_failed_page_is_not_completed(serve, catalog_page, tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / 'checkpoint.json'), interval=60)
+
+    async def main():
+        async with serve(_app(catalog_page, broken={2})) as base:
+            scraper = CatalogScraper(
+                f'{base}/catalog',
+                batch_size=2,
+                pages_limit=3,
+                checkpoint=checkpoint
+            )
+
+            with pytest.raises(FetchError):
+                await scraper.extract_links(scraper.page_url(2))
+
+            return await _collect(scraper)
+
+    links = asyncio.run(main())
+
+    assert len(links) == 6
+    assert checkpoint.is_completed(1) and checkpoint.is_completed(3)
+    assert not checkpoint.is_completed(2)
+    assert checkpoint.has_failures()
+
+
+def test_failed_page_is_crawled_on_resume(serve, catalog_page, tmp_path):
+    path = str(tmp_path / 'checkpoint.json')
+
+    async def main(broken):
+        checkpoint = Checkpoint(path, interval=60)
+        checkpoint.load()
+
+        async with serve(_app(catalog_page, broken=broken)) as base:
+            links = await _collect(CatalogScraper(
+                f'{base}/catalog',
+                batch_size=2,
+                pages_limit=3,
+                checkpoint=checkpoint
+            ))
+
+        for link in links:
+            checkpoint.finish(link)
+
+        await checkpoint.save()
+
+        return links, checkpoint
+
+    first, _ = asyncio.run(main(broken={2}))
+    second, checkpoint = asyncio.run(main(broken=()))
+
+    assert len(first) == 6 and len(second) == 3
+    assert not set(first) & set(second)
+    assert not checkpoint.has_failures()
+
+
+def test_incremental_streak_counts_fetched_pages(serve, catalog_page):
+    index = ListingIndex()
+    # listings of the first four pages are known
+    index.update(
+        f'http://test/uk/auto_{i}.html' for i in range(3, 15)
+    )
+
+    async def main(broken):
+        async with serve(_app(catalog_page, broken=broken)) as base:
+            scraper = CatalogScraper(
+                f'{base}/catalog',
+                batch_size=2,
+                pages_limit=5,
+                index=index,
+                incremental_pages=2
+            )
+            await _collect(scraper)
+
+            return scraper.discovered
+
+    # pages 1 and 2 end the crawl
+    assert len(asyncio.run(main(broken=()))) == 6
+    # failed pages 2 and 3 are skipped, pages 1 and 4 end the crawl
+    assert len(asyncio.run(main(broken={2, 3}))) == 6
+
+
+def test_shards_split_pages(serve, catalog_page):
+    async def main(shard, shards):
+        async with serve(_app(catalog_page)) as base:
+            return await _collect(CatalogScraper(
+                f'{base}/catalog',
+                batch_size=2,
+                shard=shard,
+                shards=shards
+            ))
+
+    everything = asyncio.run(main(0, 1))
+    shards = [asyncio.run(main(shard, 3)) for shard in range(3)]
+
+    assert len(everything) == 15
+    # pages 1 and 4, 2 and 5, 3
+    assert [len(links) for links in shards] == [6, 6, 3]
+    assert sorted(sum(shards, [])) == sorted(everything)
@@ -0,0 +1,73 @@
+"""Tests of `autoria_scraper.core.checkpoint`."""
+
+
+import json
+import asyncio
+
+from autoria_scraper.core.checkpoint import Checkpoint, _to_ranges
+
+
+def test_to_ranges():
+    assert _to_ranges([]) == []
+    assert _to_ranges([7, 1, 3, 2]) == [[1, 3], [7, 7]]
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / 'checkpoint.json')
+    checkpoint = Checkpoint(path, interval=60)
+
+    for page in (1, 2, 3):
+        checkpoint.complete_page(page)
+
+    checkpoint.fail_page(4)
+    checkpoint.add_pending('a')
+    checkpoint.add_pending('b')
+    checkpoint.add_pending('c')
+    checkpoint.finish('a')
+    checkpoint.fail('b')
+
+    assert checkpoint.has_failures() and checkpoint.has_pending()
+
+    asyncio.run(checkpoint.save())
+
+    with open(path) as file:
+        state = json.load(file)
+
+    assert state['completed_pages'] == [[1, 3]]
+    assert state['failed_pages'] == [[4, 4]]
+    assert state['pending'] == ['c'] and state['failed'] == ['b']
+
+    restored = Checkpoint(path, interval=60)
+
+    assert restored.load()
+    assert [restored.is_completed(page) for page in (1, 3, 4)] == [
+        True, True, False
+    ]
+    assert sorted(restored.restored()) == ['b', 'c']
+    assert restored.restored() == []
+    assert restored.was_failed('b') and not restored.was_failed('c')
+
+    restored.clear()
+    restored.clear()
+
+    assert not Checkpoint(path, interval=60).load()
+
+
+def test_completed_page_is_not_failed(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / 'checkpoint.json'), interval=60)
+    checkpoint.fail_page(2)
+
+    assert checkpoint.has_failures()
+
+    checkpoint.complete_page(2)
+
+    assert not checkpoint.has_failures()
+
+
+def test_unknown_checkpoint_is_ignored(tmp_path):
+    path = tmp_path / 'checkpoint.json'
+
+    for content in ('{', json.dumps({'version': 0})):
+        path.write_text(content)
+
+        assert not Checkpoint(str(path), interval=60).load()
@@ -0,0 +1,87 @@
+"""Tests of `autoria_scraper.core.daemon`."""
+
+
+import json
+import asyncio
+
+from autoria_scraper.core.daemon import Daemon
+
+
+def test_sweeps_until_stopped(tmp_path):
+    path = tmp_path / 'status.json'
+    results = iter([{'saved': 1}, ValueError('broken page'), {'saved': 2}])
+    states = []
+
+    async def sweep():
+        states.append(json.loads(path.read_text())['state'])
+        result = next(results)
+
+        if isinstance(result, Exception):
+            raise result
+
+        if result['saved'] == 2:
+            asyncio.get_running_loop().call_soon(daemon.stop)
+
+        return result
+
+    daemon = Daemon(sweep, interval=0.01, jitter=0, status_path=str(path))
+    asyncio.run(daemon.run())
+    status = json.loads(path.read_text())
+
+    assert states == ['sweeping'] * 3
+    # the failed sweep doesn't stop the daemon
+    assert status['state'] == 'stopped'
+    assert status['sweeps'] == 3 and status['failed_sweeps'] == 1
+    assert status['last_sweep']['result'] == {'saved': 2}
+    assert status['next_sweep_at'] is None
+
+
+def test_stop_cancels_running_sweep():
+    cancelled = []
+
+    async def sweep():
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    daemon = Daemon(sweep, interval=60, jitter=0)
+
+    async def main():
+        task = asyncio.create_task(daemon.run())
+        await asyncio.sleep(0.01)
+        daemon.stop()
+        await asyncio.wait_for(task, timeout=5)
+
+    asyncio.run(main())
+    status = daemon.status()
+
+    assert cancelled == [1]
+    assert status['state'] == 'stopped' and status['sweeps'] == 1
+    assert status['last_sweep']['error'] == 'cancelled'
+
+
+def test_stop_while_idle():
+    sweeps = []
+
+    async def sweep():
+        sweeps.append(1)
+
+        return {}
+
+    daemon = Daemon(sweep, interval=60, jitter=0)
+
+    async def main():
+        task = asyncio.create_task(daemon.run())
+        await asyncio.sleep(0.01)
+        idle = daemon.status()
+        daemon.stop()
+        await asyncio.wait_for(task, timeout=5)
+
+        return idle
+
+    idle = asyncio.run(main())
+
+    assert idle['state'] == 'idle' and idle['next_sweep_at'] is not None
+    assert sweeps == [1] and daemon.status()['state'] == 'stopped'
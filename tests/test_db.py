@@ -0,0 +1,138 @@
+"""Tests of database helpers (`autoria_scraper.db`), Postgres only."""
+
+
+import asyncio
+
+from sqlalchemy import func, select, text
+
+from autoria_scraper.db import (
+    SaveResult,
+    engine,
+    init_db,
+    iter_listings,
+    iter_urls,
+    save_checked,
+    save_multiple
+)
+from autoria_scraper.db.models import CarChange
+from autoria_scraper.db.migrations import SCHEMA_VERSION
+
+
+def _car(url, price_usd=1000, content_hash=1):
+    return {
+        'url': url,
+        'title': 'bmw x5',
+        'price_usd': price_usd,
+        'odometer': 100,
+        'username': 'user',
+        'phone_number': None,
+        'image_url': None,
+        'images_count': 0,
+        'car_number': None,
+        'car_vin': None,
+        'content_hash': content_hash
+    }
+
+
+async def _changes():
+    async with engine.begin() as conn:
+        return list(await conn.execute(
+            select(CarChange.url, CarChange.price_usd)
+            .order_by(CarChange.id)
+        ))
+
+
+def test_concurrent_init_db(db):
+    async def main():
+        for _ in range(5):
+            async with engine.begin() as conn:
+                await conn.execute(text('DROP SCHEMA public CASCADE'))
+                await conn.execute(text('CREATE SCHEMA public'))
+            # workers started at once create the schema one by one
+            await asyncio.gather(*(init_db() for _ in range(4)))
+
+        async with engine.begin() as conn:
+            return list(await conn.scalars(text(
+                'SELECT version FROM schema_version ORDER BY version'
+            )))
+
+    assert db(main()) == list(range(1, SCHEMA_VERSION + 1))
+
+
+def test_save_multiple_upserts(db):
+    async def main():
+        await init_db()
+
+        return (
+            # duplicates within the batch, the last one wins
+            await save_multiple([_car('a', 1), _car('b'), _car('a', 2)]),
+            # `b` has the same content
+            await save_multiple([_car('a', 3, 2), _car('b'), _car('c')]),
+            await _changes(),
+            sorted([row async for row in iter_listings()]),
+            sorted([url async for url in iter_urls()])
+        )
+
+    first, second, changes, listings, urls = db(main())
+
+    assert first == SaveResult(inserted=2)
+    assert second == SaveResult(inserted=1, updated=1, unchanged=1)
+    assert changes == [('a', 2), ('b', 1000), ('a', 3), ('c', 1000)]
+    assert [(url, content_hash) for url, content_hash, _ in listings] == [
+        ('a', 2), ('b', 1), ('c', 1)
+    ]
+    assert urls == ['a', 'b', 'c']
+
+
+def test_records_without_hash_are_rewritten(db):
+    with_phone = {**_car('a'), 'phone_number': '380001'}
+
+    async def main():
+        await init_db()
+
+        return (
+            await save_multiple([_car('a', content_hash=None)]),
+            # the phone number wasn't obtained again
+            await save_multiple([_car('a', content_hash=None)]),
+            await save_multiple([with_phone]),
+            await save_multiple([_car('a')])
+        )
+
+    assert db(main()) == (
+        SaveResult(inserted=1),
+        SaveResult(updated=1),
+        SaveResult(updated=1),
+        SaveResult(unchanged=1)
+    )
+
+
+def test_save_multiple_splits_large_batches(db):
+    # more records than a single statement takes
+    cars = [_car(f'url-{i}') for i in range(5000)]
+
+    async def main():
+        await init_db()
+        result = await save_multiple(cars)
+
+        async with engine.begin() as conn:
+            return result, await conn.scalar(
+                select(func.count()).select_from(CarChange)
+            )
+
+    assert db(main()) == (SaveResult(inserted=5000), 5000)
+
+
+def test_save_checked(db):
+    async def main():
+        await init_db()
+        await save_multiple([_car('a'), _car('b')])
+        await save_checked(['a'])
+
+        async with engine.begin() as conn:
+            return dict(list(await conn.execute(text(
+                'SELECT url, datetime_checked FROM cars'
+            ))))
+
+    checked = db(main())
+
+    assert checked['a'] > checked['b']
@@ -0,0 +1,66 @@
+"""Tests of `autoria_scraper.core.scrapers.direct`."""
+
+
+import asyncio
+
+from aiohttp import web
+
+from benchmarks.server import (
+    OPTIONS,
+    PHONE_PATH,
+    ServerOptions,
+    _direct,
+    _phone_handler
+)
+from autoria_scraper.core.index import ListingIndex
+from autoria_scraper.core.scrapers import DirectScraper
+
+
+def _app(phone_available):
+    async def direct(request):
+        return web.Response(
+            text=_direct(ServerOptions(), int(request.match_info['id'])),
+            content_type='text/html'
+        )
+
+    async def phone(request):
+        if not phone_available[0]:
+            raise web.HTTPServiceUnavailable()
+
+        return await _phone_handler(request)
+
+    app = web.Application()
+    app[OPTIONS] = ServerOptions()
+    app.router.add_get(r'/uk/auto_{name:[a-z0-9_]+}_{id:\d+}.html', direct)
+    app.router.add_post(PHONE_PATH, phone)
+
+    return app
+
+
+def test_listing_without_phone_is_rechecked(serve):
+    index = ListingIndex()
+    phone_available = [False]
+
+    async def main():
+        async with serve(_app(phone_available)) as base:
+            url = f'{base}/uk/auto_bmw_x5_12.html'
+            scraper = DirectScraper(f'{base}{PHONE_PATH}', 1, index=index)
+            cars = []
+
+            for available in (False, True, True):
+                phone_available[0] = available
+                car = await scraper.extract(url)
+                cars.append(car)
+                # the same as the index warmed up with stored listings
+                if car is not None:
+                    index.add(url, car.content_hash)
+
+            return cars
+
+    failed, resolved, unchanged = asyncio.run(main())
+
+    assert failed.phone_number is None and failed.content_hash is None
+    # the content is the same, but the phone number is requested again
+    assert resolved.phone_number is not None
+    assert resolved.content_hash is not None
+    assert unchanged is None
@@ -0,0 +1,114 @@
+"""Tests of coordinator/worker mode (`autoria_scraper.core.distributed`),
+ Postgres only.
+"""
+
+
+import asyncio
+
+from aiohttp import web
+
+from benchmarks.server import PHONE_PATH, ROOT_PATH, ServerOptions, create_app
+from autoria_scraper.db import init_db
+from autoria_scraper.db.queue import (
+    current_crawl,
+    enqueue_tasks,
+    queue_stats,
+    start_crawl,
+    update_crawl
+)
+from autoria_scraper.core.distributed import Coordinator, Worker
+from autoria_scraper.core.scrapers import CatalogScraper, DirectScraper
+
+
+def _worker(base, save, wait_timeout=60):
+    return Worker(
+        worker_id='w1',
+        catalog_scraper=CatalogScraper(f'{base}/uk/car/used/', 1),
+        direct_scraper=DirectScraper(f'{base}{PHONE_PATH}', 1),
+        save=save,
+        claim_size=10,
+        lease_seconds=60,
+        max_attempts=1,
+        poll_interval=0.01,
+        report_interval=60,
+        wait_timeout=wait_timeout
+    )
+
+
+def test_worker_fails_tasks_not_fetched_or_saved(db, serve):
+    app = create_app(ServerOptions(unavailable_rate=0))
+
+    async def broken(request):
+        raise web.HTTPInternalServerError()
+
+    async def missing(request):
+        raise web.HTTPNotFound()
+
+    app.router.add_get('/broken.html', broken)
+    app.router.add_get('/missing.html', missing)
+    saved = []
+
+    async def save(entities):
+        saved.extend(entities)
+
+        return False
+
+    async def main():
+        await init_db()
+
+        async with serve(app) as base:
+            crawl_id = await start_crawl()
+            await enqueue_tasks('direct', [
+                f'{base}/uk/auto_bmw_x5_1.html',
+                f'{base}/uk/auto_audi_a6_2.html',
+                f'{base}/broken.html',
+                f'{base}/missing.html'
+            ])
+            await update_crawl(crawl_id, 'running')
+            await _worker(base, save).run()
+
+        return await queue_stats()
+
+    stats = db(main())
+
+    assert len(saved) == 2
+    # not fetched and not saved tasks are failed, missing pages are done
+    assert stats == {('direct', 'done'): 1, ('direct', 'failed'): 3}
+
+
+def test_worker_waits_for_the_crawl(db, serve):
+    app = create_app(ServerOptions(pages=2, links_per_page=3,
+                                   unavailable_rate=0))
+    saved = []
+
+    async def save(entities):
+        saved.extend(entities)
+
+        return True
+
+    async def main():
+        await init_db()
+
+        async with serve(app) as base:
+            # nothing to wait for
+            await _worker(base, save, wait_timeout=0).run()
+            # the previous crawl is over
+            await update_crawl(await start_crawl(), 'finished')
+            worker = asyncio.create_task(_worker(base, save).run())
+            await asyncio.sleep(0.2)
+            waiting = not worker.done()
+
+            await Coordinator(
+                CatalogScraper(f'{base}{ROOT_PATH}', 1),
+                max_attempts=1,
+                report_interval=0.05
+            ).run()
+            await asyncio.wait_for(worker, timeout=10)
+
+        return waiting, await queue_stats(), await current_crawl()
+
+    waiting, stats, crawl = db(main())
+
+    assert waiting and len(saved) == 6
+    assert stats == {('catalog', 'done'): 2, ('direct', 'done'): 6}
+    assert crawl.id == 2 and crawl.status == 'finished'
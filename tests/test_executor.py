@@ -0,0 +1,35 @@
+"""Tests of `autoria_scraper.core.misc.executor`."""
+
+
+import os
+import asyncio
+
+from autoria_scraper.core.extractors import tree
+from autoria_scraper.core.misc.executor import ParseExecutor
+
+
+def test_parsing_in_worker_processes(catalog_page):
+    markup = catalog_page(1)
+    executor = ParseExecutor(workers=1)
+
+    async def main():
+        return await asyncio.gather(
+            executor.run(tree.extract_links, markup),
+            executor.run(os.getpid)
+        )
+
+    try:
+        links, pid = asyncio.run(main())
+    finally:
+        executor.close()
+
+    assert links == tree.extract_links(markup)
+    assert pid != os.getpid()
+
+
+def test_parsing_in_the_event_loop_thread():
+    executor = ParseExecutor(workers=0)
+
+    assert asyncio.run(executor.run(os.getpid)) == os.getpid()
+
+    executor.close()
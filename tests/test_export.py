@@ -0,0 +1,113 @@
+"""Tests of `autoria_scraper.export`, Postgres only."""
+
+
+import os
+import csv
+import json
+from datetime import datetime
+
+from sqlalchemy import text
+
+from autoria_scraper.db import engine, init_db, save_multiple
+from autoria_scraper.export import COLUMNS, Exporter
+
+
+def _car(url):
+    return {
+        'url': url,
+        'title': 'bmw x5',
+        'price_usd': 1000,
+        'odometer': 100,
+        'username': 'user',
+        'phone_number': None,
+        'image_url': None,
+        'images_count': 0,
+        'car_number': None,
+        'car_vin': None,
+        'content_hash': 1
+    }
+
+
+async def _insert(found):
+    """Inserts cars found at the specified datetimes.
+
+    :param found: Dict[str, datetime] - url -> `datetime_found`
+    """
+    await save_multiple([_car(url) for url in found])
+
+    async with engine.begin() as conn:
+        for url, datetime_found in found.items():
+            await conn.execute(
+                text('UPDATE cars SET datetime_found = :found '
+                     'WHERE url = :url'),
+                {'found': datetime_found, 'url': url}
+            )
+
+
+def _read(path):
+    partitions = {}
+
+    for directory in sorted(os.listdir(path)):
+        if not directory.startswith('datetime_found='):
+            continue
+
+        for name in sorted(os.listdir(os.path.join(path, directory))):
+            with open(os.path.join(path, directory, name)) as file:
+                rows = list(csv.reader(file))
+
+            assert tuple(rows[0]) == COLUMNS
+            partitions.setdefault(directory, []).append(
+                [row[1] for row in rows[1:]]
+            )
+
+    return partitions
+
+
+def test_incremental_export(db, tmp_path):
+    exporter = Exporter(str(tmp_path), 'csv', batch_size=2, lag=0)
+
+    async def main():
+        await init_db()
+        await _insert({
+            'http://test/a': datetime(2025, 6, 27, 10),
+            'http://test/b': datetime(2025, 6, 28, 9),
+            # the partition spans two batches
+            'http://test/c': datetime(2025, 6, 28, 11),
+            'http://test/d': datetime(2025, 6, 28, 12),
+            # found after the upper bound
+            'http://test/e': datetime(2999, 1, 1)
+        })
+        first = await exporter.run()
+        await save_multiple([_car('http://test/f')])
+
+        return first, await exporter.run()
+
+    first, second = db(main())
+    partitions = _read(tmp_path)
+
+    assert (first, second) == (4, 1)
+    assert partitions.pop('datetime_found=2025-06-27') == [['http://test/a']]
+    assert partitions.pop('datetime_found=2025-06-28') == [
+        ['http://test/b', 'http://test/c', 'http://test/d']
+    ]
+    # the second run exports new rows only
+    assert list(partitions.values()) == [[['http://test/f']]]
+    assert not list(tmp_path.glob('*/*.tmp'))
+
+    with open(tmp_path / '_watermark.json') as file:
+        watermark = json.load(file)
+
+    assert watermark['rows'] == 1
+    assert datetime.fromisoformat(watermark['until']) < datetime(2999, 1, 1)
+
+
+def test_nothing_to_export(db, tmp_path):
+    exporter = Exporter(str(tmp_path), 'csv', batch_size=10, lag=0)
+
+    async def main():
+        await init_db()
+
+        return await exporter.run(), await exporter.run()
+
+    assert db(main()) == (0, 0)
+    assert os.listdir(tmp_path) == ['_watermark.json']
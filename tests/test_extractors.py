@@ -0,0 +1,122 @@
+"""Tests of extraction engines (`autoria_scraper.core.extractors`)."""
+
+
+import asyncio
+
+import pytest
+
+from autoria_scraper.core.extractors import engine, tree
+from autoria_scraper.core.misc import metrics
+from autoria_scraper.core.misc.extraction import Extractor
+
+
+def test_engines_parity(catalog_page, direct_page, unavailable_page):
+    soup = engine('bs4')
+
+    for markup in (catalog_page(1), catalog_page(50)):
+        assert tree.extract_links(markup) == soup.extract_links(markup)
+        assert tree.extract_pages_count(markup) == soup.extract_pages_count(
+            markup
+        ) == 50
+
+    for markup in (direct_page(1), direct_page(70_001), unavailable_page):
+        assert tree.extract_car(markup, 'url') == soup.extract_car(
+            markup,
+            'url'
+        )
+
+    assert tree.extract_car(unavailable_page, 'url') is None
+
+
+def test_fallback_to_reference_engine(monkeypatch, catalog_page):
+    def broken(markup):
+        raise ValueError('broken')
+
+    def count():
+        return metrics.counters().get(
+            'autoria_extraction_fallbacks_total{func="extract_links"}',
+            0
+        )
+
+    monkeypatch.setattr(tree, 'extract_links', broken)
+    markup = catalog_page(1)
+    fallbacks = count()
+
+    assert asyncio.run(
+        Extractor('lxml', parity_rate=1).run('extract_links', markup)
+    ) == engine('bs4').extract_links(markup)
+    assert count() == fallbacks + 1
+
+
+def _stream(func, chunks, *args):
+    extractor = tree.StreamExtractor(func, *args)
+
+    for chunk in chunks:
+        if extractor.feed(chunk):
+            break
+
+    return extractor.close()
+
+
+def _result(func, *args):
+    try:
+        return repr(func(*args))
+    except Exception as e:
+        return repr(e)
+
+
+@pytest.mark.parametrize('func', ('extract_links', 'extract_pages_count'))
+def test_stream_catalog_every_split(func, catalog_page):
+    markup = catalog_page(3)
+    expected = repr(getattr(tree, func)(markup))
+
+    for offset in range(1, len(markup)):
+        assert _result(
+            _stream,
+            func,
+            (markup[:offset], markup[offset:])
+        ) == expected, offset
+
+
+def test_stream_direct_every_split(direct_page):
+    markup = direct_page(12345)
+    expected = repr(tree.extract_car(markup, 'url'))
+
+    for offset in range(1, len(markup)):
+        assert _result(
+            _stream,
+            'extract_car',
+            (markup[:offset], markup[offset:]),
+            'url'
+        ) == expected, offset
+
+
+def test_stream_byte_by_byte(catalog_page, direct_page, unavailable_page):
+    markup = catalog_page(1)
+    chunks = [markup[i:i + 1] for i in range(len(markup))]
+
+    assert _stream('extract_links', chunks) == tree.extract_links(markup)
+
+    for markup in (direct_page(7), unavailable_page):
+        chunks = [markup[i:i + 1] for i in range(len(markup))]
+
+        assert repr(_stream('extract_car', chunks, 'url')) == repr(
+            tree.extract_car(markup, 'url')
+        )
+
+
+def test_stream_aborts_once_found(catalog_page):
+    # links are followed by the pagination, the padding isn't needed
+    markup = catalog_page(2) + b'<!--' + b'x' * 100_000 + b'-->'
+    extractor = tree.StreamExtractor('extract_links')
+
+    assert extractor.feed(markup[:len(markup) - 100_000])
+    assert extractor.close() == tree.extract_links(markup)
+
+
+def test_stream_error_is_raised_by_close():
+    extractor = tree.StreamExtractor('extract_pages_count')
+    extractor.feed(b'<html><body><div id="pagination"></div></body></html>')
+
+    with pytest.raises(Exception):
+        extractor.close()
@@ -0,0 +1,145 @@
+"""Tests of `autoria_scraper.core.frontier`."""
+
+
+import time
+import asyncio
+
+from autoria_scraper.core.frontier import Frontier
+from autoria_scraper.core.index import ListingIndex
+
+
+def _drain(frontier):
+    async def main():
+        await frontier.close()
+
+        return [url async for url in _urls(frontier)]
+
+    return asyncio.run(main())
+
+
+async def _urls(frontier):
+    while (url := await frontier.get()) is not None:
+        await frontier.done()
+
+        yield url
+
+
+def test_priority_classes():
+    index = ListingIndex()
+    now = time.time()
+    index.add('stale', checked_at=now - 300)
+    index.add('fresh', checked_at=now - 100)
+    index.add('recent', checked_at=now - 10)
+    frontier = Frontier(capacity=10, index=index, recheck_after=60)
+
+    async def main():
+        return [
+            await frontier.put(url, failed=url == 'failed')
+            for url in ('fresh', 'failed', 'recent', 'new', 'stale', 'new2')
+        ]
+
+    assert asyncio.run(main()) == [True, True, False, True, True, True]
+    assert _drain(frontier) == ['new', 'new2', 'stale', 'fresh', 'failed']
+
+
+def test_retries_are_ordered_by_attempts():
+    frontier = Frontier(capacity=10, retries=2)
+
+    async def main():
+        for url in ('a', 'b', 'c'):
+            await frontier.put(url)
+
+        handed_out = []
+
+        while len(handed_out) < 6:
+            url = await frontier.get()
+            handed_out.append(url)
+            # `a` fails each time, `b` once
+            if handed_out.count(url) == 1 and url != 'c' or url == 'a':
+                frontier.retry(url)
+
+            await frontier.done()
+
+        return handed_out
+
+    assert asyncio.run(main()) == ['a', 'b', 'c', 'a', 'b', 'a']
+    assert not frontier.retry('a')
+
+
+def test_retries_are_deferred_while_full():
+    frontier = Frontier(capacity=1)
+
+    async def main():
+        await frontier.put('a')
+        assert await frontier.get() == 'a'
+        await frontier.put('b')
+
+        assert frontier.retry('a')
+        # the capacity holds, the retry waits for room
+        assert frontier.qsize() == 2 and len(frontier._heap) == 1
+        await frontier.done()
+
+        put = asyncio.create_task(frontier.put('c'))
+        await asyncio.sleep(0)
+        assert await frontier.get() == 'b'
+        await frontier.done()
+        # the deferred retry takes the room
+        await asyncio.sleep(0)
+        assert not put.done()
+        assert await frontier.get() == 'a'
+        await frontier.done()
+
+        assert await put
+
+    asyncio.run(main())
+
+    assert _drain(frontier) == ['c']
+
+
+def test_request_budget():
+    frontier = Frontier(capacity=10, request_budget=2)
+
+    async def main():
+        for url in ('a', 'b', 'c'):
+            await frontier.put(url)
+
+        handed_out = [await frontier.get(), await frontier.get()]
+        # unserved links aren't queued anymore, retries are refused
+        assert frontier.exhausted
+        assert not await frontier.put('d')
+        assert not frontier.retry('a')
+        await frontier.done()
+        await frontier.done()
+
+        return handed_out, await frontier.get()
+
+    assert asyncio.run(main()) == (['a', 'b'], None)
+
+
+def test_time_budget():
+    frontier = Frontier(capacity=10, time_budget=0)
+
+    async def main():
+        return await frontier.put('a'), await frontier.get()
+
+    assert asyncio.run(main()) == (False, None)
+
+
+def test_consumers_wait_for_links_in_flight():
+    frontier = Frontier(capacity=10)
+
+    async def main():
+        await frontier.put('a')
+        url = await frontier.get()
+        await frontier.close()
+        # the link in flight may be retried, so the consumer waits
+        waiting = asyncio.create_task(frontier.get())
+        await asyncio.sleep(0)
+        assert not waiting.done()
+
+        frontier.retry(url)
+        await frontier.done()
+
+        return await waiting
+
+    assert asyncio.run(main()) == 'a'
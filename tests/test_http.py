@@ -0,0 +1,123 @@
+"""Tests of `aiohttp` wrappers (`autoria_scraper.core.misc.http`)."""
+
+
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from autoria_scraper.core.misc import (
+    FetchError,
+    fetch_bytes,
+    metrics,
+    session_manager
+)
+
+
+def _app(**routes):
+    app = web.Application()
+
+    for path, handler in routes.items():
+        app.router.add_get(f'/{path}', handler)
+
+    return app
+
+
+async def _ok(request):
+    return web.Response(body=b'<html>ok</html>')
+
+
+async def _missing(request):
+    raise web.HTTPNotFound()
+
+
+async def _broken(request):
+    raise web.HTTPInternalServerError()
+
+
+def test_session_is_shared_and_connections_are_reused(serve):
+    peers = set()
+
+    async def peer(request):
+        peers.add(request.transport.get_extra_info('peername'))
+
+        return web.Response(body=b'<html>ok</html>')
+
+    async def main():
+        async with serve(_app(peer=peer)) as base:
+            session = session_manager.get()
+
+            for _ in range(5):
+                assert await fetch_bytes(f'{base}/peer') == b'<html>ok</html>'
+
+            assert session_manager.get() is session
+            await session_manager.close()
+
+            assert session.closed and session_manager.get() is not session
+
+    asyncio.run(main())
+
+    # keep-alive connection of the shared session
+    assert len(peers) == 1
+
+
+def test_fetch_bytes_missing_and_failed_pages_differ(serve):
+    async def main():
+        app = _app(ok=_ok, missing=_missing, broken=_broken)
+
+        async with serve(app) as base:
+            assert await fetch_bytes(f'{base}/ok') == b'<html>ok</html>'
+            assert await fetch_bytes(f'{base}/missing') is None
+
+            with pytest.raises(FetchError):
+                await fetch_bytes(f'{base}/broken')
+
+    asyncio.run(main())
+
+
+def test_direct_page_not_fetched_is_raised(serve, unavailable_page):
+    from autoria_scraper.core.scrapers import DirectScraper
+
+    async def unavailable(request):
+        return web.Response(body=unavailable_page, content_type='text/html')
+
+    def count(result):
+        return metrics.counters().get(
+            f'autoria_direct_listings_total{{result="{result}"}}',
+            0
+        )
+
+    async def main():
+        app = _app(unavailable=unavailable, broken=_broken)
+
+        async with serve(app) as base:
+            scraper = DirectScraper(phone_url=f'{base}/phone', batch_size=1)
+            not_fetched = count('not_fetched')
+
+            with pytest.raises(FetchError):
+                await scraper.extract_listing(f'{base}/broken')
+
+            assert count('not_fetched') == not_fetched + 1
+            assert await scraper.extract_listing(f'{base}/unavailable') is None
+
+    asyncio.run(main())
+
+
+def test_throttled_request_is_retried(serve):
+    requests = 0
+
+    async def throttled(request):
+        nonlocal requests
+        requests += 1
+
+        if requests == 1:
+            raise web.HTTPTooManyRequests(headers={'Retry-After': '0'})
+
+        return web.Response(body=b'<html>ok</html>')
+
+    async def main():
+        async with serve(_app(throttled=throttled)) as base:
+            return await fetch_bytes(f'{base}/throttled')
+
+    assert asyncio.run(main()) == b'<html>ok</html>'
+    assert requests == 2
@@ -0,0 +1,109 @@
+"""Tests of `autoria_scraper.core.ids`."""
+
+
+import random
+
+import pytest
+
+from autoria_scraper.core.ids import IdMap, IdSet, ListingSet, listing_id
+
+
+# low and high halves of adjacent containers
+_BOUNDARY = (0, 1, 0xFFFE, 0xFFFF, 0x10000, 0x10001, 0x1FFFF, 0x20000)
+
+
+def test_listing_id():
+    assert listing_id(
+        'https://auto.ria.com/uk/auto_mercedes_benz_sprinter_38472224.html'
+    ) == 38472224
+    assert listing_id('https://auto.ria.com/uk/newauto/') is None
+
+
+def test_add_across_containers():
+    ids = IdSet()
+
+    assert [ids.add(value) for value in _BOUNDARY] == [True] * 8
+    assert not any(ids.add(value) for value in _BOUNDARY)
+    assert list(ids) == list(_BOUNDARY) and len(ids) == 8
+    assert 0x10002 not in ids and 0x2FFFF not in ids
+
+
+@pytest.mark.parametrize('threshold', (4096, 8))
+@pytest.mark.parametrize('batch', (1, 20, 5000))
+def test_update_matches_set(monkeypatch, threshold, batch):
+    # a low threshold turns containers into bitmaps along the way
+    monkeypatch.setattr(IdSet, '_BITMAP_THRESHOLD', threshold)
+    rng = random.Random(batch)
+    values = [
+        *_BOUNDARY,
+        *(rng.randrange(0x30000) for _ in range(20_000))
+    ]
+    ids, expected = IdSet(), set()
+
+    for i in range(0, len(values), batch):
+        # batches overlap with already stored ids
+        chunk = values[i:i + batch] + values[max(0, i - 3):i]
+        ids.update(chunk)
+        expected.update(chunk)
+
+        assert len(ids) == len(expected)
+
+    assert list(ids) == sorted(expected)
+    assert all(value in ids for value in expected)
+    assert sum(value in ids for value in range(0x30000)) == len(expected)
+
+
+def test_update_merges_small_batches_into_large_containers():
+    ids = IdSet(range(0, 0x20000, 64))
+
+    ids.update([0x1FFFF, 0, 5, 65, 0x10000, 0x10001, 0x1FFFF, 0x20000])
+
+    assert list(ids) == sorted({
+        *range(0, 0x20000, 64), 0x1FFFF, 5, 65, 0x10001, 0x20000
+    })
+    assert len(ids) == 2048 + 5
+
+
+def test_bitmap_containers(monkeypatch):
+    monkeypatch.setattr(IdSet, '_BITMAP_THRESHOLD', 4)
+    ids = IdSet(range(0xFFFA, 0x10006))
+
+    assert [type(chunk) for chunk in ids._chunks.values()] == [
+        bytearray, bytearray
+    ]
+    assert not ids.add(0xFFFF) and ids.add(0x10006)
+    assert list(ids.difference([0xFFF9, 0xFFFA, 0x10007])) == [
+        0xFFF9, 0x10007
+    ]
+    assert len(ids) == 13
+
+
+def test_id_map():
+    ids = IdMap()
+
+    for value in _BOUNDARY:
+        ids.set(value, value - 1)
+
+    ids.set(0x10000, None)
+    ids.update([0x10000, 0x10002])
+
+    assert not ids.add(0xFFFF) and ids.add(0x30000)
+    assert list(ids) == sorted({*_BOUNDARY, 0x10002, 0x30000})
+    assert [ids.get(value) for value in (0, 0xFFFF, 0x10000, 0x10001)] == [
+        -1, 0xFFFE, None, 0x10000
+    ]
+    assert ids.get(0x10002) is None and ids.get(0x40000) is None
+    assert len(ids) == 10
+
+
+def test_listing_set_merge():
+    first, second = ListingSet(), ListingSet()
+    first.update(['http://test/uk/auto_a_1.html', 'http://test/other'])
+    second.add('http://test/uk/auto_b_65536.html')
+    second.add('http://test/uk/auto_a_1.html')
+
+    first.merge(second)
+
+    assert len(first) == 3
+    assert 'http://test/uk/auto_c_65536.html' in first
+    assert 'http://test/other' in first
@@ -0,0 +1,57 @@
+"""Tests of `autoria_scraper.core.index`."""
+
+
+from autoria_scraper.core.index import ListingIndex
+
+
+def test_known_listings():
+    index = ListingIndex()
+    index.add('http://test/uk/auto_a_1.html', 10)
+    index.update([
+        'http://test/uk/auto_a_1.html',
+        'http://test/uk/auto_b_70000.html',
+        'http://test/without-id'
+    ])
+
+    assert len(index) == 3
+    # keyed by listing id, the slug may change
+    assert 'http://test/uk/auto_renamed_70000.html' in index
+    assert 'http://test/without-id' in index
+    assert 'http://test/uk/auto_a_2.html' not in index
+    # the known value isn't overwritten by `.update()`
+    assert index.is_unchanged('http://test/uk/auto_a_1.html', 10)
+
+
+def test_check_times():
+    index = ListingIndex()
+    index.add('http://test/uk/auto_a_1.html', checked_at=100.5)
+    index.add('http://test/other', checked_at=200)
+    index.add('http://test/uk/auto_a_1.html', 10)
+
+    assert index.checked_at('http://test/uk/auto_a_1.html') == 100
+    assert index.checked_at('http://test/other') == 200
+    assert index.checked_at('http://test/uk/auto_a_2.html') is None
+
+
+def test_unchanged_listings():
+    index = ListingIndex()
+    index.add('http://test/uk/auto_a_1.html', 10)
+    index.add('http://test/uk/auto_b_2.html')
+    index.add('http://test/other', 20)
+
+    assert index.is_unchanged('http://test/uk/auto_a_1.html', 10)
+    assert not index.is_unchanged('http://test/uk/auto_a_1.html', 11)
+    # unknown hashes never match
+    assert not index.is_unchanged('http://test/uk/auto_b_2.html', None)
+    assert not index.is_unchanged('http://test/uk/auto_c_3.html', 10)
+    assert index.is_unchanged('http://test/other', 20)
+
+    index.mark_checked('http://test/uk/auto_a_1.html')
+    index.mark_checked('http://test/other')
+
+    assert index.checked_at('http://test/uk/auto_a_1.html') is not None
+    assert index.drain_checked() == [
+        'http://test/uk/auto_a_1.html',
+        'http://test/other'
+    ]
+    assert index.drain_checked() == []
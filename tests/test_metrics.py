@@ -0,0 +1,120 @@
+"""Tests of `autoria_scraper.core.misc.metrics`."""
+
+
+import socket
+import asyncio
+
+import aiohttp
+
+from autoria_scraper.core.misc.metrics import MetricsRegistry
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+
+        return sock.getsockname()[1]
+
+
+def test_counter_and_gauge():
+    registry = MetricsRegistry(False, '127.0.0.1', 0)
+    requests = registry.counter('requests_total', 'Requests.', ('status',))
+    queued = registry.gauge('queued', 'Queued urls.', ('kind',))
+    size = [3]
+
+    requests.inc('200')
+    requests.inc('200', amount=2)
+    requests.inc('a"b')
+    queued.track(lambda: size[0], 'direct')
+    queued.track(lambda: 1, 'catalog')
+    size[0] = 5
+
+    assert requests.value('200') == 3 and requests.value('404') == 0
+    # the same metric is returned on re-registration
+    assert registry.counter('requests_total', 'Requests.') is requests
+    assert registry.counters() == {
+        'requests_total{status="200"}': 3,
+        'requests_total{status="a\\"b"}': 1
+    }
+    assert registry.render().splitlines() == [
+        '# HELP requests_total Requests.',
+        '# TYPE requests_total counter',
+        'requests_total{status="200"} 3',
+        'requests_total{status="a\\"b"} 1',
+        '# HELP queued Queued urls.',
+        '# TYPE queued gauge',
+        'queued{kind="catalog"} 1',
+        'queued{kind="direct"} 5'
+    ]
+
+    queued.track(None, 'direct')
+
+    assert 'queued{kind="direct"}' not in registry.render()
+
+
+def test_histogram():
+    registry = MetricsRegistry(False, '127.0.0.1', 0)
+    latency = registry.histogram(
+        'latency_seconds',
+        'Latency.',
+        ('method',),
+        buckets=(1, 0.1, 10)
+    )
+
+    for value in (0.05, 0.5, 0.5, 5, 100):
+        latency.observe(value, 'GET')
+
+    assert latency.count('GET') == 5 and latency.sum('GET') == 106.05
+    assert latency.count('POST') == 0
+    assert latency.quantile(0.5, 'POST') is None
+    # the 3rd of 5 values lies in the middle of (0.1, 1]
+    assert abs(latency.quantile(0.5, 'GET') - 0.775) < 1e-9
+    # +Inf bucket
+    assert latency.quantile(1, 'GET') == 10
+    assert registry.render().splitlines()[2:] == [
+        'latency_seconds_bucket{method="GET",le="0.1"} 1',
+        'latency_seconds_bucket{method="GET",le="1"} 3',
+        'latency_seconds_bucket{method="GET",le="10"} 4',
+        'latency_seconds_bucket{method="GET",le="+Inf"} 5',
+        'latency_seconds_sum{method="GET"} 106.05',
+        'latency_seconds_count{method="GET"} 5'
+    ]
+
+    with latency.time('POST'):
+        pass
+
+    assert latency.count('POST') == 1
+    assert registry.summary()[1].startswith(
+        'latency_seconds{method="POST"}: count = 1'
+    )
+
+
+def test_http_endpoint():
+    port = _free_port()
+    registry = MetricsRegistry(True, '127.0.0.1', port)
+    registry.counter('pages_total', 'Pages.').inc()
+
+    async def main():
+        await registry.start()
+
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(
+                    f'http://127.0.0.1:{port}/metrics'
+                ) as response:
+                    return response.content_type, await response.text()
+        finally:
+            await registry.close()
+
+    content_type, text = asyncio.run(main())
+
+    assert content_type == 'text/plain'
+    assert 'pages_total 1' in text.splitlines()
+
+
+def test_disabled_endpoint():
+    registry = MetricsRegistry(False, '127.0.0.1', _free_port())
+
+    asyncio.run(registry.start())
+
+    assert registry._runner is None
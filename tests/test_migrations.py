@@ -0,0 +1,124 @@
+"""Tests of schema migrations and partitions
+ (`autoria_scraper.db.migrations`), Postgres only.
+"""
+
+
+from datetime import date, datetime
+
+from sqlalchemy import insert, select, text
+
+from autoria_scraper.db import engine, init_db
+from autoria_scraper.db.models import CarChange, SchemaVersion
+from autoria_scraper.db.migrations import (
+    SCHEMA_VERSION,
+    _month,
+    is_current,
+    maintain_partitions
+)
+
+
+def _car(url, title):
+    return {
+        'url': url,
+        'title': title,
+        'price_usd': 1000,
+        'odometer': 1,
+        'username': 'user',
+        'images_count': 0
+    }
+
+
+def test_old_schema_is_migrated(db):
+    async def main():
+        await init_db()
+
+        async with engine.begin() as conn:
+            # the schema before the first migration
+            for statement in (
+                'ALTER TABLE cars DROP COLUMN content_hash',
+                'ALTER TABLE cars DROP COLUMN datetime_checked',
+                'ALTER TABLE cars DROP CONSTRAINT cars_url_key',
+                'DROP INDEX ix_cars_car_vin',
+                'DELETE FROM schema_version',
+            ):
+                await conn.execute(text(statement))
+
+            await conn.execute(
+                text(
+                    'INSERT INTO cars (url, title, price_usd, odometer, '
+                    'username, images_count, datetime_found) '
+                    'VALUES (:url, :title, :price_usd, :odometer, '
+                    ':username, :images_count, now())'
+                ),
+                [_car('a', 'old'), _car('a', 'new'), _car('b', 'only')]
+            )
+
+            assert not await is_current(conn)
+
+        await init_db()
+
+        async with engine.begin() as conn:
+            return (
+                await is_current(conn),
+                list(await conn.scalars(select(SchemaVersion.version))),
+                list(await conn.execute(text(
+                    'SELECT url, title, content_hash FROM cars ORDER BY url'
+                )))
+            )
+
+    current, versions, rows = db(main())
+
+    assert current
+    assert versions == list(range(1, SCHEMA_VERSION + 1))
+    assert rows == [('a', 'new', None), ('b', 'only', None)]
+
+
+def test_partitions_take_rows_of_default(db):
+    today = date.today()
+    months = [_month(today, shift) for shift in (-2, -1, 0)]
+
+    async def partitions():
+        async with engine.begin() as conn:
+            return dict(list(await conn.execute(text(
+                'SELECT tableoid::regclass::text, count(*) '
+                'FROM car_changes GROUP BY 1'
+            ))))
+
+    async def main():
+        await init_db()
+
+        async with engine.begin() as conn:
+            # rows of the plain table go to the default partition first
+            await conn.execute(insert(CarChange).values([
+                {
+                    'url': f'{month}-{i}',
+                    'price_usd': 1000,
+                    'odometer': 1,
+                    'datetime_changed': datetime(
+                        month.year,
+                        month.month,
+                        1 + i
+                    )
+                }
+                for month in months
+                for i in range(2)
+            ]))
+            await maintain_partitions(conn)
+
+        converted = await partitions()
+
+        async with engine.begin() as conn:
+            await maintain_partitions(conn, retention_months=1)
+            await conn.execute(insert(CarChange).values(
+                url='new',
+                price_usd=1000,
+                odometer=1
+            ))
+
+        return converted, await partitions()
+
+    converted, expired = db(main())
+    current = f'car_changes_p{months[2]:%Y%m}'
+
+    assert converted == {'car_changes_default': 4, current: 2}
+    assert expired == {'car_changes_default': 2, current: 3}
@@ -0,0 +1,61 @@
+"""Tests of `autoria_scraper.core.parsers`."""
+
+
+import pickle
+
+import pytest
+
+from autoria_scraper.core.parsers import CarParser, PhoneNumberParser
+
+
+def _parse(**kwargs):
+    return CarParser.parse(**{
+        'url': 'http://test/uk/auto_bmw_x5_1.html',
+        'title': 'BMW X5',
+        'price_usd': '12 500 $',
+        'odometer': '100 тис. км пробіг',
+        'username': 'Seller',
+        'image_url': None,
+        'images_count': 'з 17',
+        'car_number': ' AA 1234 BB ',
+        'car_vin': 'WBA1',
+        **kwargs
+    })
+
+
+def test_car_record():
+    car = _parse()
+
+    assert (car.price_usd, car.odometer, car.images_count) == (
+        12500, 100_000, 17
+    )
+    assert car.car_number == 'AA 1234 BB'
+    assert car.as_dict()['content_hash'] == car.content_hash
+    assert list(car.as_dict()) == list(CarParser.__slots__)
+    assert _parse(odometer='без пробігу').odometer == 0
+    # plain values only, so records are cheap to pickle (worker processes)
+    assert pickle.loads(pickle.dumps(car)) == car
+
+
+def test_car_fingerprint():
+    car = _parse()
+    car.phone_number = '380671234567'
+
+    assert car.fingerprint() == _parse().content_hash
+    assert _parse(price_usd='12 600 $').content_hash != car.content_hash
+
+
+def test_missing_values():
+    with pytest.raises(ValueError):
+        _parse(username=None)
+
+    with pytest.raises(ValueError):
+        PhoneNumberParser(auto_id='1', phone_id=None, user_id='2')
+
+
+def test_phone_number():
+    assert CarParser.parse_phone_number(
+        {'additionalParams': {'phoneStr': '(067) 123 4567'}}
+    ) == '380671234567'
+    assert CarParser.parse_phone_number(None) is None
+    assert CarParser.parse_phone_number({}) is None
@@ -0,0 +1,95 @@
+"""Tests of `autoria_scraper.core.phones`."""
+
+
+import asyncio
+from datetime import datetime, timedelta
+
+from autoria_scraper.core.phones import PhoneCache
+
+
+def test_lru_and_ttl():
+    cache = PhoneCache(max_size=2, ttl=3600)
+    now = datetime.utcnow()
+
+    cache.add('1', 'a', '380001')
+    cache.add('2', 'b', '380002')
+    # the least recently used entry is evicted
+    assert cache.get('1', 'a') == '380001'
+    cache.add('3', 'c', '380003')
+
+    assert len(cache) == 2
+    assert cache.get('2', 'b') is None
+    assert cache.get('1', 'a') == '380001'
+
+    cache.add('4', 'd', '380004', resolved_at=now - timedelta(hours=2))
+    cache.add('5', 'e', '380005', resolved_at=now - timedelta(minutes=5))
+
+    # expired entries are removed
+    assert cache.get('4', 'd') is None
+    assert cache.get('5', 'e') == '380005'
+    assert len(cache) == 1
+
+
+def test_resolve_shares_requests():
+    cache = PhoneCache(max_size=10, ttl=3600)
+    calls = []
+
+    async def request():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+
+        return '380001'
+
+    async def main():
+        first = await asyncio.gather(*(
+            cache.resolve('1', 'a', request) for _ in range(5)
+        ))
+
+        return first, await cache.resolve('1', 'a', request)
+
+    first, cached = asyncio.run(main())
+
+    assert first == ['380001'] * 5 and cached == '380001'
+    assert len(calls) == 1
+
+    pending = cache.drain()
+
+    assert [
+        (record['user_id'], record['phone_id'], record['phone_number'])
+        for record in pending
+    ] == [('1', 'a', '380001')]
+    assert isinstance(pending[0]['datetime_resolved'], datetime)
+    assert cache.drain() == []
+
+
+def test_failures_are_not_cached():
+    cache = PhoneCache(max_size=10, ttl=3600)
+    responses = [None, '380001']
+
+    async def request():
+        await asyncio.sleep(0.01)
+
+        return responses.pop(0)
+
+    async def raising():
+        raise RuntimeError
+
+    async def main():
+        failed = await asyncio.gather(
+            cache.resolve('1', 'a', request),
+            cache.resolve('1', 'a', request)
+        )
+
+        try:
+            await cache.resolve('2', 'b', raising)
+        except RuntimeError:
+            pass
+
+        return failed, await cache.resolve('1', 'a', request)
+
+    failed, resolved = asyncio.run(main())
+
+    # the waiter receives None as well
+    assert failed == [None, None] and resolved == '380001'
+    assert not cache._in_flight
+    assert len(cache.drain()) == 1
@@ -0,0 +1,140 @@
+"""Tests of `autoria_scraper.core.pipeline`."""
+
+
+import random
+import asyncio
+from collections import Counter
+
+from aiohttp import web
+
+from benchmarks.server import (
+    OPTIONS,
+    PHONE_PATH,
+    ROOT_PATH,
+    ServerOptions,
+    _catalog,
+    _direct,
+    _phone_handler,
+    create_app
+)
+from autoria_scraper.core.checkpoint import Checkpoint
+from autoria_scraper.core.frontier import Frontier
+from autoria_scraper.core.pipeline import Pipeline
+from autoria_scraper.core.scrapers import CatalogScraper, DirectScraper
+
+
+# listings 3, 4 and 5 are on the first page
+_OPTIONS = ServerOptions(pages=1, links_per_page=3)
+
+
+def _app(requests):
+    async def catalog(request):
+        return web.Response(
+            text=_catalog(_OPTIONS, f'http://{request.host}', 1),
+            content_type='text/html'
+        )
+
+    async def direct(request):
+        listing_id = int(request.match_info['id'])
+        requests[listing_id] += 1
+        # the first two requests of listing 3 fail (a single fetch)
+        if listing_id == 3 and requests[listing_id] <= 2:
+            raise web.HTTPServiceUnavailable()
+        # listing 4 can't be parsed
+        if listing_id == 4:
+            return web.Response(text='<html></html>', content_type='text/html')
+
+        return web.Response(
+            text=_direct(_OPTIONS, listing_id),
+            content_type='text/html'
+        )
+
+    app = web.Application()
+    app[OPTIONS] = _OPTIONS
+    app.router.add_get(ROOT_PATH, catalog)
+    app.router.add_get(r'/uk/auto_{name:[a-z0-9_]+}_{id:\d+}.html', direct)
+    app.router.add_post(PHONE_PATH, _phone_handler)
+
+    return app
+
+
+def _pipeline(base, save, checkpoint=None, pages=1, **kwargs):
+    return Pipeline(
+        catalog_scraper=CatalogScraper(
+            f'{base}{ROOT_PATH}',
+            batch_size=2,
+            pages_limit=pages,
+            checkpoint=checkpoint
+        ),
+        direct_scraper=DirectScraper(f'{base}{PHONE_PATH}', 1),
+        save=save,
+        direct_concurrency=3,
+        save_concurrency=1,
+        save_batch_size=4,
+        frontier=Frontier(capacity=2, retries=1),
+        entities_queue_size=2,
+        checkpoint=checkpoint,
+        **kwargs
+    )
+
+
+def test_all_links_are_saved_in_batches(serve, tmp_path):
+    options = ServerOptions(pages=3, links_per_page=5, unavailable_rate=0.2)
+    # the same listing is always (un)available (see `benchmarks.server`)
+    unavailable = sum(
+        random.Random(listing_id).random() < options.unavailable_rate
+        for listing_id in range(5, 20)
+    )
+    checkpoint = Checkpoint(str(tmp_path / 'checkpoint.json'), interval=60)
+    batches = []
+
+    async def save(entities):
+        batches.append([entity.url for entity in entities])
+
+        return True
+
+    async def main():
+        async with serve(create_app(options)) as base:
+            pipeline = _pipeline(
+                base,
+                save,
+                checkpoint,
+                pages=3,
+                phone_concurrency=2,
+                phones_queue_size=1
+            )
+            await pipeline.run()
+
+            return len(pipeline.discovered)
+
+    discovered = asyncio.run(main())
+    saved = [url for batch in batches for url in batch]
+
+    assert discovered == 15
+    assert unavailable and len(saved) == len(set(saved)) == 15 - unavailable
+    assert all(0 < len(batch) <= 4 for batch in batches)
+    assert not checkpoint.has_pending() and not checkpoint.has_failures()
+
+
+def test_pages_not_fetched_are_retried(serve, tmp_path):
+    requests = Counter()
+    saved = []
+    checkpoint = Checkpoint(str(tmp_path / 'checkpoint.json'), interval=60)
+
+    async def save(entities):
+        saved.extend(entities)
+
+        return True
+
+    async def main():
+        async with serve(_app(requests)) as base:
+            await _pipeline(base, save, checkpoint).run()
+
+    asyncio.run(main())
+
+    assert sorted(entity.url.rsplit('_', 1)[1] for entity in saved) == [
+        '3.html', '5.html'
+    ]
+    assert requests == {3: 3, 4: 1, 5: 1}
+    # the page which can't be parsed is retried on resume only
+    assert checkpoint.has_failures() and not checkpoint.has_pending()
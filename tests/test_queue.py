@@ -0,0 +1,105 @@
+"""Tests of the work queue (`autoria_scraper.db.queue`), Postgres only."""
+
+
+from datetime import datetime, timedelta
+
+from autoria_scraper.db import init_db
+from autoria_scraper.db.queue import (
+    claim_tasks,
+    complete_tasks,
+    enqueue_tasks,
+    expire_leases,
+    extend_leases,
+    fail_tasks,
+    queue_stats
+)
+
+
+def test_enqueue_more_than_one_statement(db):
+    # 20k rows take more bind params than a single statement supports
+    urls = [f'http://test/uk/auto_{i}.html' for i in range(20_000)]
+
+    async def main():
+        await init_db()
+
+        return (
+            await enqueue_tasks('direct', urls + urls[:10]),
+            await enqueue_tasks('direct', urls),
+            await queue_stats()
+        )
+
+    added, again, stats = db(main())
+
+    assert added == 20_000 and again == 0
+    assert stats == {('direct', 'pending'): 20_000}
+
+
+def test_claim_complete_fail(db):
+    async def main():
+        await init_db()
+        await enqueue_tasks('direct', ['a', 'b', 'c', 'd'])
+
+        first = await claim_tasks('direct', 'w1', 3, lease_seconds=60)
+        second = await claim_tasks('direct', 'w2', 3, lease_seconds=60)
+        ids = [task.id for task in first]
+
+        # tasks of another worker aren't released
+        assert await complete_tasks('w2', ids) == 0
+        assert await complete_tasks('w1', ids[:1]) == 1
+        assert await fail_tasks('w1', ids[1:], max_attempts=1) == 2
+        assert await fail_tasks('w2', [second[0].id], max_attempts=2) == 1
+
+        return first, second, await queue_stats()
+
+    first, second, stats = db(main())
+
+    assert [task.url for task in first] == ['a', 'b', 'c']
+    assert [task.url for task in second] == ['d']
+    assert stats == {
+        ('direct', 'done'): 1,
+        ('direct', 'failed'): 2,
+        ('direct', 'pending'): 1
+    }
+
+
+def test_expired_leases_are_returned(db):
+    async def main():
+        await init_db()
+        await enqueue_tasks('catalog', ['1', '2'])
+        await claim_tasks('catalog', 'w1', 1, lease_seconds=-1)
+        await claim_tasks('catalog', 'w2', 1, lease_seconds=-1)
+        # the heartbeat of the second worker keeps its lease
+        await extend_leases('w2', lease_seconds=60)
+
+        assert await expire_leases(max_attempts=2) == 1
+
+        reclaimed = await claim_tasks('catalog', 'w3', 2, lease_seconds=60)
+
+        return reclaimed, await queue_stats()
+
+    reclaimed, stats = db(main())
+
+    assert [task.url for task in reclaimed] == ['1']
+    assert stats == {('catalog', 'leased'): 2}
+
+
+def test_finished_tasks_are_requeued(db):
+    async def main():
+        await init_db()
+        await enqueue_tasks('direct', ['a', 'b'])
+        tasks = await claim_tasks('direct', 'w1', 2, lease_seconds=60)
+        await complete_tasks('w1', [task.id for task in tasks])
+
+        before = datetime.utcnow() - timedelta(hours=1)
+        after = datetime.utcnow() + timedelta(hours=1)
+
+        return (
+            await enqueue_tasks('direct', ['a'], requeue_before=before),
+            await enqueue_tasks('direct', ['a', 'c'], requeue_before=after),
+            await queue_stats()
+        )
+
+    stale, fresh, stats = db(main())
+
+    assert stale == 0 and fresh == 2
+    assert stats == {('direct', 'done'): 1, ('direct', 'pending'): 2}
@@ -0,0 +1,36 @@
+"""Tests of `autoria_scraper.core.sharding`."""
+
+
+import os
+
+from autoria_scraper.core.ids import ListingSet
+from autoria_scraper.core.sharding import ShardRunner
+
+
+def test_from_config():
+    assert ShardRunner.from_config(shards=3)._shards == 3
+    assert ShardRunner.from_config()._shards == (os.cpu_count() or 1)
+
+
+def test_reports_are_aggregated():
+    runner = ShardRunner(shards=2, use_uvloop=False, report_interval=1)
+    receive = runner._ShardRunner__receive
+    total = runner._ShardRunner__total
+    pool = ListingSet()
+    pool.update(['http://test/uk/auto_a_1.html', 'http://test/other'])
+    other = ListingSet()
+    other.update(['http://test/uk/auto_a_1.html', 'http://test/uk/b_2.html'])
+
+    receive((0, {
+        'autoria_http_requests_total{status="200"}': 5,
+        'autoria_http_requests_total{status="404"}': 1,
+        'autoria_http_requests_total_other': 100
+    }))
+    # the latest counters of the shard replace previous ones
+    receive((0, {'autoria_http_requests_total{status="200"}': 7}, pool))
+    receive((1, {'autoria_http_requests_total{status="200"}': 2}, other))
+
+    assert total('autoria_http_requests_total') == 9
+    assert total('autoria_pipeline_entities_total') == 0
+    # the listing found by both shards is counted once
+    assert runner._discovered_total == 4 and len(runner._discovered) == 3
@@ -0,0 +1,137 @@
+"""Tests of `autoria_scraper.core.misc.throttle`."""
+
+
+import time
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from autoria_scraper.core.misc import throttle
+from autoria_scraper.core.misc.throttle import (
+    HostThrottle,
+    RateController,
+    TokenBucket,
+    backoff_delay,
+    parse_retry_after
+)
+
+
+def _throttle(**kwargs):
+    return HostThrottle(**{
+        'host': 'test',
+        'rate': 0,
+        'burst': 1,
+        'min_concurrency': 1,
+        'max_concurrency': 8,
+        **kwargs
+    })
+
+
+def test_backoff_delay_is_jittered_and_capped():
+    delays = [backoff_delay(attempt, 1, 5) for attempt in range(10)]
+
+    assert all(0 <= delay <= 5 for delay in delays)
+    assert all(backoff_delay(0, 1, 5) <= 1 for _ in range(100))
+    assert len(set(delays)) > 1
+
+
+def test_parse_retry_after():
+    date = datetime.now(timezone.utc) + timedelta(seconds=30)
+
+    assert parse_retry_after('5') == 5
+    assert parse_retry_after('-5') == 0
+    assert 25 < parse_retry_after(format_datetime(date, usegmt=True)) <= 30
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None and parse_retry_after('') is None
+
+
+def test_token_bucket_rate():
+    async def take(bucket, amount):
+        started = time.monotonic()
+
+        for _ in range(amount):
+            await bucket.acquire()
+
+        return time.monotonic() - started
+
+    # the burst is taken at once, the rest comes at 50 tokens per second
+    assert asyncio.run(take(TokenBucket(rate=50, burst=3), 3)) < 0.02
+    assert asyncio.run(take(TokenBucket(rate=50, burst=3), 6)) >= 0.05
+    assert asyncio.run(take(TokenBucket(rate=0, burst=1), 1000)) < 0.1
+
+
+def test_concurrency_limit_is_additive_increase_multiplicative_decrease(
+    monkeypatch
+):
+    host = _throttle()
+    host.on_throttle()
+    # responses of the same burst carry the same signal
+    host.on_throttle()
+
+    assert host.limit == 4
+
+    monkeypatch.setattr(throttle, '_DECREASE_COOLDOWN', 0)
+
+    for _ in range(5):
+        host.on_throttle()
+
+    assert host.limit == 1
+
+    for _ in range(10):
+        host.on_success()
+
+    assert 1 < host.limit < 8
+
+    for _ in range(100):
+        host.on_success()
+
+    assert host.limit == 8
+
+
+def test_slots_are_limited():
+    host = _throttle(max_concurrency=2)
+    peak = 0
+
+    async def request():
+        nonlocal peak
+
+        async with host.slot():
+            peak = max(peak, host.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(request() for _ in range(6)))
+
+    asyncio.run(main())
+
+    assert peak == 2 and host.in_flight == 0
+
+
+def test_retry_after_pauses_the_host():
+    host = _throttle()
+    host.on_throttle(retry_after=0.05)
+
+    async def main():
+        started = time.monotonic()
+
+        async with host.slot():
+            return time.monotonic() - started
+
+    assert asyncio.run(main()) >= 0.05
+
+
+def test_throttle_per_host():
+    controller = RateController(
+        rate=0,
+        burst=1,
+        min_concurrency=1,
+        max_concurrency=4
+    )
+
+    assert controller.host('http://a.test/1') is controller.host(
+        'https://a.test/2'
+    )
+    assert controller.host('http://a.test/') is not controller.host(
+        'http://b.test/'
+    )
@@ -0,0 +1,127 @@
+"""Tests of `autoria_scraper.core.misc.tools`."""
+
+
+import asyncio
+from contextlib import aclosing
+
+import pytest
+
+from autoria_scraper.core.misc import bounded_as_completed, chunked
+
+
+async def _collect(agen):
+    return [item async for item in agen]
+
+
+def test_window_is_bounded_and_slides():
+    running = 0
+    peak = 0
+    # the slow task doesn't hold back the rest of the window
+    delays = [0.05, 0, 0, 0, 0, 0, 0]
+
+    async def task(index):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(delays[index])
+        running -= 1
+
+        return index
+
+    async def main():
+        return await _collect(bounded_as_completed(
+            (task(index) for index in range(len(delays))),
+            limit=2
+        ))
+
+    results = asyncio.run(main())
+
+    assert peak == 2
+    assert results[-1] == 0 and sorted(results) == list(range(7))
+
+
+def test_ordered_results():
+    async def task(index):
+        await asyncio.sleep(0.01 * (5 - index))
+
+        return index
+
+    async def main():
+        return await _collect(bounded_as_completed(
+            (task(index) for index in range(5)),
+            limit=3,
+            ordered=True
+        ))
+
+    assert asyncio.run(main()) == [0, 1, 2, 3, 4]
+
+
+def test_aws_are_consumed_lazily():
+    started = []
+
+    async def task(index):
+        started.append(index)
+        await asyncio.sleep(0)
+
+        return index
+
+    def aws():
+        for index in range(1000):
+            yield task(index)
+
+    async def main():
+        async with aclosing(bounded_as_completed(aws(), limit=2)) as results:
+            async for _ in results:
+                break
+
+    asyncio.run(main())
+
+    assert len(started) <= 3
+
+
+def test_closing_cancels_pending_tasks():
+    cancelled = []
+
+    async def task(index):
+        try:
+            await asyncio.sleep(0 if index == 0 else 10)
+        except asyncio.CancelledError:
+            cancelled.append(index)
+
+            raise
+
+        return index
+
+    async def main():
+        async with aclosing(bounded_as_completed(
+            (task(index) for index in range(3)),
+            limit=3
+        )) as results:
+            async for _ in results:
+                break
+
+    asyncio.run(main())
+
+    assert sorted(cancelled) == [1, 2]
+
+
+def test_errors_and_bad_limit():
+    async def broken():
+        raise RuntimeError('broken')
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(_collect(bounded_as_completed([broken()], limit=1)))
+
+    with pytest.raises(ValueError):
+        asyncio.run(_collect(bounded_as_completed([], limit=0)))
+
+
+def test_chunked():
+    async def items():
+        for item in range(5):
+            yield item
+
+    assert asyncio.run(_collect(chunked(items(), 2))) == [
+        (0, 1), (2, 3), (4,)
+    ]
+